@@ -0,0 +1 @@
+# This file marks this directory as a Python package.
@@ -0,0 +1,66 @@
+"""
+[Fleet memory benchmark]
+
+Measures the bytes per drone of a fleet held as Drone objects and as a
+packed Fleet, with every drone on one shared route and with every drone
+on its own copy of the route (as after a replan).
+
+Usage: python -m benchmarks.fleet_memory [nb_drones] [route_length]
+"""
+
+import sys
+import tracemalloc
+from typing import Callable
+from domain.entities import Drone, Fleet, Graph, Hub, RouteTable
+from domain.services import DroneFactory
+
+
+def build_line(length: int) -> Graph:
+    """A straight line of `length` hubs."""
+    hubs = {f"h{i}": Hub(name=f"h{i}", coord=(i, 0)) for i in range(length)}
+    links = {(f"h{i}", f"h{i + 1}"): 1 for i in range(length - 1)}
+    return Graph.build(hubs, links)
+
+
+def measure(build: Callable[[], object], nb_drones: int) -> float:
+    """Bytes allocated by `build()` and still alive, per drone."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / nb_drones
+
+
+def main() -> None:
+    nb_drones = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    length = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    graph = build_line(length)
+    route = list(range(length))
+
+    def drones(own_route: bool) -> list[Drone]:
+        fleet = list(DroneFactory.generate_drones(nb_drones))
+        for d in fleet:
+            d.start_hub, d.end_hub = 0, length - 1
+            d.path = list(route) if own_route else route
+        return fleet
+
+    def fleet(own_route: bool) -> Fleet:
+        packed = Fleet(RouteTable(graph))
+        for _ in range(nb_drones):
+            # Interning folds identical copies into the same route id
+            path = list(route) if own_route else route
+            packed.add(0, length - 1, packed.routes.intern(path))
+        return packed
+
+    print(f"{nb_drones} drones, route of {length} hubs")
+    print(f"{'layout':<20}{'shared route':>14}{'own route':>12}")
+    for name, build in (("Drone objects", drones), ("Fleet", fleet)):
+        shared = measure(lambda: build(False), nb_drones)
+        own = measure(lambda: build(True), nb_drones)
+        print(f"{name:<20}{shared:>12.1f} B{own:>10.1f} B")
+
+
+if __name__ == "__main__":
+    main()
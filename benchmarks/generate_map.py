@@ -0,0 +1,47 @@
+"""
+[Map generator]
+
+Writes a seeded synthetic map in the text map format.
+
+Usage:
+    python -m benchmarks.generate_map OUTPUT [--topology grid] [--hubs 100]
+        [--drones 10] [--restricted 0.1] [--priority 0.1] [--blocked 0.05]
+        [--max-drones 1 3] [--link-capacity 1 2] [--seed 0]
+"""
+
+import argparse
+from infrastructure.generators import MapGenerator, MapSpec, TOPOLOGIES
+
+
+def main() -> None:
+    defaults = MapSpec()
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('output')
+    arg_parser.add_argument('--topology', choices=TOPOLOGIES,
+                            default=defaults.topology)
+    arg_parser.add_argument('--hubs', type=int, default=defaults.hubs)
+    arg_parser.add_argument('--drones', type=int, default=defaults.drones)
+    arg_parser.add_argument('--restricted', type=float,
+                            default=defaults.restricted)
+    arg_parser.add_argument('--priority', type=float,
+                            default=defaults.priority)
+    arg_parser.add_argument('--blocked', type=float,
+                            default=defaults.blocked)
+    arg_parser.add_argument('--max-drones', type=int, nargs=2,
+                            default=defaults.max_drones)
+    arg_parser.add_argument('--link-capacity', type=int, nargs=2,
+                            default=defaults.link_capacity)
+    arg_parser.add_argument('--seed', type=int, default=defaults.seed)
+    args = arg_parser.parse_args()
+
+    spec = MapSpec(
+        topology=args.topology, hubs=args.hubs, drones=args.drones,
+        restricted=args.restricted, priority=args.priority,
+        blocked=args.blocked, max_drones=tuple(args.max_drones),
+        link_capacity=tuple(args.link_capacity), seed=args.seed,
+    )
+    MapGenerator().write(spec, args.output)
+
+
+if __name__ == '__main__':
+    main()
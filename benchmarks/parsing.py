@@ -0,0 +1,67 @@
+"""
+[Map parsing benchmark]
+
+Writes a seeded grid map as plain text, gzip and xz, and measures the
+lines per second of MapParser.load on each, plus the peak memory of the
+tokenizer alone, which streams the file and should not grow with it.
+
+Usage: python -m benchmarks.parsing [hubs] [seed]
+"""
+
+import gzip
+import lzma
+import os
+import sys
+import tempfile
+import tracemalloc
+from domain.services import RoutingService, SimulationService, DroneFactory
+from infrastructure.generators import MapGenerator, MapSpec
+from infrastructure.parsers import MapParser, MapTokenizer, open_map
+from utils import NullWriter
+
+
+def tokenizer_peak(path: str) -> float:
+    """Peak traced memory, in KiB, of tokenizing `path` to the end."""
+    tokenizer = MapTokenizer()
+    tracemalloc.start()
+    with open_map(path) as file:
+        for _ in tokenizer.tokenize(file):
+            pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main() -> None:
+    hubs = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    spec = MapSpec(topology='grid', hubs=hubs, seed=seed)
+    parser = MapParser(RoutingService(),
+                       SimulationService(writer=NullWriter()),
+                       DroneFactory())
+
+    with tempfile.TemporaryDirectory() as directory:
+        plain = os.path.join(directory, 'map.txt')
+        MapGenerator().write(spec, plain)
+        paths = {'plain': plain,
+                 'gzip': os.path.join(directory, 'map.txt.gz'),
+                 'xz': os.path.join(directory, 'map.txt.xz')}
+        with open(plain, 'rb') as source:
+            data = source.read()
+        with gzip.open(paths['gzip'], 'wb') as target:
+            target.write(data)
+        with lzma.open(paths['xz'], 'wb') as target:
+            target.write(data)
+
+        print(f"grid map, {hubs} hubs, seed {seed}")
+        print(f"{'input':<8}{'lines':>10}{'seconds':>10}{'lines/s':>12}"
+              f"{'tokenizer peak':>16}")
+        for name, path in paths.items():
+            parser.load(path)
+            print(f"{name:<8}{parser.lines:>10}{parser.seconds:>10.3f}"
+                  f"{parser.lines / parser.seconds:>12,.0f}"
+                  f"{tokenizer_peak(path):>13.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+[Replanning benchmark]
+
+Compares the node expansions and the routing time spent on replanning
+blocked drones by a fresh A* search per replan, by the incremental (LPA*)
+routing mode and by the hierarchical (HPA*) routing mode. Every
+incremental answer is checked against the path of a fresh A* search with
+the same blocked hubs, and every hierarchical answer against its cost;
+the checks are not timed.
+
+The hierarchical mode pays off on large maps, for instance
+`python -m benchmarks.replanning 90 200 42 10`.
+
+Usage: python -m benchmarks.replanning [size] [nb_drones] [seed]
+       [cluster_size]
+"""
+
+import io
+import random
+import sys
+from contextlib import redirect_stdout
+from domain.entities import Drone, Graph, Hub, Zones
+from domain.services import RoutingService, SimulationService, DroneFactory
+from utils import Metrics
+
+
+class CheckedRoutingService(RoutingService):
+    """
+    Incremental routing service that validates every replan against the
+    path of a fresh A* run.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(incremental=True, metrics=Metrics())
+        self.replans = 0
+
+    def find_path(
+        self,
+        graph: Graph,
+        start: int,
+        end: int,
+        occupancy: set[int] | None = None
+    ) -> list[int]:
+        path = super().find_path(graph, start, end, occupancy)
+        self.replans += 1
+
+        astar = RoutingService().find_path(graph, start, end, occupancy)
+        if astar != path:
+            raise AssertionError(f"Replan from {start} differs from A*")
+        return path
+
+
+class CheckedHierarchicalService(RoutingService):
+    """
+    Hierarchical routing service that validates the cost of every replan
+    against a fresh A* run.
+    """
+
+    def __init__(self, cluster_size: int) -> None:
+        super().__init__(cluster_size=cluster_size, metrics=Metrics())
+        self.replans = 0
+
+    def find_path(
+        self,
+        graph: Graph,
+        start: int,
+        end: int,
+        occupancy: set[int] | None = None
+    ) -> list[int]:
+        path = super().find_path(graph, start, end, occupancy)
+        self.replans += 1
+
+        astar = RoutingService().find_path(graph, start, end, occupancy)
+        if path_cost(graph, astar) != path_cost(graph, path):
+            raise AssertionError(f"Replan from {start} is not optimal")
+        return path
+
+
+def path_cost(graph: Graph, path: list[int]) -> int:
+    """Routing cost of a path (0 for an empty path)."""
+    return sum(graph.edge_cost[graph.edge(a, b)]
+               for a, b in zip(path, path[1:]))
+
+
+def build_grid(size: int, seed: int) -> Graph:
+    """
+    Builds a size x size grid with unit coordinates, random zones and
+    small capacities.
+    """
+    rnd = random.Random(seed)
+    zones = [Zones.NORMAL] * 6 + [Zones.RESTRICTED, Zones.PRIORITY]
+    hubs: dict[str, Hub] = {}
+    links: dict[tuple[str, str], int] = {}
+    last = size - 1
+    corners = ((0, 0), (last, last))
+    for x in range(size):
+        for y in range(size):
+            corner = (x, y) in corners
+            hubs[f"h{x}_{y}"] = Hub(
+                name=f"h{x}_{y}",
+                coord=(x, y),
+                max_drones=10 ** 6 if corner else rnd.randint(1, 2),
+                zone=Zones.NORMAL if corner else rnd.choice(zones),
+            )
+            # The links of the depots let the whole fleet through, so
+            # drones contend for the hubs and replan
+            if x:
+                capacity = rnd.randint(1, 2)
+                links[(f"h{x - 1}_{y}", f"h{x}_{y}")] = (
+                    10 ** 6 if corner or (x - 1, y) in corners else capacity
+                )
+            if y:
+                capacity = rnd.randint(1, 2)
+                links[(f"h{x}_{y - 1}", f"h{x}_{y}")] = (
+                    10 ** 6 if corner or (x, y - 1) in corners else capacity
+                )
+    return Graph.build(hubs, links)
+
+
+def run(graph: Graph, nb_drones: int, routing: RoutingService) -> int:
+    """Simulates the fleet silently and returns the number of turns."""
+    start, end = 0, len(graph) - 1
+    path = RoutingService().find_path(graph, start, end)
+    drones: list[Drone] = []
+    for d in DroneFactory.generate_drones(nb_drones):
+        d.start_hub, d.end_hub, d.path = start, end, path
+        drones.append(d)
+
+    out = io.StringIO()
+    with redirect_stdout(out):
+        SimulationService(routing).simulate_turns(drones, graph)
+    return int(out.getvalue().rsplit("Turns:", 1)[1])
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    nb_drones = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 42
+    cluster_size = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+    graph = build_grid(size, seed)
+
+    fresh = RoutingService(metrics=Metrics())
+    turns = run(graph, nb_drones, fresh)
+    checked = CheckedRoutingService()
+    checked_turns = run(graph, nb_drones, checked)
+    hierarchical = CheckedHierarchicalService(cluster_size)
+    hierarchical_turns = run(graph, nb_drones, hierarchical)
+
+    print(f"grid {size}x{size}, {nb_drones} drones, seed {seed}")
+    print(f"{'mode':<12}{'turns':>8}{'expansions':>12}{'per turn':>10}"
+          f"{'seconds':>10}")
+    for mode, routing, t in (
+        ("a*", fresh, turns),
+        ("incremental", checked, checked_turns),
+        ("hierarchical", hierarchical, hierarchical_turns),
+    ):
+        seconds = routing.metrics.route_seconds if routing.metrics else 0.0
+        print(f"{mode:<12}{t:>8}{routing.expansions:>12}"
+              f"{routing.expansions / max(t, 1):>10.1f}{seconds:>10.2f}")
+    print(f"{checked.replans} incremental replans matched the A* path")
+    print(f"{hierarchical.replans} hierarchical replans ({cluster_size}x"
+          f"{cluster_size} clusters) matched the cost of a fresh search")
+
+
+if __name__ == "__main__":
+    main()
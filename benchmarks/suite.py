@@ -0,0 +1,155 @@
+"""
+[Benchmark suite]
+
+Generates seeded synthetic maps of several topologies and sizes, and
+times parsing, routing (fleet planning) and simulation separately.
+Results are written as JSON so later runs can be compared against a
+saved baseline.
+
+Usage:
+    python -m benchmarks.suite [--sizes 100 1000] [--topologies grid ...]
+        [--repeat N] [--output results.json]
+        [--baseline previous.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any
+from domain.services import (RoutingService, SimulationService, DroneFactory,
+                             FleetPlanner)
+from infrastructure.generators import MapGenerator, MapSpec, TOPOLOGIES
+from infrastructure.parsers import MapParser
+from utils import TurnCounter
+
+
+def run_case(spec: MapSpec, repeat: int) -> dict[str, Any]:
+    """
+    Times the three phases on the map of `spec`, keeping the best of
+    `repeat` runs for each phase.
+    """
+    fd, path = tempfile.mkstemp(suffix='.txt')
+    os.close(fd)
+    try:
+        MapGenerator().write(spec, path)
+        counter = TurnCounter()
+        timings: dict[str, list[float]] = {'parse': [], 'route': [],
+                                           'simulate': []}
+        for _ in range(repeat):
+            routing = RoutingService()
+            simulation = SimulationService(writer=counter)
+            parser = MapParser(routing, simulation, DroneFactory())
+            planner = FleetPlanner(routing)
+
+            t0 = time.perf_counter()
+            flight_map = parser.load(path)
+            t1 = time.perf_counter()
+            fleet = DroneFactory.generate_missions(flight_map.graph,
+                                                   flight_map.missions)
+            planner.plan_fleet(flight_map.graph, fleet)
+            t2 = time.perf_counter()
+            simulation.simulate_fleet(fleet, flight_map.graph)
+            t3 = time.perf_counter()
+
+            timings['parse'].append(t1 - t0)
+            timings['route'].append(t2 - t1)
+            timings['simulate'].append(t3 - t2)
+    finally:
+        os.remove(path)
+
+    return {
+        'topology': spec.topology,
+        'hubs': len(flight_map.graph),
+        'links': len(flight_map.graph.targets) // 2,
+        'drones': spec.drones,
+        'seed': spec.seed,
+        'turns': counter.turns,
+        **{f'{phase}_s': round(min(values), 6)
+           for phase, values in timings.items()},
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict[str, Any]], baseline_path: str) -> None:
+    """Prints each phase's time relative to the matching baseline case."""
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+
+    def key(case: dict[str, Any]) -> tuple[Any, ...]:
+        return (case['topology'], case['hubs'], case['drones'],
+                case['seed'])
+
+    previous = {key(case): case for case in baseline['results']}
+    print(f"\nvs {baseline_path} (new/old, lower is better)")
+    for case in results:
+        old = previous.get(key(case))
+        if old is None:
+            continue
+        ratios = '  '.join(
+            f"{phase} {case[f'{phase}_s'] / max(old[f'{phase}_s'], 1e-9):.2f}x"
+            for phase in ('parse', 'route', 'simulate')
+        )
+        turns = '' if old['turns'] == case['turns'] else \
+            f"  turns {old['turns']} -> {case['turns']}"
+        print(f"{case['topology']:<12}{case['hubs']:>8}  {ratios}{turns}")
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    arg_parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[100, 1000, 5000])
+    arg_parser.add_argument('--topologies', nargs='+', choices=TOPOLOGIES,
+                            default=list(TOPOLOGIES))
+    arg_parser.add_argument('--drones', type=int,
+                            help='fleet size (default: hubs / 10)')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--output', default='bench_results.json')
+    arg_parser.add_argument('--baseline')
+    args = arg_parser.parse_args()
+
+    results: list[dict[str, Any]] = []
+    print(f"{'topology':<12}{'hubs':>8}{'drones':>8}{'turns':>7}"
+          f"{'parse':>10}{'route':>10}{'simulate':>10}")
+    for topology in args.topologies:
+        for size in args.sizes:
+            spec = MapSpec(topology=topology, hubs=size,
+                           drones=args.drones or max(1, size // 10),
+                           seed=args.seed)
+            case = run_case(spec, args.repeat)
+            results.append(case)
+            print(f"{topology:<12}{case['hubs']:>8}{case['drones']:>8}"
+                  f"{case['turns']:>7}{case['parse_s']:>10.4f}"
+                  f"{case['route_s']:>10.4f}{case['simulate_s']:>10.4f}")
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
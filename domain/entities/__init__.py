@@ -1,5 +1,21 @@
 from .drone import Drone
+from .fleet import Fleet, RouteTable
+from .flight_map import FlightMap, Mission
+from .graph import Graph
 from .hub import Hub
+from .map_change import MapChange
+from .occupancy_ledger import OccupancyLedger
+from .progress_monitor import (ProgressMonitor, RunLimits, SimulationStalled,
+                               StallDiagnosis)
+from .reservation_table import ReservationTable
+from .route_index import RouteIndex
+from .turn_event import TurnEvent
+from .turn_scheduler import TurnScheduler
+from .wait_for_graph import WaitForGraph
 from .zones import Zones
 
-__all__ = ['Drone', 'Hub', 'Zones']
+__all__ = ['Drone', 'Fleet', 'FlightMap', 'Graph', 'Hub', 'MapChange',
+           'Mission', 'OccupancyLedger', 'ProgressMonitor', 'ReservationTable',
+           'RouteIndex', 'RouteTable', 'RunLimits', 'SimulationStalled',
+           'StallDiagnosis', 'TurnEvent', 'TurnScheduler', 'WaitForGraph',
+           'Zones']
@@ -1,31 +1,35 @@
 from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True)
 class Drone:
     """
     Represents the state and route information of a drone.
 
     Attributes:
         id: Unique drone identifier.
-        start_hub: Name of the starting hub.
-        end_hub: Name of the destination hub.
+        start_hub: Id of the starting hub in the compiled graph.
+        end_hub: Id of the destination hub in the compiled graph.
         path_idx: Current index in the path.
-        path: List of hubs representing the route.
+        path: List of hub ids representing the route.
         restricted: Turns remaining in restricted zone.
+        schedule: Turn at which each hub of the path is reached, when the
+            route was planned up front against a reservation table.
 
     The class tracks the drone's position, route, and restricted zone turns
-    for simulation purposes.
+    for simulation purposes. It is slotted to keep per-drone memory low;
+    see Fleet for the struct-of-arrays form used by large fleets.
     """
     id: str
-    start_hub: str
-    end_hub: str
+    start_hub: int
+    end_hub: int
     path_idx: int = 0
-    path: list[str] = field(default_factory=list)
+    path: list[int] = field(default_factory=list)
     restricted: int = 0
+    schedule: list[int] = field(default_factory=list)
 
     @property
-    def current_hub(self) -> str:
+    def current_hub(self) -> int:
         if self.path:
             return self.path[self.path_idx]
         return self.start_hub
@@ -0,0 +1,127 @@
+from array import array
+from dataclasses import dataclass, field
+from typing import MutableSequence, Sequence
+from .drone import Drone
+from .graph import Graph
+
+
+@dataclass
+class RouteTable:
+    """
+    Interned routes shared by a whole fleet.
+
+    Every distinct route is stored once, as a tuple of hub ids, together
+    with the edge ids of its consecutive hubs; drones refer to it by its
+    index in the table. Interning the same sequence of hubs twice returns
+    the same id, so replans that land on a known route cost nothing.
+
+    Attributes:
+        graph: Compiled hub graph the routes run on.
+        routes: Hub ids of every route, by route id.
+        links: Edge ids of every route, by route id.
+    """
+    graph: Graph
+    routes: list[tuple[int, ...]] = field(default_factory=list)
+    links: list[tuple[int, ...]] = field(default_factory=list)
+    _index: dict[tuple[int, ...], int] = field(
+        default_factory=dict, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def intern(self, path: Sequence[int]) -> int:
+        """Returns the id of `path`, adding it to the table if needed."""
+        route = tuple(path)
+        route_id = self._index.get(route)
+        if route_id is None:
+            route_id = len(self.routes)
+            self._index[route] = route_id
+            self.routes.append(route)
+            self.links.append(tuple(
+                self.graph.edge(a, b) for a, b in zip(route, route[1:])
+            ))
+        return route_id
+
+
+@dataclass
+class Fleet:
+    """
+    Struct-of-arrays representation of a fleet of drones.
+
+    Drone i is the i-th entry of every column and is labelled `D{i + 1}`
+    in the output. Its route is an id in the shared route table, so a
+    drone costs a fixed handful of bytes however long its route is.
+
+    Attributes:
+        routes: Interned route table shared by all drones.
+        start_hub: Starting hub id of every drone.
+        end_hub: Destination hub id of every drone.
+        route: Route id of every drone.
+        path_idx: Index of the current hub in the drone's route.
+        restricted: Turns remaining in restricted zone for every drone.
+    """
+    routes: RouteTable
+    start_hub: MutableSequence[int] = field(
+        default_factory=lambda: array('i'))
+    end_hub: MutableSequence[int] = field(
+        default_factory=lambda: array('i'))
+    route: MutableSequence[int] = field(
+        default_factory=lambda: array('i'))
+    path_idx: MutableSequence[int] = field(
+        default_factory=lambda: array('i'))
+    restricted: MutableSequence[int] = field(
+        default_factory=lambda: array('b'))
+
+    def __len__(self) -> int:
+        return len(self.route)
+
+    @staticmethod
+    def label(drone: int) -> str:
+        """Output identifier of drone `drone`."""
+        return f"D{drone + 1}"
+
+    def current_hub(self, drone: int) -> int:
+        route = self.routes.routes[self.route[drone]]
+        if route:
+            return route[self.path_idx[drone]]
+        return int(self.start_hub[drone])
+
+    def add(self, start: int, end: int, route: int) -> int:
+        """Appends a drone at the start of `route` and returns its id."""
+        self.start_hub.append(start)
+        self.end_hub.append(end)
+        self.route.append(route)
+        self.path_idx.append(0)
+        self.restricted.append(0)
+        return len(self.route) - 1
+
+    @classmethod
+    def from_drones(cls, drones: list[Drone], graph: Graph) -> 'Fleet':
+        """Packs Drone objects, in order, into a new fleet."""
+        fleet = cls(RouteTable(graph))
+        for d in drones:
+            fleet.add(d.start_hub, d.end_hub, fleet.routes.intern(d.path))
+            fleet.path_idx[-1] = d.path_idx
+            fleet.restricted[-1] = d.restricted
+        return fleet
+
+    def to_drones(self) -> list[Drone]:
+        """
+        Unpacks the fleet into Drone objects. Drones on the same route
+        share one path list.
+        """
+        paths: dict[int, list[int]] = {}
+        drones: list[Drone] = []
+        for i in range(len(self)):
+            route = self.route[i]
+            if route not in paths:
+                paths[route] = list(self.routes.routes[route])
+            drones.append(Drone(
+                id=self.label(i),
+                start_hub=self.start_hub[i],
+                end_hub=self.end_hub[i],
+                path_idx=self.path_idx[i],
+                path=paths[route],
+                restricted=self.restricted[i],
+            ))
+        return drones
@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from .graph import Graph
+
+
+@dataclass(frozen=True)
+class Mission:
+    """
+    Drones flying from one hub to another.
+
+    Attributes:
+        start: Id of the hub the drones start from.
+        end: Id of the hub the drones fly to.
+        nb_drones: Number of drones of the mission.
+    """
+    start: int
+    end: int
+    nb_drones: int
+
+
+@dataclass(frozen=True, eq=False)
+class FlightMap:
+    """
+    Immutable result of loading a map, reusable across simulations.
+
+    Attributes:
+        graph: Compiled hub graph.
+        nb_drones: Number of drones in the fleet.
+        start: Id of the hub the drones start from (of the first mission
+            when there are several).
+        end: Id of the hub the drones fly to (of the first mission when
+            there are several).
+        missions: Origin, destination and size of every group of drones,
+            in drone order. Defaults to one mission of the whole fleet
+            from `start` to `end`.
+
+    Parsing (or loading a compiled map) produces a FlightMap once; any
+    number of simulations can then run on it without re-reading the file.
+    """
+    graph: Graph
+    nb_drones: int
+    start: int
+    end: int
+    missions: tuple[Mission, ...] = ()
+
+    def __post_init__(self) -> None:
+        """
+        Raises:
+            ValueError: If the missions do not add up to `nb_drones`.
+        """
+        if not self.missions:
+            object.__setattr__(self, 'missions',
+                               (Mission(self.start, self.end,
+                                        self.nb_drones),))
+        elif sum(m.nb_drones for m in self.missions) != self.nb_drones:
+            raise ValueError(
+                f"The missions add up to "
+                f"{sum(m.nb_drones for m in self.missions)} drones, "
+                f"not nb_drones={self.nb_drones}"
+            )
+
+    def drone_hubs(self) -> list[tuple[int, int]]:
+        """The (start, end) hub ids of every drone, in drone order."""
+        return [(m.start, m.end) for m in self.missions
+                for _ in range(m.nb_drones)]
@@ -0,0 +1,240 @@
+from array import array
+from dataclasses import dataclass, replace
+from functools import cached_property
+from typing import Iterable, Mapping, Sequence
+from .hub import Hub
+from .zones import Zones
+
+
+# Dense integer code of every zone, used by the compiled graph columns.
+ZONE_CODES: dict[Zones, int] = {zone: code for code, zone in enumerate(Zones)}
+ZONE_BY_CODE: tuple[Zones, ...] = tuple(Zones)
+
+NORMAL = ZONE_CODES[Zones.NORMAL]
+BLOCKED = ZONE_CODES[Zones.BLOCKED]
+RESTRICTED = ZONE_CODES[Zones.RESTRICTED]
+PRIORITY = ZONE_CODES[Zones.PRIORITY]
+
+# Routing weight of entering a hub of each zone. Not turns, just cost.
+# A weight of 0 marks an edge that can never be taken.
+ROUTING_COST: dict[int, int] = {
+    NORMAL: 2,
+    BLOCKED: 0,
+    RESTRICTED: 5,
+    PRIORITY: 1,
+}
+
+
+@dataclass(frozen=True, eq=False)
+class Graph:
+    """
+    Compiled, immutable view of the hub network.
+
+    Hub names are interned to dense integer ids (their position in `names`)
+    and the connections are stored in CSR form: the neighbors of hub `u`
+    are `targets[offsets[u]:offsets[u + 1]]`, and every per-edge column
+    (`edge_cost`, `edge_capacity`) is indexed by the same edge position.
+    Each map connection yields two directed edges, one per direction.
+
+    Attributes:
+        names: Hub name of every hub id.
+        colors: Hub color name (or None) of every hub id.
+        coord_x: X coordinate of every hub id.
+        coord_y: Y coordinate of every hub id.
+        zones: Zone code (see `ZONE_CODES`) of every hub id.
+        max_drones: Hub capacity of every hub id.
+        offsets: CSR row offsets, `len(names) + 1` entries.
+        targets: CSR column indices, the target hub id of each edge.
+        edge_cost: Routing weight of each edge (0 if impassable: its
+            target is blocked or the link is closed).
+        edge_capacity: Link capacity of each edge.
+        closed: Positions of the edges of the closed links, both
+            directions of each. A closed link stays closed whatever the
+            zones of its hubs become.
+
+    Routing and simulation work on the integer ids only and use `names`
+    to map back for output.
+    """
+    names: tuple[str, ...]
+    colors: tuple[str | None, ...]
+    coord_x: Sequence[int]
+    coord_y: Sequence[int]
+    zones: Sequence[int]
+    max_drones: Sequence[int]
+    offsets: Sequence[int]
+    targets: Sequence[int]
+    edge_cost: Sequence[int]
+    edge_capacity: Sequence[int]
+    closed: frozenset[int] = frozenset()
+
+    @classmethod
+    def build(
+        cls,
+        hubs: dict[str, Hub],
+        link_capacity: dict[tuple[str, str], int],
+    ) -> 'Graph':
+        """
+        Compiles parsed hubs and connections into a CSR graph.
+        Hub ids follow the insertion order of `hubs`, and the neighbors of
+        each hub keep the order in which its connections were declared.
+
+        Args:
+            hubs: Dictionary of hub names to their information.
+            link_capacity: Capacity of every declared connection (a, b).
+
+        Returns:
+            The compiled graph.
+
+        Raises:
+            ValueError: If a connection references an undeclared hub.
+        """
+        index: dict[str, int] = {name: i for i, name in enumerate(hubs)}
+        nb_hubs = len(index)
+
+        # First pass: degree of every hub, in declaration order
+        degree = array('q', [0]) * nb_hubs
+        edges: list[tuple[int, int, int]] = []
+        for (a, b), capacity in link_capacity.items():
+            for name in (a, b):
+                if name not in index:
+                    raise ValueError(
+                        f"Connection {a}-{b} references unknown hub '{name}'"
+                    )
+            ia, ib = index[a], index[b]
+            edges.append((ia, ib, capacity))
+            degree[ia] += 1
+            degree[ib] += 1
+
+        offsets = array('q', [0])
+        for d in degree:
+            offsets.append(offsets[-1] + d)
+
+        # Second pass: scatter both directions of every link in place
+        nb_edges = offsets[-1]
+        targets = array('q', [0]) * nb_edges
+        edge_capacity = array('q', targets)
+        cursor = array('q', offsets[:-1])
+        for ia, ib, capacity in edges:
+            for u, v in ((ia, ib), (ib, ia)):
+                pos = cursor[u]
+                targets[pos] = v
+                edge_capacity[pos] = capacity
+                cursor[u] = pos + 1
+
+        hub_list = list(hubs.values())
+        zones = array('b', [ZONE_CODES[hub.zone] for hub in hub_list])
+        edge_cost = array('q', [ROUTING_COST[zones[v]] for v in targets])
+
+        return cls(
+            names=tuple(index),
+            colors=tuple(hub.color for hub in hub_list),
+            coord_x=array('q', [hub.coord[0] for hub in hub_list]),
+            coord_y=array('q', [hub.coord[1] for hub in hub_list]),
+            zones=zones,
+            max_drones=array('q', [hub.max_drones for hub in hub_list]),
+            offsets=offsets,
+            targets=targets,
+            edge_cost=edge_cost,
+            edge_capacity=edge_capacity,
+        )
+
+    def with_overrides(
+        self,
+        max_drones: Mapping[int, int] | None = None,
+        link_capacity: Mapping[tuple[int, int], int] | None = None,
+        zones: Mapping[int, int] | None = None,
+        closed_links: Iterable[tuple[int, int]] = (),
+    ) -> 'Graph':
+        """
+        Returns a copy of the graph with some capacities or zones changed,
+        or some links closed. Columns that no override touches are shared
+        with this graph, so many variants of one map cost little more than
+        the map itself.
+
+        Args:
+            max_drones: New capacity of some hubs, by hub id.
+            link_capacity: New capacity of some links, by (hub id, hub id)
+                pair; both directions of the link change.
+            zones: New zone code of some hubs, by hub id.
+            closed_links: Links that can no longer be flown, by (hub id,
+                hub id) pair; both directions join `closed` and get a
+                routing weight of 0, which later zone changes keep.
+
+        Returns:
+            The new graph.
+
+        Raises:
+            ValueError: If a link override names hubs that are not linked.
+        """
+        capacities = self.max_drones
+        if max_drones:
+            capacities = array('q', capacities)
+            for hub, capacity in max_drones.items():
+                capacities[hub] = capacity
+
+        edge_capacity = self.edge_capacity
+        if link_capacity:
+            edge_capacity = array('q', edge_capacity)
+            for (a, b), capacity in link_capacity.items():
+                for u, v in ((a, b), (b, a)):
+                    pos = self.edge(u, v)
+                    if pos < 0:
+                        raise ValueError(
+                            f"No connection {self.names[a]}-{self.names[b]}"
+                        )
+                    edge_capacity[pos] = capacity
+
+        closed = set(self.closed)
+        for a, b in closed_links:
+            for u, v in ((a, b), (b, a)):
+                pos = self.edge(u, v)
+                if pos < 0:
+                    raise ValueError(
+                        f"No connection {self.names[u]}-{self.names[v]}"
+                    )
+                closed.add(pos)
+
+        codes, edge_cost = self.zones, self.edge_cost
+        if zones or len(closed) > len(self.closed):
+            costs = array('q', edge_cost)
+            if zones:
+                codes = array('b', codes)
+                for hub, zone in zones.items():
+                    codes[hub] = zone
+                    # Entering a hub costs according to its zone, unless
+                    # the link is closed
+                    for pos in range(self.offsets[hub],
+                                     self.offsets[hub + 1]):
+                        inward = self.edge(self.targets[pos], hub)
+                        if inward not in closed:
+                            costs[inward] = ROUTING_COST[zone]
+            for pos in closed:
+                costs[pos] = 0
+            edge_cost = costs
+
+        return replace(self, max_drones=capacities,
+                       edge_capacity=edge_capacity, zones=codes,
+                       edge_cost=edge_cost, closed=frozenset(closed))
+
+    @cached_property
+    def index(self) -> dict[str, int]:
+        """Hub name to hub id, built on first use."""
+        return {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def neighbors(self, hub: int) -> Sequence[int]:
+        """Returns the hub ids adjacent to `hub`."""
+        return self.targets[self.offsets[hub]:self.offsets[hub + 1]]
+
+    def edge(self, a: int, b: int) -> int:
+        """
+        Returns the position of the directed edge a -> b in the per-edge
+        columns, or -1 if the two hubs are not connected.
+        """
+        targets = self.targets
+        for pos in range(self.offsets[a], self.offsets[a + 1]):
+            if targets[pos] == b:
+                return pos
+        return -1
@@ -1,9 +1,22 @@
 import difflib
 from dataclasses import dataclass
+from functools import lru_cache
 from .zones import Zones
 from utils import Palette
 
 
+ZONE_BY_VALUE: dict[str, Zones] = {zone.value: zone for zone in Zones}
+
+
+@lru_cache(maxsize=256)
+def palette_color(name: str) -> str | None:
+    """The first palette color whose name is part of `name`, if any."""
+    for color in Palette:
+        if color.value in name:
+            return color.value
+    return None
+
+
 @dataclass
 class Hub:
     """
@@ -26,16 +39,14 @@ class Hub:
 
     def set_metadata(self, metadata: dict[str, str]) -> None:
         if 'color' in metadata:
-            for color in Palette:
-                if color.value in metadata['color']:
-                    self.color = color.value
-                    break
+            color = palette_color(metadata['color'])
+            if color is not None:
+                self.color = color
 
         if 'zone' in metadata:
-            for zone in Zones:
-                if zone.value == metadata['zone']:
-                    self.zone = zone
-                    break
+            zone = ZONE_BY_VALUE.get(metadata['zone'])
+            if zone is not None:
+                self.zone = zone
             else:
                 valid_zones: list[str] = [z.value for z in Zones]
                 suggestion = difflib.get_close_matches(
@@ -0,0 +1,51 @@
+from dataclasses import dataclass, field
+from typing import Mapping
+from .graph import BLOCKED, Graph
+
+
+@dataclass(frozen=True)
+class MapChange:
+    """
+    Changes to the map of a running simulation, applied between two
+    turns. Hubs and links are given by hub id, see Graph.with_overrides.
+
+    Attributes:
+        zones: New zone code of some hubs, by hub id.
+        max_drones: New capacity of some hubs, by hub id.
+        link_capacity: New capacity of some links, by (hub id, hub id).
+        closed_links: Links that can no longer be flown, by (hub id,
+            hub id).
+    """
+    zones: Mapping[int, int] = field(default_factory=dict)
+    max_drones: Mapping[int, int] = field(default_factory=dict)
+    link_capacity: Mapping[tuple[int, int], int] = field(
+        default_factory=dict)
+    closed_links: frozenset[tuple[int, int]] = frozenset()
+
+    def apply(self, graph: Graph) -> Graph:
+        """Returns `graph` with the change applied."""
+        return graph.with_overrides(
+            max_drones=self.max_drones,
+            link_capacity=self.link_capacity,
+            zones=self.zones,
+            closed_links=self.closed_links,
+        )
+
+    def closures(self, graph: Graph) -> tuple[set[int], set[int]]:
+        """
+        What the change makes impassable in `graph`, the graph before it.
+
+        Returns:
+            The ids of the hubs that become blocked, and the positions of
+            the directed edges that get closed (both directions of every
+            closed link).
+        """
+        hubs = {hub for hub, zone in self.zones.items()
+                if zone == BLOCKED and graph.zones[hub] != BLOCKED}
+        links: set[int] = set()
+        for a, b in self.closed_links:
+            for u, v in ((a, b), (b, a)):
+                pos = graph.edge(u, v)
+                if pos >= 0 and graph.edge_cost[pos]:
+                    links.add(pos)
+        return hubs, links
@@ -0,0 +1,91 @@
+from array import array
+from typing import Iterable
+from .graph import Graph
+
+
+class OccupancyLedger:
+    """
+    Live count of the drones in every hub and on every directed link of
+    a running simulation.
+
+    A hub holds the drones that are in it, whether they moved in this
+    turn or stayed put, and a drone may only enter a hub holding fewer
+    than `max_drones`. A link counts the drones that flew it in the
+    current turn, in one direction; the counters are stamped with the
+    turn that last wrote them, so nothing is cleared between turns.
+    Exempt hubs (the start and end hubs, where the whole fleet waits or
+    lands) have no limit, as in the ReservationTable.
+
+    The hubs at their limit are kept in `saturated` as drones come and
+    go, so a replan gets them without scanning the map, and every query
+    and move costs O(1).
+
+    Attributes:
+        graph: Compiled hub graph the counts refer to.
+        exempt: Ids of the hubs without a capacity limit.
+        hubs: Drones in each hub, by hub id.
+        saturated: Hubs that cannot take one more drone.
+        turn: Turn the link counters currently refer to.
+    """
+
+    def __init__(self, graph: Graph, exempt: Iterable[int] = ()) -> None:
+        self.graph = graph
+        self.exempt = set(exempt)
+        self.hubs = array('q', [0]) * len(graph)
+        self.saturated: set[int] = set()
+        self.turn = 0
+        self._links = array('q', [0]) * len(graph.targets)
+        self._link_turn = array('q', [-1]) * len(graph.targets)
+
+    @classmethod
+    def from_positions(cls, graph: Graph, positions: Iterable[int],
+                       exempt: Iterable[int] = ()) -> 'OccupancyLedger':
+        """Counts one drone in the hub of every position."""
+        ledger = cls(graph, exempt)
+        for hub in positions:
+            ledger.hubs[hub] += 1
+        ledger.rebind(graph)
+        return ledger
+
+    def rebind(self, graph: Graph) -> None:
+        """
+        Switches to a changed version of the same map (new `max_drones`
+        or link capacities) and recomputes the saturated hubs; this is
+        the only O(hubs) operation.
+        """
+        self.graph = graph
+        max_drones = graph.max_drones
+        hubs = self.hubs
+        self.saturated = {hub for hub in range(len(graph))
+                          if hubs[hub] >= max_drones[hub]
+                          and hub not in self.exempt}
+
+    def begin_turn(self, turn: int) -> None:
+        """Starts counting the link usage of `turn` from zero."""
+        self.turn = turn
+
+    def hub_free(self, hub: int) -> bool:
+        """Whether one more drone can enter `hub`."""
+        return hub not in self.saturated
+
+    def link_usage(self, edge: int) -> int:
+        """Drones that flew the directed `edge` in the current turn."""
+        return self._links[edge] if self._link_turn[edge] == self.turn \
+            else 0
+
+    def link_free(self, edge: int) -> bool:
+        """Whether one more drone can fly the directed `edge` this turn."""
+        return self.link_usage(edge) < self.graph.edge_capacity[edge]
+
+    def move(self, source: int, target: int, edge: int) -> None:
+        """Records a drone flying `edge` from `source` into `target`."""
+        hubs = self.hubs
+        max_drones = self.graph.max_drones
+        hubs[source] -= 1
+        if hubs[source] < max_drones[source]:
+            self.saturated.discard(source)
+        hubs[target] += 1
+        if hubs[target] >= max_drones[target] and target not in self.exempt:
+            self.saturated.add(target)
+        self._links[edge] = self.link_usage(edge) + 1
+        self._link_turn[edge] = self.turn
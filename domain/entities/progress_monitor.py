@@ -0,0 +1,223 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Mapping, Sequence
+from .graph import Graph
+from .wait_for_graph import HUB, LINK, WaitForGraph
+
+
+# Reasons a run is stopped
+DEADLOCK = 'deadlock'
+STALLED = 'stalled'
+MAX_TURNS = 'max_turns'
+TIME_LIMIT = 'time_limit'
+
+
+@dataclass(frozen=True)
+class RunLimits:
+    """
+    Budget of a simulation run. A limit of 0 is no limit.
+
+    Attributes:
+        max_turns: Turns after which the run is stopped.
+        max_seconds: Wall-clock seconds after which the run is stopped,
+            counted from its first turn.
+        stall_turns: Turns without any drone landing after which the run
+            is stopped. None picks 4 turns per hub (a lone drone needs at
+            most 2 per hub of its route), and at least 100.
+    """
+    max_turns: int = 0
+    max_seconds: float = 0.0
+    stall_turns: int | None = None
+
+    def stall_window(self, graph: Graph) -> int:
+        """The stall limit for `graph`, 0 when disabled."""
+        if self.stall_turns is None:
+            return max(100, 4 * len(graph))
+        return self.stall_turns
+
+
+@dataclass(frozen=True)
+class StallDiagnosis:
+    """
+    Why a simulation run was stopped before every drone landed.
+
+    Attributes:
+        reason: DEADLOCK (nothing can change any more), STALLED (no drone
+            landed for too long), MAX_TURNS or TIME_LIMIT.
+        turn: Turns simulated when the run stopped.
+        remaining: Drones that had not landed.
+        drones: Labels of the drones involved: the waiting ones, or every
+            remaining drone if none was waiting.
+        hubs: Names of the hubs they are in or wait for.
+        cycle: Names of the full hubs of a wait-for cycle, in wait order,
+            empty if there is none.
+        waits: (drone, hub it is in, what it waits for) of every drone
+            involved, as text.
+    """
+    reason: str
+    turn: int
+    remaining: int
+    drones: tuple[str, ...]
+    hubs: tuple[str, ...]
+    cycle: tuple[str, ...]
+    waits: tuple[tuple[str, str, str], ...]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'reason': self.reason,
+            'turn': self.turn,
+            'remaining': self.remaining,
+            'drones': list(self.drones),
+            'hubs': list(self.hubs),
+            'cycle': list(self.cycle),
+            'waits': [{'drone': drone, 'hub': hub, 'waits_for': target}
+                      for drone, hub, target in self.waits],
+        }
+
+    def summary(self) -> str:
+        """One line: the reason, and the wait-for cycle if there is one."""
+        line = (f"{self.reason} after turn {self.turn}, "
+                f"{self.remaining} drones not landed")
+        if self.cycle:
+            line += (" (wait-for cycle "
+                     + ' -> '.join(self.cycle + self.cycle[:1]) + ")")
+        return line
+
+    def __str__(self) -> str:
+        lines = [self.summary()]
+        shown = 10
+        for drone, hub, target in self.waits[:shown]:
+            lines.append(f"{drone} in {hub} waits for {target}")
+        if len(self.waits) > shown:
+            lines.append(f"... and {len(self.waits) - shown} more")
+        return '\n'.join(lines)
+
+
+class SimulationStalled(RuntimeError):
+    """
+    Raised by the simulation service when a run is stopped before every
+    drone landed.
+
+    Attributes:
+        diagnosis: What stopped the run and the drones involved.
+    """
+
+    def __init__(self, diagnosis: StallDiagnosis) -> None:
+        super().__init__(diagnosis.summary())
+        self.diagnosis = diagnosis
+
+
+class ProgressMonitor:
+    """
+    Watches a running simulation for deadlocks, stalls and exhausted
+    budgets.
+
+    A turn in which no drone moved, none ended a restricted countdown,
+    no replan found a route and the map did not change leaves the state
+    exactly as it was, so every later turn would be the same: the run is
+    deadlocked as soon as such a turn is followed by no map change.
+    Drones that keep moving without landing (a livelock) are caught by
+    the stall window instead. The simulation records every wait in
+    `waits`, which names the drones and hubs involved when the run is
+    stopped.
+
+    Attributes:
+        limits: Budget of the run.
+        waits: Wait-for graph of the run.
+    """
+
+    def __init__(self, limits: RunLimits, graph: Graph,
+                 start_turn: int = 0) -> None:
+        self.limits = limits
+        self.waits = WaitForGraph()
+        self._stall_window = limits.stall_window(graph)
+        self._started = time.perf_counter()
+        self._last_landing = start_turn
+        self._frozen = False
+
+    def end_turn(self, turn: int, active: bool, landed: bool) -> None:
+        """
+        Records the outcome of a turn.
+
+        Args:
+            turn: Number of the turn that ended.
+            active: Whether anything changed the state in that turn.
+            landed: Whether a drone landed in that turn.
+        """
+        self._frozen = not active
+        if landed:
+            self._last_landing = turn
+
+    def check(self, turn: int, changing: bool) -> str | None:
+        """
+        Decides whether the run may go on with the turn after `turn`.
+
+        Args:
+            turn: Turns simulated so far.
+            changing: Whether a map change applies before the next turn.
+
+        Returns:
+            The reason to stop the run, or None to go on.
+        """
+        limits = self.limits
+        if self._frozen and not changing:
+            return DEADLOCK
+        if (self._stall_window
+                and turn - self._last_landing >= self._stall_window):
+            return STALLED
+        if limits.max_turns and turn >= limits.max_turns:
+            return MAX_TURNS
+        if (limits.max_seconds
+                and time.perf_counter() - self._started
+                >= limits.max_seconds):
+            return TIME_LIMIT
+        return None
+
+    def diagnose(
+        self,
+        reason: str,
+        turn: int,
+        graph: Graph,
+        positions: Mapping[int, int],
+        labels: Sequence[str],
+    ) -> StallDiagnosis:
+        """
+        Builds the diagnosis of a stopped run.
+
+        Args:
+            reason: Reason returned by check().
+            turn: Turns simulated.
+            graph: Compiled hub graph of the run.
+            positions: Hub of every drone that has not landed, by drone
+                index.
+            labels: Output label of every drone, by drone index.
+        """
+        names = graph.names
+        waits = {drone: wait for drone, wait in self.waits.waits.items()
+                 if drone in positions}
+        involved = sorted(waits) or sorted(positions)
+        hubs: set[int] = set()
+        described: list[tuple[str, str, str]] = []
+        for drone in involved:
+            if drone not in waits:
+                hubs.add(positions[drone])
+                continue
+            hub, kind, end, link = waits[drone]
+            hubs.update((hub, end))
+            if kind == HUB:
+                target = f"hub {names[end]}"
+            elif kind == LINK:
+                target = (f"link {names[hub]}-{names[end]} "
+                          f"(max_link_capacity={graph.edge_capacity[link]})")
+            else:
+                target = f"a route to {names[end]}"
+            described.append((labels[drone], names[hub], target))
+        return StallDiagnosis(
+            reason=reason,
+            turn=turn,
+            remaining=len(positions),
+            drones=tuple(labels[drone] for drone in involved),
+            hubs=tuple(names[hub] for hub in sorted(hubs)),
+            cycle=tuple(names[hub] for hub in self.waits.cycle()),
+            waits=tuple(described),
+        )
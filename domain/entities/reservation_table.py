@@ -0,0 +1,51 @@
+from dataclasses import dataclass, field
+from .graph import Graph
+
+
+@dataclass
+class ReservationTable:
+    """
+    Shared space-time reservation table for cooperative planning.
+
+    Counts, for every turn, the drones planned to be in each hub at the
+    end of that turn and the drones planned to fly each directed link
+    during that turn. A (hub, turn) or (link, turn) pair is packed into
+    a single integer key, `turn * size + id`, to avoid hashing tuples.
+
+    Attributes:
+        graph: Compiled hub graph the reservations refer to.
+        exempt: Ids of the hubs without a capacity limit (start and end
+            hubs, where the whole fleet waits or lands).
+        hubs: Reserved drones per packed (hub, turn) key.
+        links: Reserved drones per packed (edge, turn) key.
+        horizon: Last turn holding any reservation.
+    """
+    graph: Graph
+    exempt: set[int] = field(default_factory=set)
+    hubs: dict[int, int] = field(default_factory=dict)
+    links: dict[int, int] = field(default_factory=dict)
+    horizon: int = 0
+
+    def hub_free(self, hub: int, turn: int) -> bool:
+        """Whether one more drone can be in `hub` at the end of `turn`."""
+        if hub in self.exempt:
+            return True
+        key = turn * len(self.graph) + hub
+        return self.hubs.get(key, 0) < self.graph.max_drones[hub]
+
+    def link_free(self, edge: int, turn: int) -> bool:
+        """Whether one more drone can fly the directed `edge` in `turn`."""
+        key = turn * len(self.graph.targets) + edge
+        return self.links.get(key, 0) < self.graph.edge_capacity[edge]
+
+    def reserve_hub(self, hub: int, turn: int) -> None:
+        if hub in self.exempt:
+            return
+        key = turn * len(self.graph) + hub
+        self.hubs[key] = self.hubs.get(key, 0) + 1
+        self.horizon = max(self.horizon, turn)
+
+    def reserve_link(self, edge: int, turn: int) -> None:
+        key = turn * len(self.graph.targets) + edge
+        self.links[key] = self.links.get(key, 0) + 1
+        self.horizon = max(self.horizon, turn)
@@ -0,0 +1,73 @@
+from dataclasses import dataclass, field
+from typing import Iterable
+from .fleet import Fleet
+
+
+@dataclass
+class RouteIndex:
+    """
+    Reverse index from hubs and links to the drones of a fleet whose
+    current routes go through them.
+
+    Hubs and links point to route ids of the fleet's route table, and
+    each route id to the drones riding it. Routes are indexed the first
+    time a query follows their interning, and the riders are kept up to
+    date by assign() whenever a drone changes route, so a query costs the
+    size of its answer rather than the size of the fleet.
+
+    Attributes:
+        fleet: Fleet whose route table and route column are indexed.
+        riders: Drones riding every route, by route id.
+    """
+    fleet: Fleet
+    riders: list[set[int]] = field(default_factory=list)
+    _hub_routes: dict[int, list[int]] = field(
+        default_factory=dict, init=False, repr=False)
+    _link_routes: dict[int, list[int]] = field(
+        default_factory=dict, init=False, repr=False)
+    _indexed: int = field(default=0, init=False, repr=False)
+
+    @classmethod
+    def build(cls, fleet: Fleet, drones: Iterable[int]) -> 'RouteIndex':
+        """Indexes the current routes of the given drones of `fleet`."""
+        index = cls(fleet)
+        for drone in drones:
+            index.assign(drone, -1, fleet.route[drone])
+        return index
+
+    def assign(self, drone: int, old: int, new: int) -> None:
+        """Moves `drone` from route `old` (-1 for none) to route `new`."""
+        riders = self.riders
+        if old >= 0:
+            riders[old].discard(drone)
+        while len(riders) <= new:
+            riders.append(set())
+        riders[new].add(drone)
+
+    def drones_through(self, hubs: Iterable[int],
+                       links: Iterable[int]) -> list[int]:
+        """
+        Returns, in fleet order, the drones whose routes go through any of
+        `hubs` or `links` (edge positions), wherever they are on them.
+        """
+        self._catch_up()
+        routes: set[int] = set()
+        for hub in hubs:
+            routes.update(self._hub_routes.get(hub, ()))
+        for link in links:
+            routes.update(self._link_routes.get(link, ()))
+        drones: set[int] = set()
+        for route in routes:
+            if route < len(self.riders):
+                drones |= self.riders[route]
+        return sorted(drones)
+
+    def _catch_up(self) -> None:
+        """Indexes the routes interned since the last query."""
+        table = self.fleet.routes
+        for route in range(self._indexed, len(table)):
+            for hub in set(table.routes[route]):
+                self._hub_routes.setdefault(hub, []).append(route)
+            for link in set(table.links[route]):
+                self._link_routes.setdefault(link, []).append(route)
+        self._indexed = len(table)
@@ -0,0 +1,30 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class TurnEvent:
+    """
+    Everything that happened during one simulated turn.
+
+    Attributes:
+        turn: Turn number, starting at 1.
+        moves: (drone, from hub id, to hub id) of every move, in the
+            order the simulation settled them.
+        arrivals: Drones that landed on their end hub this turn.
+        waits: Drones that could have moved but found their next hub or
+            link full, or no route, in this turn. Drones sitting out a
+            restricted transit are not waiting, and a drone sleeping in
+            the TurnScheduler is only listed on the turn it fell asleep.
+    """
+    turn: int
+    moves: list[tuple[str, int, int]] = field(default_factory=list)
+    arrivals: list[str] = field(default_factory=list)
+    waits: list[str] = field(default_factory=list)
+
+    def occupancy_delta(self) -> dict[int, int]:
+        """Net change in the number of drones of every hub that changed."""
+        delta: dict[int, int] = {}
+        for _, source, target in self.moves:
+            delta[source] = delta.get(source, 0) - 1
+            delta[target] = delta.get(target, 0) + 1
+        return {hub: change for hub, change in delta.items() if change}
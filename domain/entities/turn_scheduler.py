@@ -0,0 +1,203 @@
+import bisect
+import heapq
+from typing import Iterable, Iterator, Sequence
+
+
+class TurnScheduler:
+    """
+    Event-driven active set of the simulation turn loop.
+
+    A turn only visits the drones that can act, in fleet order. The others
+    sleep until something that could let them act happens:
+
+    - a drone counting down a restricted transit sleeps for the turns of
+      the countdown (stall());
+    - a drone held back by a full link sleeps in the link's queue. Every
+      turn the first `capacity` drones of the queue wake, and a woken
+      drone that does not fly the link passes its turn to the next one;
+      the queue also wakes if its drones' next hub fills up, since they
+      would then replan (wait_link());
+    - a drone that found no route sleeps until any hub frees a place, as
+      the route search only fails against a set of full hubs that has
+      not shrunk (wait_stuck()).
+
+    A drone woken during a turn still acts in that turn if it comes later
+    in fleet order than the drone being settled, and in the next turn
+    otherwise, so the moves are exactly those of a loop over the whole
+    fleet. Waking is always safe; the wake-up rules only guarantee that a
+    sleeping drone would have waited anyway.
+
+    Attributes:
+        remaining: Drones not delivered yet.
+    """
+
+    def __init__(self, drones: Iterable[int]) -> None:
+        self._next: set[int] = set(drones)
+        self.remaining = len(self._next)
+        # Drones to visit this turn: the sorted ones activated before the
+        # turn, and a heap of the ones woken during it
+        self._order: list[int] = []
+        self._late: list[int] = []
+        self._queued: set[int] = set()
+        # Drone being settled, -1 before the first one; once the turn is
+        # over every wake-up goes to the next turn
+        self._current = -1
+        self._open = False
+        # Drones ending a restricted countdown, by turn
+        self._stalls: dict[int, list[int]] = {}
+        # Sleeping drones held by a full link: sorted queue per link, and
+        # the link and next hub of every such drone
+        self._link_queues: dict[int, list[int]] = {}
+        self._hub_waiters: dict[int, set[int]] = {}
+        self._waiting: dict[int, tuple[int, int]] = {}
+        # Drones woken from a link queue this turn, by drone
+        self._woken_from: dict[int, int] = {}
+        self._moved = -1
+        self._stuck: set[int] = set()
+
+    def begin_turn(self, turn: int,
+                   edge_capacity: Sequence[int]) -> list[int]:
+        """
+        Starts a turn: the drones activated during the previous turn and
+        the heads of the link queues become the drones to visit.
+
+        Args:
+            turn: Turn about to be settled.
+            edge_capacity: Capacity of every link, by edge position.
+
+        Returns:
+            The drones whose restricted countdown ends with this turn;
+            they act again in the next one.
+        """
+        self._order = sorted(self._next)
+        self._late = []
+        self._queued = self._next
+        self._next = set()
+        self._current = -1
+        self._open = True
+        self._woken_from.clear()
+        for link, waiters in list(self._link_queues.items()):
+            for drone in waiters[:edge_capacity[link]]:
+                self.wake(drone)
+                self._woken_from[drone] = link
+        stalled = self._stalls.pop(turn, [])
+        self._next.update(stalled)
+        return stalled
+
+    def __iter__(self) -> Iterator[int]:
+        """Yields the drones to settle this turn, in fleet order."""
+        order = self._order
+        late = self._late
+        woken_from = self._woken_from
+        pos = 0
+        while True:
+            if late and (pos == len(order) or late[0] < order[pos]):
+                drone = heapq.heappop(late)
+            elif pos < len(order):
+                drone = order[pos]
+                pos += 1
+            else:
+                break
+            self._current = drone
+            yield drone
+            if woken_from:
+                link = woken_from.pop(drone, -1)
+                if link >= 0 and self._moved != drone:
+                    # It did not fly the link: the next drone of the queue
+                    # may
+                    self._pass_link(link, drone)
+        self._open = False
+
+    def activate(self, drone: int) -> None:
+        """Visits `drone` again in the next turn."""
+        self._next.add(drone)
+
+    def moved(self, drone: int) -> None:
+        """Records that `drone` moved in this turn."""
+        self._moved = drone
+
+    def deliver(self, drone: int) -> None:
+        """Retires `drone`, which landed on its end hub."""
+        self.remaining -= 1
+
+    def stall(self, drone: int, turn: int) -> None:
+        """Puts `drone` to sleep until its countdown ends with `turn`."""
+        self._stalls.setdefault(turn, []).append(drone)
+
+    def wait_link(self, drone: int, link: int, hub: int) -> None:
+        """Puts `drone` to sleep until it may fly `link` into `hub`."""
+        bisect.insort(self._link_queues.setdefault(link, []), drone)
+        self._hub_waiters.setdefault(hub, set()).add(drone)
+        self._waiting[drone] = (link, hub)
+
+    def wait_stuck(self, drone: int) -> None:
+        """Puts `drone`, which found no route, to sleep."""
+        self._stuck.add(drone)
+
+    def hub_saturated(self, hub: int) -> None:
+        """Wakes the drones waiting for a link into `hub`, which is full."""
+        for drone in self._hub_waiters.pop(hub, ()):
+            self.wake(drone)
+
+    def hub_freed(self) -> None:
+        """Wakes the drones without a route, after a hub freed a place."""
+        stuck = self._stuck
+        if not stuck:
+            return
+        self._stuck = set()
+        # Woken in bulk, as any hub freeing a place wakes them all
+        if self._open:
+            current = self._current
+            queued = self._queued
+            later = [drone for drone in stuck
+                     if drone > current and drone not in queued]
+            if later:
+                queued.update(later)
+                self._late.extend(later)
+                heapq.heapify(self._late)
+            self._next.update(drone for drone in stuck if drone <= current)
+        else:
+            self._next.update(stuck)
+
+    def wake_all(self) -> None:
+        """Wakes every sleeping drone, after the map changed."""
+        for drone in list(self._waiting):
+            self.wake(drone)
+        self.hub_freed()
+
+    def wake(self, drone: int) -> None:
+        """
+        Visits `drone` later in this turn if it comes after the drone
+        being settled, or in the next turn otherwise.
+        """
+        waiting = self._waiting.pop(drone, None)
+        if waiting is not None:
+            link, hub = waiting
+            queue = self._link_queues[link]
+            queue.pop(bisect.bisect_left(queue, drone))
+            if not queue:
+                del self._link_queues[link]
+            waiters = self._hub_waiters.get(hub)
+            if waiters is not None:
+                waiters.discard(drone)
+                if not waiters:
+                    del self._hub_waiters[hub]
+        self._stuck.discard(drone)
+        if self._open and drone > self._current:
+            # The drones queued after the current one are still to visit
+            if drone not in self._queued:
+                self._queued.add(drone)
+                heapq.heappush(self._late, drone)
+        else:
+            self._next.add(drone)
+
+    def _pass_link(self, link: int, drone: int) -> None:
+        """Wakes the first drone after `drone` in the queue of `link`."""
+        queue = self._link_queues.get(link)
+        if not queue:
+            return
+        pos = bisect.bisect_right(queue, drone)
+        if pos < len(queue):
+            woken = queue[pos]
+            self.wake(woken)
+            self._woken_from[woken] = link
@@ -0,0 +1,81 @@
+# What a drone waits for
+HUB, LINK, ROUTE = 'hub', 'link', 'route'
+
+
+# Why a drone did not move: (hub it is in, HUB if its next hub is full,
+# LINK if its next link is full or ROUTE if no route to its end hub
+# exists, hub it waits to enter or its end hub, edge position it waits to
+# fly or -1)
+Wait = tuple[int, str, int, int]
+
+
+class WaitForGraph:
+    """
+    Wait-for graph of a running simulation: what every drone that could
+    not move waits for, kept across turns until the drone moves again.
+
+    A drone waiting to enter a full hub waits for the drones in that hub,
+    so the hub waits form a graph between hubs. A cycle in it is a set of
+    full hubs whose drones all wait to enter the next one, which is the
+    shape of a deadlock between drones going opposite ways. Recording a
+    wait costs O(1) and a cycle is searched in O(waits), only when a run
+    is diagnosed.
+
+    Attributes:
+        waits: Current wait of every waiting drone, by drone index.
+    """
+
+    def __init__(self) -> None:
+        self.waits: dict[int, Wait] = {}
+
+    def __len__(self) -> int:
+        return len(self.waits)
+
+    def wait_hub(self, drone: int, hub: int, target: int) -> None:
+        """Records `drone`, in `hub`, waiting to enter the full `target`."""
+        self.waits[drone] = (hub, HUB, target, -1)
+
+    def wait_link(self, drone: int, hub: int, target: int,
+                  link: int) -> None:
+        """Records `drone`, in `hub`, waiting to fly the full `link`."""
+        self.waits[drone] = (hub, LINK, target, link)
+
+    def wait_route(self, drone: int, hub: int, end: int) -> None:
+        """Records `drone`, in `hub`, finding no route to `end`."""
+        self.waits[drone] = (hub, ROUTE, end, -1)
+
+    def clear(self, drone: int) -> None:
+        """Forgets the wait of `drone`, which moved or found a route."""
+        self.waits.pop(drone, None)
+
+    def cycle(self) -> list[int]:
+        """
+        Returns the hubs of a cycle of hub waits, in wait order, or an
+        empty list if there is none.
+        """
+        edges: dict[int, set[int]] = {}
+        for hub, kind, target, _ in self.waits.values():
+            if kind == HUB:
+                edges.setdefault(hub, set()).add(target)
+
+        # Iterative depth-first search; `trail` holds the hubs of the
+        # current branch and their position in it
+        done: set[int] = set()
+        for root in sorted(edges):
+            if root in done:
+                continue
+            trail: dict[int, int] = {root: 0}
+            stack = [(root, iter(sorted(edges[root])))]
+            while stack:
+                hub, pending = stack[-1]
+                nxt = next(pending, None)
+                if nxt is None:
+                    stack.pop()
+                    del trail[hub]
+                    done.add(hub)
+                elif nxt in trail:
+                    return [h for h, _ in stack[trail[nxt]:]]
+                elif nxt not in done:
+                    trail[nxt] = len(stack)
+                    stack.append((nxt, iter(sorted(edges.get(nxt, ())))))
+        return []
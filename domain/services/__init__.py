@@ -1,5 +1,7 @@
 from .routing import RoutingService
 from .simulation import SimulationService
 from .drone_factory import DroneFactory
+from .fleet_planner import FleetPlanner
 
-__all__ = ['RoutingService', 'SimulationService', 'DroneFactory']
+__all__ = ['RoutingService', 'SimulationService', 'DroneFactory',
+           'FleetPlanner']
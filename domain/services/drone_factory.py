@@ -1,16 +1,44 @@
-from typing import Generator
-from domain.entities import Drone
+from typing import Generator, Iterable
+from domain.entities import Drone, Fleet, Graph, Mission, RouteTable
 
 
 class DroneFactory:
     """
     Factory class for creating Drone instances.
 
-    Provides methods to generate drones for simulation.
+    Provides methods to generate drones for simulation, either as Drone
+    objects or packed into a Fleet.
     """
 
     @staticmethod
     def generate_drones(nb_drones: int) \
             -> Generator[Drone, None, None]:
         for i in range(nb_drones):
-            yield Drone(id=f"D{i+1}", start_hub="", end_hub="")
+            yield Drone(id=f"D{i+1}", start_hub=-1, end_hub=-1)
+
+    @staticmethod
+    def generate_fleet(graph: Graph, start: int, end: int,
+                       nb_drones: int) -> Fleet:
+        """
+        Creates a fleet of `nb_drones` drones waiting at `start` to fly to
+        `end`, all on the empty route until a planner assigns one.
+        """
+        fleet = Fleet(RouteTable(graph))
+        unplanned = fleet.routes.intern(())
+        for _ in range(nb_drones):
+            fleet.add(start, end, unplanned)
+        return fleet
+
+    @staticmethod
+    def generate_missions(graph: Graph, missions: Iterable[Mission]) \
+            -> Fleet:
+        """
+        Creates the fleet of several missions, numbered in mission order,
+        each drone waiting at the start hub of its mission.
+        """
+        fleet = Fleet(RouteTable(graph))
+        unplanned = fleet.routes.intern(())
+        for mission in missions:
+            for _ in range(mission.nb_drones):
+                fleet.add(mission.start, mission.end, unplanned)
+        return fleet
@@ -0,0 +1,418 @@
+import heapq
+from array import array
+from typing import Iterable, Sequence
+from domain.entities import Fleet, Graph
+from domain.entities.graph import RESTRICTED
+from .routing import RoutingService
+
+
+INF = float('inf')
+
+# Arcs out of every node, then head, capacity and cost of every arc
+Network = tuple[list[list[int]], list[int], list[int], list[int]]
+
+# Candidate route sets of every (start, end) pair of a fleet
+Candidates = dict[tuple[int, int], list[list[list[int]]]]
+
+
+class FleetPlanner:
+    """
+    Service class that spreads a fleet over several disjoint routes.
+
+    Instead of sending every drone down the single shortest path, the
+    planner computes up to `max_routes` routes that share no hub besides
+    the start and the end (hence no link either), and assigns each drone
+    to the route where it is expected to land first, given the route's
+    length in turns and its throughput (the smallest `max_drones` or link
+    capacity along it). Routes that no drone would use are dropped.
+
+    The disjoint routes come from successive shortest paths on the
+    node-split flow network (Suurballe's algorithm generalised to k
+    paths), so each set of k routes has the lowest total routing cost.
+    The network is built once per graph. When a fleet has several
+    (start, end) pairs, the searches of every pair flying to the same end
+    hub are steered by that hub's cost-to-go field, computed once, so a
+    fleet with many origins costs one reverse search per destination plus
+    a directed search per pair. A fleet with a single pair runs plain
+    searches from its start: both find route sets of the same total cost,
+    but they break ties between such sets differently, and the plain
+    searches keep the routes single-mission maps have always been given.
+    """
+
+    def __init__(self,
+                 routing_service: RoutingService,
+                 max_routes: int = 4):
+        self.routing = routing_service
+        self.max_routes = max_routes
+        self._networks: dict[Graph, Network] = {}
+
+    def plan(
+        self,
+        graph: Graph,
+        start: int,
+        end: int,
+        nb_drones: int,
+    ) -> list[list[int]]:
+        """
+        Computes the route of every drone of the fleet.
+        The single shortest path from the routing service is always a
+        candidate, so the plan is never expected to be slower than
+        sending the whole fleet down that path.
+
+        Args:
+            graph: Compiled hub graph.
+            start: Id of the starting hub.
+            end: Id of the destination hub.
+            nb_drones: Number of drones to route.
+
+        Returns:
+            One path (list of hub ids) per drone, in drone order. Drones
+            on the same route share the same list. Paths are empty if the
+            end cannot be reached.
+        """
+        routes, assignment = self._plan(graph, start, end, nb_drones)
+        return [routes[r] for r in assignment]
+
+    def plan_fleet(
+        self,
+        graph: Graph,
+        fleet: Fleet,
+        candidates: Candidates | None = None,
+    ) -> None:
+        """
+        Assigns a route to every drone of `fleet`, in place, planning each
+        (start, end) pair of the fleet once. Routes are interned in the
+        fleet's route table.
+
+        Args:
+            graph: Compiled hub graph.
+            fleet: Fleet whose drones are waiting at their start hub.
+            candidates: Cache of candidate_table() for the pairs of the
+                fleet, read and filled in. It can be shared by graphs that
+                differ only in capacities, since the candidates depend on
+                zones alone.
+        """
+        pairs: dict[tuple[int, int], list[int]] = {}
+        for i in range(len(fleet)):
+            pair = (fleet.start_hub[i], fleet.end_hub[i])
+            pairs.setdefault(pair, []).append(i)
+        candidates = self.candidate_table(graph, pairs, candidates)
+
+        for (start, end), members in pairs.items():
+            routes, assignment = self._choose(
+                graph, candidates[(start, end)], len(members)
+            )
+            route_ids = [fleet.routes.intern(route) for route in routes]
+            for i, r in zip(members, assignment):
+                fleet.route[i] = route_ids[r]
+                fleet.path_idx[i] = 0
+                fleet.restricted[i] = 0
+
+    def _plan(
+        self,
+        graph: Graph,
+        start: int,
+        end: int,
+        nb_drones: int,
+    ) -> tuple[list[list[int]], Sequence[int]]:
+        """
+        Picks the best set of routes for `nb_drones` drones.
+
+        Returns:
+            The routes and, for every drone, the index of its route.
+        """
+        return self._choose(graph, self.candidate_routes(graph, start, end),
+                            nb_drones)
+
+    def candidate_table(
+        self,
+        graph: Graph,
+        pairs: Iterable[tuple[int, int]],
+        candidates: Candidates | None = None,
+    ) -> Candidates:
+        """
+        Computes the candidate routes of every (start, end) pair of a
+        fleet. The searches are steered by the cost-to-go field of each
+        end only when the fleet has several pairs, so a fleet with a
+        single pair keeps the route sets of plain searches.
+
+        Args:
+            graph: Compiled hub graph.
+            pairs: Every (start, end) pair of the fleet.
+            candidates: Table to fill in; pairs already in it are kept.
+
+        Returns:
+            The candidate_routes() of every pair, by pair.
+        """
+        pairs = sorted(set(pairs))
+        if candidates is None:
+            candidates = {}
+        for start, end in pairs:
+            if (start, end) not in candidates:
+                candidates[(start, end)] = self.candidate_routes(
+                    graph, start, end, guided=len(pairs) > 1
+                )
+        return candidates
+
+    def candidate_routes(
+        self,
+        graph: Graph,
+        start: int,
+        end: int,
+        guided: bool = False,
+    ) -> list[list[list[int]]]:
+        """
+        Computes the sets of routes a plan can choose from: the single
+        shortest path, then the k disjoint routes for k = 2..max_routes.
+        They only depend on the links and zones of the graph, not on hub
+        or link capacities nor on the size of the fleet.
+
+        Args:
+            graph: Compiled hub graph.
+            start: Id of the starting hub.
+            end: Id of the destination hub.
+            guided: Whether to steer the searches with the cost-to-go
+                field of `end`; candidate_table() sets it for fleets with
+                several pairs.
+
+        Returns:
+            The route sets, the shortest path alone first. That path is
+            empty if the end cannot be reached.
+        """
+        shortest = self.routing.find_path(graph, start, end)
+        if not shortest or start == end:
+            return [[shortest]]
+        return [[shortest]] + self._disjoint_routes(graph, start, end,
+                                                    guided)
+
+    def _choose(
+        self,
+        graph: Graph,
+        candidates: list[list[list[int]]],
+        nb_drones: int,
+    ) -> tuple[list[list[int]], Sequence[int]]:
+        """
+        Assigns the fleet to each candidate route set and keeps the one
+        with the lowest estimated makespan.
+        """
+        if len(candidates[0][0]) < 2:
+            return candidates[0], array('i', [0]) * nb_drones
+
+        best = self._assign(graph, candidates[0], nb_drones)
+        for routes in candidates[1:]:
+            candidate = self._assign(graph, routes, nb_drones)
+            if candidate[0] < best[0]:
+                best = candidate
+        return best[1], best[2]
+
+    @staticmethod
+    def route_turns(graph: Graph, route: list[int]) -> int:
+        """Turns a drone needs to fly `route` without waiting."""
+        zones = graph.zones
+        return sum(2 if zones[hub] == RESTRICTED else 1 for hub in route[1:])
+
+    @staticmethod
+    def route_throughput(graph: Graph, route: list[int]) -> int:
+        """
+        Drones per turn that can enter `route` (its bottleneck). The end
+        hub has no limit, so only the hubs in between and the links count.
+        """
+        max_drones = graph.max_drones
+        edge_capacity = graph.edge_capacity
+        throughput = min((max_drones[hub] for hub in route[1:-1]),
+                         default=edge_capacity[graph.edge(*route[:2])])
+        for a, b in zip(route, route[1:]):
+            throughput = min(throughput, edge_capacity[graph.edge(a, b)])
+        return max(throughput, 1)
+
+    def _assign(
+        self,
+        graph: Graph,
+        routes: list[list[int]],
+        nb_drones: int,
+    ) -> tuple[int, list[list[int]], Sequence[int]]:
+        """
+        Greedily gives each drone the route where it lands first.
+
+        Returns:
+            The estimated makespan, the routes, and the index of the route
+            of every drone.
+        """
+        turns = [self.route_turns(graph, route) for route in routes]
+        throughput = [self.route_throughput(graph, r) for r in routes]
+        loads = [0] * len(routes)
+
+        # Landing turn of the next drone on each route
+        queue = [(turns[r], r) for r in range(len(routes))]
+        heapq.heapify(queue)
+
+        assigned = array('i', [0]) * nb_drones
+        makespan = 0
+        for i in range(nb_drones):
+            finish, r = queue[0]
+            assigned[i] = r
+            loads[r] += 1
+            makespan = max(makespan, finish)
+            heapq.heapreplace(
+                queue, (turns[r] + loads[r] // throughput[r], r)
+            )
+        return makespan, routes, assigned
+
+    def _network(self, graph: Graph) -> Network:
+        """
+        Builds the node-split network of `graph`, once per graph: hub v
+        becomes an arc 2v -> 2v + 1 of capacity 1 (arc id 2v), and every
+        link u-v an arc 2u + 1 -> 2v of capacity 1 whose cost is the
+        routing weight of entering v. Every arc a has a residual twin
+        a ^ 1.
+
+        Returns:
+            The arcs out of every node, and the head, capacity and cost of
+            every arc.
+        """
+        network = self._networks.get(graph)
+        if network is not None:
+            return network
+
+        nb_nodes = 2 * len(graph)
+        head: list[int] = []
+        cap: list[int] = []
+        cost: list[int] = []
+        arcs: list[list[int]] = [[] for _ in range(nb_nodes)]
+
+        def add_arc(u: int, v: int, capacity: int, weight: int) -> None:
+            # Arc a and its residual twin a ^ 1
+            arcs[u].append(len(head))
+            head.append(v)
+            cap.append(capacity)
+            cost.append(weight)
+            arcs[v].append(len(head))
+            head.append(u)
+            cap.append(0)
+            cost.append(-weight)
+
+        for hub in range(len(graph)):
+            add_arc(2 * hub, 2 * hub + 1, 1, 0)
+        offsets, targets = graph.offsets, graph.targets
+        for hub in range(len(graph)):
+            for pos in range(offsets[hub], offsets[hub + 1]):
+                if graph.edge_cost[pos]:
+                    add_arc(2 * hub + 1, 2 * targets[pos], 1,
+                            graph.edge_cost[pos])
+
+        network = (arcs, head, cap, cost)
+        self._networks[graph] = network
+        return network
+
+    def _disjoint_routes(
+        self,
+        graph: Graph,
+        start: int,
+        end: int,
+        guided: bool,
+    ) -> list[list[list[int]]]:
+        """
+        Runs successive shortest paths on the node-split network of the
+        graph, where the start and end hubs may carry up to `max_routes`
+        routes.
+
+        When `guided`, the first potentials are the cost-to-go field of
+        the end hub, shared by every start flying there, so each Dijkstra
+        is directed towards the end, skips the hubs that cannot reach it
+        and stops as soon as the end is settled. Otherwise they start at
+        0 and each Dijkstra settles every node the start can reach.
+
+        Returns:
+            For k = 2..max_routes, the k hub-disjoint routes of minimum
+            total cost, until no further route exists.
+        """
+        arcs, head, capacity, cost = self._network(graph)
+        cap = list(capacity)
+        cap[2 * start] = cap[2 * end] = self.max_routes
+
+        # Reduced costs c + p(u) - p(v) start non-negative with p = -h,
+        # since h(u) <= c + h(v) along every arc, or with p = 0
+        if guided:
+            h = self.routing.cost_to_go(graph, end)
+            potential = [-h[node >> 1] for node in range(2 * len(graph))]
+        else:
+            potential = [0.0] * (2 * len(graph))
+
+        source, sink = 2 * start + 1, 2 * end
+        flow: set[int] = set()
+        results: list[list[list[int]]] = []
+        for k in range(1, self.max_routes + 1):
+            # Dijkstra on reduced costs, which stay non-negative
+            dist: dict[int, float] = {source: 0.0}
+            parent: dict[int, int] = {}
+            settled: list[int] = []
+            queue: list[tuple[float, int]] = [(0.0, source)]
+            while queue:
+                d, u = heapq.heappop(queue)
+                if d > dist[u]:
+                    continue
+                settled.append(u)
+                if u == sink and guided:
+                    break
+                for a in arcs[u]:
+                    if not cap[a]:
+                        continue
+                    v = head[a]
+                    if potential[v] == -INF:
+                        # The end cannot be reached from v
+                        continue
+                    nd = d + cost[a] + potential[u] - potential[v]
+                    if nd < dist.get(v, INF):
+                        dist[v] = nd
+                        parent[v] = a
+                        heapq.heappush(queue, (nd, v))
+            if sink not in parent:
+                break
+
+            # Shifting every potential by dist[sink] changes no reduced
+            # cost, so only the settled nodes need an update
+            shift = dist[sink] if guided else 0.0
+            for v in settled:
+                potential[v] += dist[v] - shift
+            v = sink
+            while v != source:
+                a = parent[v]
+                cap[a] -= 1
+                cap[a ^ 1] += 1
+                flow.add(a & ~1)
+                v = head[a ^ 1]
+
+            if k > 1:
+                results.append(self._decompose(head, cap, flow, start, end))
+        return results
+
+    @staticmethod
+    def _decompose(
+        head: list[int],
+        cap: list[int],
+        arcs: set[int],
+        start: int,
+        end: int,
+    ) -> list[list[int]]:
+        """
+        Splits the current flow into hub paths from start to end.
+        `arcs` holds every original arc that ever carried flow.
+        """
+        # An original arc (even index) carries flow if its twin has capacity
+        used = sorted(a for a in arcs if cap[a ^ 1])
+        flow: dict[int, list[int]] = {}
+        for a in used:
+            flow.setdefault(head[a ^ 1], []).append(a)
+
+        routes: list[list[int]] = []
+        while flow.get(2 * start + 1):
+            route = [start]
+            node = 2 * start + 1
+            while node != 2 * end:
+                a = flow[node].pop()
+                node = head[a]
+                route.append(node // 2)
+                if node != 2 * end:
+                    node = head[flow[node].pop()]
+            routes.append(route)
+        return routes
@@ -0,0 +1,624 @@
+import heapq
+from array import array
+from typing import AbstractSet, Sequence
+from domain.entities import Graph
+from domain.entities.graph import ROUTING_COST
+
+
+INF = float('inf')
+
+# An abstract arc: (hub, cost, whether the arc is a single link into
+# another cluster)
+Arc = tuple[int, float, bool]
+
+# Abstract arcs of every border hub of a cluster, ignoring blocked hubs
+BorderTable = dict[int, list[Arc]]
+
+# A search inside one cluster: cost and predecessor of every hub reached
+Tree = tuple[dict[int, float], dict[int, int]]
+
+
+class HierarchicalSearch:
+    """
+    Hierarchical pathfinding (HPA*) over a compiled graph.
+
+    Hubs are grouped into square clusters of `cluster_size` by their
+    coordinates. Hubs with a link leaving their cluster are border hubs,
+    and they form the abstract graph: a border hub is linked to the other
+    borders of its cluster by the cost of the cheapest path inside the
+    cluster, and to the borders of other clusters by its own links. A
+    query connects the start and the end to the borders of their
+    clusters, runs A* on the abstract graph and only then refines the
+    chosen border-to-border segments into hubs. A path that crosses
+    several clusters is a chain of segments that each stay inside one
+    cluster, so the result is as cheap as a flat search.
+
+    The abstract graph is built once per cluster, on first use, with no
+    hub blocked, and kept for the life of the search along with the hubs
+    of every segment. Blocked hubs only make segments longer, so those
+    costs are lower bounds: the abstract A* queues a segment whose path
+    crosses a blocked hub at that cost, and searches it again, inside its
+    cluster, only when it comes out of the queue. Those repaired
+    segments, and the searches joining the start and the end, are cached
+    until a hub of their cluster changes its blocked status, so a replan
+    pays for the clusters that changed on its way and nothing else. The
+    abstract A* is guided by the cost from every border to the end over
+    the unblocked abstract graph, computed once per end.
+
+    Attributes:
+        graph: Compiled hub graph the search runs on.
+        cluster_size: Side of a cluster, in coordinate units.
+        blocked: Ids of the hubs currently treated as impassable.
+        expansions: Number of hubs expanded since creation.
+    """
+
+    def __init__(self, graph: Graph, cluster_size: int) -> None:
+        self.graph = graph
+        self.cluster_size = max(1, cluster_size)
+        self.blocked: frozenset[int] = frozenset()
+        self.expansions = 0
+
+        size = self.cluster_size
+        coord_x, coord_y = graph.coord_x, graph.coord_y
+        cells: dict[tuple[int, int], int] = {}
+        self._cluster = array('q', [0]) * len(graph)
+        for hub in range(len(graph)):
+            cell = (coord_x[hub] // size, coord_y[hub] // size)
+            self._cluster[hub] = cells.setdefault(cell, len(cells))
+
+        offsets, targets, edge_cost = (graph.offsets, graph.targets,
+                                       graph.edge_cost)
+        cluster = self._cluster
+        self._borders: list[list[int]] = [[] for _ in range(len(cells))]
+        # Bounds of a single link for the A* heuristic: its largest step
+        # along one axis, along both axes, and its lowest cost
+        self._step = self._reach = 0
+        self._min_cost = min((cost for cost in edge_cost if cost),
+                             default=1)
+        for hub in range(len(graph)):
+            border = False
+            for pos in range(offsets[hub], offsets[hub + 1]):
+                neighbor = targets[pos]
+                border = border or cluster[neighbor] != cluster[hub]
+                dx = abs(coord_x[neighbor] - coord_x[hub])
+                dy = abs(coord_y[neighbor] - coord_y[hub])
+                self._step = max(self._step, dx, dy)
+                self._reach = max(self._reach, dx + dy)
+            if border:
+                self._borders[cluster[hub]].append(hub)
+
+        # Abstract arcs and the searches behind them, by cluster
+        self._tables: dict[int, BorderTable] = {}
+        # The same arcs less those between two borders that some third
+        # border of the cluster joins at the same cost
+        self._sparse: dict[int, BorderTable] = {}
+        self._dropped: dict[int, BorderTable] = {}
+        self._trees: dict[int, Tree] = {}
+        # Bumped whenever a hub of the cluster changes its blocked status
+        self._version = array('q', [0]) * len(cells)
+        # Blocked hubs of every cluster holding any
+        self._blocked_in: dict[int, set[int]] = {}
+        # Caches valid for one version of their cluster: (version, result)
+        self._segments: dict[tuple[int, int],
+                             tuple[int, float, list[int]]] = {}
+        self._arcs_from: dict[int,
+                              tuple[int, list[Arc], set[int]]] = {}
+        self._starts: dict[int, tuple[int, Tree]] = {}
+        self._ends: dict[int, tuple[int, Tree]] = {}
+        # Abstract arcs into every hub, and the heuristic of every end
+        self._into: dict[int, list[tuple[int, float]]] | None = None
+        self._fields: dict[int, dict[int, float]] = {}
+
+    def set_blocked(self, blocked: set[int] | frozenset[int]) -> None:
+        """
+        Replaces the set of impassable hubs, invalidating the cached
+        searches of the clusters holding the hubs that changed.
+
+        Args:
+            blocked: Ids of the hubs that cannot be entered.
+        """
+        changed = self.blocked.symmetric_difference(blocked)
+        if not changed:
+            return
+        self.blocked = frozenset(blocked)
+        cluster = self._cluster
+        for hub in changed:
+            home = cluster[hub]
+            self._version[home] += 1
+            inside = self._blocked_in.setdefault(home, set())
+            if hub in self.blocked:
+                inside.add(hub)
+            else:
+                inside.discard(hub)
+                if not inside:
+                    del self._blocked_in[home]
+
+    def _bound(self, hub: int, target: int) -> float:
+        """Lower bound of the cost from `hub` to `target`, by coordinates."""
+        if not self._step:
+            return 0.0
+        # Every link costs at least `_min_cost` and moves at most `_step`
+        # along an axis and `_reach` along both
+        graph = self.graph
+        dx = abs(graph.coord_x[hub] - graph.coord_x[target])
+        dy = abs(graph.coord_y[hub] - graph.coord_y[target])
+        return self._min_cost * max(max(dx, dy) / self._step,
+                                    (dx + dy) / self._reach)
+
+    def _local(
+        self,
+        source: int,
+        target: int = -1,
+        blocked: frozenset[int] | None = None,
+    ) -> Tree:
+        """
+        Search from `source` that never leaves its cluster: a Dijkstra
+        over the whole cluster, or an A* that stops at `target`. Hubs in
+        `blocked` (the current blocked set by default) are not entered.
+        """
+        graph = self.graph
+        offsets = graph.offsets
+        targets = graph.targets
+        edge_cost = graph.edge_cost
+        if blocked is None:
+            blocked = self.blocked
+        cluster = self._cluster
+        home = cluster[source]
+        bound = self._bound
+
+        dist: dict[int, float] = {source: 0.0}
+        parent: dict[int, int] = {}
+        queue: list[tuple[float, float, int]] = [(0.0, 0.0, source)]
+        while queue:
+            _, cost, hub = heapq.heappop(queue)
+            if cost > dist[hub]:
+                continue
+            self.expansions += 1
+            if hub == target:
+                break
+            for pos in range(offsets[hub], offsets[hub + 1]):
+                turn_cost = edge_cost[pos]
+                neighbor = targets[pos]
+                if (not turn_cost or cluster[neighbor] != home
+                        or neighbor in blocked):
+                    continue
+                new_cost = cost + turn_cost
+                if new_cost < dist.get(neighbor, INF):
+                    dist[neighbor] = new_cost
+                    parent[neighbor] = hub
+                    estimate = bound(neighbor, target) if target >= 0 \
+                        else 0.0
+                    heapq.heappush(queue, (new_cost + estimate, new_cost,
+                                           neighbor))
+        return dist, parent
+
+    def _local_to(self, end: int, blocked: frozenset[int]) -> Tree:
+        """
+        Reverse Dijkstra from `end` inside its cluster: the cost of
+        reaching `end` from every hub of the cluster, and the next hub
+        on the way. Hubs in `blocked` are not entered.
+        """
+        graph = self.graph
+        offsets = graph.offsets
+        targets = graph.targets
+        zones = graph.zones
+        closed = graph.closed
+        cluster = self._cluster
+        home = cluster[end]
+
+        dist: dict[int, float] = {end: 0.0}
+        following: dict[int, int] = {}
+        queue: list[tuple[float, int]] = [(0.0, end)]
+        while queue:
+            cost, hub = heapq.heappop(queue)
+            # Links are symmetric and every open edge into a hub costs its
+            # zone; a hub that cannot be entered is never on the way
+            enter = ROUTING_COST[zones[hub]]
+            if cost > dist[hub] or not enter:
+                continue
+            self.expansions += 1
+            cost += enter
+            for pos in range(offsets[hub], offsets[hub + 1]):
+                neighbor = targets[pos]
+                if (pos in closed
+                        or cluster[neighbor] != home
+                        or neighbor in blocked):
+                    continue
+                if cost < dist.get(neighbor, INF):
+                    dist[neighbor] = cost
+                    following[neighbor] = hub
+                    heapq.heappush(queue, (cost, neighbor))
+        return dist, following
+
+    def _to_end(self, end: int) -> Tree:
+        """_local_to under the current blocked set, cached per version."""
+        home = self._cluster[end]
+        cached = self._ends.get(end)
+        if cached is not None and cached[0] == self._version[home]:
+            return cached[1]
+        tree = self._local_to(end, self.blocked)
+        self._ends[end] = (self._version[home], tree)
+        return tree
+
+    def _from_start(self, start: int) -> Tree:
+        """The search over the cluster of `start`, cached as _to_end."""
+        home = self._cluster[start]
+        cached = self._starts.get(start)
+        if cached is not None and cached[0] == self._version[home]:
+            return cached[1]
+        tree = self._local(start)
+        self._starts[start] = (self._version[home], tree)
+        return tree
+
+    def _table(self, home: int) -> BorderTable:
+        """
+        The abstract arcs of a cluster with no hub blocked, computed on
+        first use along with the search from every border.
+        """
+        table = self._tables.get(home)
+        if table is not None:
+            return table
+
+        offsets = self.graph.offsets
+        targets = self.graph.targets
+        edge_cost = self.graph.edge_cost
+        cluster = self._cluster
+        borders = self._borders[home]
+        table = {}
+        for border in borders:
+            tree = self._local(border, blocked=frozenset())
+            self._trees[border] = tree
+            dist = tree[0]
+            arcs = [(other, dist[other], False) for other in borders
+                    if other != border and other in dist]
+            for pos in range(offsets[border], offsets[border + 1]):
+                neighbor = targets[pos]
+                if edge_cost[pos] and cluster[neighbor] != home:
+                    arcs.append((neighbor, edge_cost[pos], True))
+            table[border] = arcs
+        self._tables[home] = table
+
+        # A segment whose path runs through another border is the sum of
+        # two arcs, so the abstract search leaves it out while that path
+        # is clear; costs are positive, so the arcs it keeps still reach
+        # every border at the cost of the table
+        sparse = {}
+        dropped = {}
+        for border, arcs in table.items():
+            parent = self._trees[border][1]
+            inner = set(borders)
+            inner.discard(border)
+            via: dict[int, bool] = {border: False}
+            for other in borders:
+                # Walk up to the first hub known, then label the walk
+                walk = []
+                hub = other
+                while hub not in via:
+                    walk.append(hub)
+                    hub = parent[hub] if hub in parent else border
+                known = via[hub] or hub in inner
+                for hub in reversed(walk):
+                    via[hub] = known
+                    known = known or hub in inner
+            sparse[border] = [arc for arc in arcs
+                              if arc[2] or not via[arc[0]]]
+            dropped[border] = [arc for arc in arcs
+                               if not arc[2] and via[arc[0]]]
+        self._sparse[home] = sparse
+        self._dropped[home] = dropped
+        return table
+
+    def _arcs(self, home: int,
+              border: int) -> tuple[list[Arc], AbstractSet[int]]:
+        """
+        The arcs of the abstract search from a border: the sparse arcs of
+        its cluster, and back the dropped ones whose path is blocked.
+
+        Returns:
+            The arcs, and the borders whose arc has a blocked path and
+            not yet its true cost: the cost of their arc is a lower bound.
+        """
+        self._table(home)
+        inside = self._blocked_in.get(home)
+        if not inside:
+            return self._sparse[home][border], frozenset()
+        version = self._version[home]
+        cached = self._arcs_from.get(border)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+
+        parent = self._trees[border][1]
+        cut: dict[int, bool] = {border: False}
+
+        def blocked_path(hub: int) -> bool:
+            # Walk up to the first hub known, then label the walk
+            walk = []
+            while hub not in cut:
+                walk.append(hub)
+                hub = parent[hub]
+            known = cut[hub]
+            for hub in reversed(walk):
+                known = known or hub in inside
+                cut[hub] = known
+            return known
+
+        arcs = list(self._sparse[home][border])
+        pending = {arc[0] for arc in arcs
+                   if not arc[2] and blocked_path(arc[0])}
+        for arc in self._dropped[home][border]:
+            if blocked_path(arc[0]):
+                arcs.append(arc)
+                pending.add(arc[0])
+        self._arcs_from[border] = (version, arcs, pending)
+        return arcs, pending
+
+    def _field(self, end: int) -> dict[int, float]:
+        """
+        Cost from every border hub to `end` with no hub blocked, by a
+        reverse Dijkstra over the abstract graph, computed once per end.
+        It is a lower bound of the true cost, and the heuristic of the
+        abstract search.
+        """
+        field = self._fields.get(end)
+        if field is not None:
+            return field
+        if self._into is None:
+            # Reverse arcs of the whole abstract graph, built once
+            self._into = {}
+            for home in range(len(self._borders)):
+                for border, arcs in self._table(home).items():
+                    for hub, cost, _ in arcs:
+                        self._into.setdefault(hub, []).append((border,
+                                                               cost))
+        into = self._into
+
+        field = {}
+        inside = self._local_to(end, frozenset())[0]
+        queue = [(inside[hub], hub)
+                 for hub in self._borders[self._cluster[end]]
+                 if hub in inside]
+        heapq.heapify(queue)
+        while queue:
+            cost, hub = heapq.heappop(queue)
+            if hub in field:
+                continue
+            field[hub] = cost
+            self.expansions += 1
+            for border, arc_cost in into.get(hub, ()):
+                if border not in field:
+                    heapq.heappush(queue, (cost + arc_cost, border))
+        self._fields[end] = field
+        return field
+
+    def _segment(self, border: int, other: int) -> tuple[float, list[int]]:
+        """
+        Cost and hubs, `border` excluded, of the cheapest path between two
+        borders of one cluster under the current blocked set.
+        """
+        home = self._cluster[border]
+        version = self._version[home]
+        cached = self._segments.get((border, other))
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+
+        dist, parent = self._trees[border]
+        inside = self._blocked_in.get(home)
+        hubs = self._unwind(parent, border, other)
+        if inside and not inside.isdisjoint(hubs):
+            # The unblocked path is cut: search the cluster again
+            dist, parent = self._local(border, other)
+            hubs = (self._unwind(parent, border, other) if other in dist
+                    else [])
+        cost = dist.get(other, INF)
+        self._segments[(border, other)] = (version, cost, hubs)
+        if inside:
+            # The abstract search takes the true cost from now on
+            self._arcs(home, border)
+            _, arcs, pending = self._arcs_from[border]
+            if other in pending:
+                pending.discard(other)
+                for i, arc in enumerate(arcs):
+                    if arc[0] == other and not arc[2]:
+                        if cost == INF:
+                            del arcs[i]
+                        else:
+                            arcs[i] = (other, cost, False)
+                        break
+        return cost, hubs
+
+    @staticmethod
+    def _unwind(parent: dict[int, int], source: int,
+                hub: int) -> list[int]:
+        """Hubs from `source` (excluded) to `hub`, from a search tree."""
+        hubs = []
+        while hub != source:
+            hubs.append(hub)
+            hub = parent[hub]
+        return hubs[::-1]
+
+    def find_path(
+        self,
+        start: int,
+        end: int,
+        heuristic: Sequence[float] | None = None,
+    ) -> list[int]:
+        """
+        Returns a cheapest path from `start` to `end` under the current
+        blocked set.
+
+        Args:
+            start: Id of the starting hub.
+            end: Id of the destination hub.
+            heuristic: Admissible cost-to-go of every hub, for instance
+                RoutingService.cost_to_go; without it the abstract search
+                is guided by the hub coordinates.
+
+        Returns:
+            List of hub ids from start to end, or an empty list if the end
+            cannot be reached.
+        """
+        graph = self.graph
+        offsets = graph.offsets
+        targets = graph.targets
+        edge_cost = graph.edge_cost
+        blocked = self.blocked
+        cluster = self._cluster
+        if start == end:
+            return [start]
+        if end in blocked:
+            return []
+
+        to_end = self._to_end(end)[0]
+        # The start joins the abstract graph through its own cluster
+        # search, and through its links if it is a border hub itself
+        start_dist = self._from_start(start)[0]
+        home = cluster[start]
+        start_arcs = [(hub, start_dist[hub], False)
+                      for hub in self._borders[home]
+                      if hub != start and hub in start_dist]
+        if end in start_dist:
+            start_arcs.append((end, start_dist[end], False))
+        for pos in range(offsets[start], offsets[start + 1]):
+            neighbor = targets[pos]
+            if edge_cost[pos] and cluster[neighbor] != home:
+                start_arcs.append((neighbor, edge_cost[pos], True))
+
+        came_from = self._abstract(start, end, start_arcs, to_end,
+                                   heuristic)
+        if came_from is None:
+            return []
+        return self._refine(start, end, came_from)
+
+    def _abstract(
+        self,
+        start: int,
+        end: int,
+        start_arcs: list[Arc],
+        to_end: dict[int, float],
+        heuristic: Sequence[float] | None,
+    ) -> dict[int, tuple[int, bool]] | None:
+        """
+        A* over the abstract graph. An arc whose segment crosses a blocked
+        hub enters the queue at its unblocked cost, a lower bound, and its
+        segment is only searched again when that entry comes out first; a
+        hub is reached at its true cost alone, so the path is a cheapest
+        one.
+
+        Returns:
+            The abstract predecessor of every reached hub, and whether the
+            hub was reached by a single link rather than a cluster segment,
+            or None if the end cannot be reached.
+        """
+        blocked = self.blocked
+        cluster = self._cluster
+        sparse = self._sparse
+        blocked_in = self._blocked_in
+        end_cluster = cluster[end]
+        # Cost-to-go of every hub, flat or abstract; the end is never a
+        # key of the abstract one
+        field = self._field(end) if heuristic is None else {}
+
+        came_from: dict[int, tuple[int, bool]] = {}
+        cost_score: dict[int, float] = {start: 0.0}
+        # Ties on f go to the hub closest to the end, as in flat A*; an
+        # entry to settle carries the border it comes from, else -1
+        queue: list[tuple[float, float, float, int, int]] = [
+            (0.0, 0.0, 0.0, start, -1)
+        ]
+        while queue:
+            _, remaining, current_cost, current, source = \
+                heapq.heappop(queue)
+            if source >= 0:
+                # Lower bound of a blocked segment: search it, and queue
+                # the hub again at the true cost
+                if current_cost >= cost_score.get(current, INF):
+                    continue
+                true_cost = self._segment(source, current)[0]
+                new_cost = cost_score[source] + true_cost
+                if true_cost != INF and \
+                        new_cost < cost_score.get(current, INF):
+                    cost_score[current] = new_cost
+                    came_from[current] = (source, False)
+                    heapq.heappush(queue, (new_cost + remaining, remaining,
+                                           new_cost, current, -1))
+                continue
+            if current_cost > cost_score[current]:
+                # Stale entry, the hub was reached more cheaply since
+                continue
+            self.expansions += 1
+            if current == end:
+                return came_from
+
+            pending: AbstractSet[int] = frozenset()
+            if current == start:
+                arcs = start_arcs
+            else:
+                home = cluster[current]
+                if home in blocked_in or home not in sparse:
+                    arcs, pending = self._arcs(home, current)
+                else:
+                    arcs = sparse[home][current]
+                if home == end_cluster:
+                    # The search from the end replaces the segments into
+                    # it, with their true cost
+                    arcs = [arc for arc in arcs
+                            if arc[0] != end or arc[2]]
+                    if current in to_end:
+                        arcs.append((end, to_end[current], False))
+            for neighbor, cost, link in arcs:
+                if neighbor in blocked:
+                    continue
+                if heuristic is not None:
+                    remaining = heuristic[neighbor]
+                elif neighbor == end:
+                    remaining = 0.0
+                else:
+                    remaining = field.get(neighbor, INF)
+                if remaining == INF:
+                    continue
+                new_cost = current_cost + cost
+                if new_cost < cost_score.get(neighbor, INF):
+                    if neighbor in pending and neighbor != end:
+                        heapq.heappush(queue, (new_cost + remaining,
+                                               remaining, new_cost,
+                                               neighbor, current))
+                        continue
+                    cost_score[neighbor] = new_cost
+                    came_from[neighbor] = (current, link)
+                    heapq.heappush(queue, (new_cost + remaining, remaining,
+                                           new_cost, neighbor, -1))
+        return None
+
+    def _refine(
+        self,
+        start: int,
+        end: int,
+        came_from: dict[int, tuple[int, bool]],
+    ) -> list[int]:
+        """
+        Expands the abstract path ending at `end` into hubs, from the
+        searches behind its arcs: nothing is searched again.
+        """
+        pieces: list[list[int]] = []
+        hub = end
+        while hub != start:
+            previous, link = came_from[hub]
+            if link:
+                pieces.append([hub])
+            elif previous == start:
+                pieces.append(self._unwind(self._from_start(start)[1],
+                                           start, hub))
+            elif hub == end:
+                following = self._to_end(end)[1]
+                piece = []
+                while previous != end:
+                    previous = following[previous]
+                    piece.append(previous)
+                pieces.append(piece)
+            else:
+                pieces.append(self._segment(previous, hub)[1])
+            hub = came_from[hub][0]
+        path = [start]
+        for piece in reversed(pieces):
+            path += piece
+        return path
@@ -0,0 +1,192 @@
+import heapq
+import itertools
+from domain.entities import Graph
+
+
+INF = float('inf')
+
+
+class IncrementalSearch:
+    """
+    Goal-rooted Lifelong Planning A* (the D* Lite formulation) over a
+    compiled graph.
+
+    The search runs backwards from `goal`, so its state holds, for every
+    hub it has settled, the cost to reach the goal. That state is shared
+    by all drones flying to the same goal, whatever hub they replan from.
+    Between calls only the hubs whose blocked status changed are
+    invalidated, and the repair stops as soon as the requested start is
+    consistent again, so a replan touches the affected part of the map
+    instead of searching it from scratch.
+
+    Attributes:
+        graph: Compiled hub graph the search runs on.
+        goal: Id of the destination hub.
+        blocked: Ids of the hubs currently treated as impassable.
+        expansions: Number of hubs expanded since creation.
+    """
+
+    def __init__(self, graph: Graph, goal: int) -> None:
+        self.graph = graph
+        self.goal = goal
+        self.blocked: frozenset[int] = frozenset()
+        self.expansions = 0
+
+        # g: settled cost-to-goal, rhs: one-step lookahead of g
+        self._g: list[float] = [INF] * len(graph)
+        self._rhs: list[float] = [INF] * len(graph)
+        self._rhs[goal] = 0.0
+        self._queue: list[tuple[float, int]] = [(0.0, goal)]
+
+    def _lookahead(self, hub: int) -> float:
+        """Best cost-to-goal of `hub` through one of its neighbors."""
+        graph = self.graph
+        targets = graph.targets
+        edge_cost = graph.edge_cost
+        blocked = self.blocked
+        g = self._g
+
+        best = INF
+        for pos in range(graph.offsets[hub], graph.offsets[hub + 1]):
+            turn_cost = edge_cost[pos]
+            neighbor = targets[pos]
+            if not turn_cost or neighbor in blocked:
+                continue
+            cost = turn_cost + g[neighbor]
+            if cost < best:
+                best = cost
+        return best
+
+    def _update(self, hub: int) -> None:
+        """Recomputes the lookahead of `hub` and queues it if inconsistent."""
+        if hub != self.goal:
+            self._rhs[hub] = self._lookahead(hub)
+        g, rhs = self._g[hub], self._rhs[hub]
+        if g != rhs:
+            heapq.heappush(self._queue, (min(g, rhs), hub))
+
+    def _update_neighbors(self, hub: int) -> None:
+        """Queues every hub whose lookahead goes through `hub`."""
+        graph = self.graph
+        targets = graph.targets
+        for pos in range(graph.offsets[hub], graph.offsets[hub + 1]):
+            self._update(targets[pos])
+
+    def set_blocked(self, blocked: set[int] | frozenset[int]) -> None:
+        """
+        Replaces the set of impassable hubs, invalidating only the hubs
+        adjacent to those whose status changed.
+
+        Args:
+            blocked: Ids of the hubs that cannot be entered.
+        """
+        changed = self.blocked.symmetric_difference(blocked)
+        if not changed:
+            return
+        self.blocked = frozenset(blocked)
+        for hub in changed:
+            self._update_neighbors(hub)
+
+    def _repair(self, start: int) -> None:
+        """
+        Processes queued hubs until `start` is consistent and no queued hub
+        could still lower its cost.
+        """
+        g, rhs = self._g, self._rhs
+        queue = self._queue
+        while queue:
+            key, hub = queue[0]
+            start_key = min(g[start], rhs[start])
+            if key >= start_key and g[start] == rhs[start]:
+                break
+            heapq.heappop(queue)
+
+            # Skip entries left behind by a later key change
+            if g[hub] == rhs[hub] or key != min(g[hub], rhs[hub]):
+                continue
+
+            self.expansions += 1
+            if g[hub] > rhs[hub]:
+                g[hub] = rhs[hub]
+                self._update_neighbors(hub)
+            else:
+                g[hub] = INF
+                self._update(hub)
+                self._update_neighbors(hub)
+
+    def cost(self, start: int) -> float:
+        """Returns the cost from `start` to the goal (inf if unreachable)."""
+        self._repair(start)
+        return self._g[start]
+
+    def find_path(self, start: int, h: list[float]) -> list[int]:
+        """
+        Returns the cheapest path from `start` to the goal under the current
+        blocked set, the very path a fresh A* search guided by `h` returns.
+
+        It runs the same A* loop, keys and tie-breaks, but only relaxes
+        the links that lie on some cheapest path, which the settled costs
+        tell apart. A* only sets a hub's predecessor from a hub on a
+        cheapest path, and only the order those hubs are expanded in
+        decides it, so the other hubs can be left out without changing the
+        result, and the search walks the cheapest paths only.
+
+        Args:
+            start: Id of the starting hub.
+            h: Cost-to-go of every hub with nothing blocked, the heuristic
+                of the A* search to match.
+
+        Returns:
+            List of hub ids from start to the goal, or an empty list if the
+            goal cannot be reached.
+        """
+        goal = self.goal
+        if start != goal and goal in self.blocked:
+            return []
+        total = self.cost(start)
+        if total == INF or h[start] == INF:
+            return []
+
+        graph = self.graph
+        offsets = graph.offsets
+        targets = graph.targets
+        edge_cost = graph.edge_cost
+        blocked = self.blocked
+        # Every hub settled below `total` holds its exact cost-to-goal
+        g = self._g
+
+        counter = itertools.count()
+        queue: list[tuple[float, float, int, int]] = [
+            (h[start], h[start], next(counter), start)
+        ]
+        came_from: dict[int, int] = {}
+        cost_score: dict[int, float] = {start: 0.0}
+        while queue:
+            estimated_cost, remaining, _, current = heapq.heappop(queue)
+            if estimated_cost - remaining > cost_score[current]:
+                continue
+            self.expansions += 1
+            if current == goal:
+                path: list[int] = []
+                while current in came_from:
+                    path.append(current)
+                    current = came_from[current]
+                path.append(start)
+                return path[::-1]
+
+            current_cost = cost_score[current]
+            for pos in range(offsets[current], offsets[current + 1]):
+                turn_cost = edge_cost[pos]
+                if not turn_cost:
+                    continue
+                neighbor = targets[pos]
+                new_cost = current_cost + turn_cost
+                if neighbor in blocked or new_cost + g[neighbor] != total:
+                    continue
+                remaining = h[neighbor]
+                if new_cost < cost_score.get(neighbor, INF):
+                    came_from[neighbor] = current
+                    cost_score[neighbor] = new_cost
+                    heapq.heappush(queue, (new_cost + remaining, remaining,
+                                           next(counter), neighbor))
+        return []
@@ -1,6 +1,11 @@
 import heapq
 import itertools
-from domain.entities import Hub, Zones
+import time
+from domain.entities import Graph, ReservationTable
+from domain.entities.graph import BLOCKED, RESTRICTED, ROUTING_COST
+from utils import Metrics
+from .hierarchical import HierarchicalSearch
+from .incremental import IncrementalSearch
 
 
 class RoutingService:
@@ -8,35 +13,106 @@ class RoutingService:
     Service class for pathfinding and routing between hubs.
 
     Provides methods to find optimal paths considering zone types,
-    movement costs, and blocked zones for drone simulation.
+    movement costs, and blocked zones for drone simulation. A* is guided
+    by the exact cost-to-go of every hub, computed once per destination.
+
+    In incremental mode the service keeps one goal-rooted
+    `IncrementalSearch` per (graph, destination) between calls, and each
+    call only repairs the part of it affected by hubs that became
+    occupied or free since the previous call.
+
+    With a `cluster_size`, find_path runs a `HierarchicalSearch` per graph
+    instead (HPA*): the map is cut into clusters of hubs by coordinates,
+    and a call searches the graph of cluster borders without any per-end
+    precomputation over the whole map.
+
+    `plan_cooperative` plans through (hub, turn) states instead, against a
+    reservation table shared by the whole fleet, so the resulting
+    schedules never conflict and can be played back without pathfinding.
+
+    Attributes:
+        incremental: Whether find_path reuses search state between calls.
+        cluster_size: Side of the hierarchical clusters, in coordinate
+            units, or 0 for a flat search.
+        expansions: Number of hubs expanded by all searches so far.
+        metrics: Optional collector timing every find_path call.
     """
 
-    def _heuristic(self, node: Hub, end: Hub) -> float:
+    def __init__(self, incremental: bool = False,
+                 metrics: Metrics | None = None,
+                 cluster_size: int = 0) -> None:
+        self.incremental = incremental
+        self.cluster_size = cluster_size
+        self.expansions = 0
+        self.metrics = metrics
+        self._hierarchies: dict[Graph, HierarchicalSearch] = {}
+        self._searches: dict[tuple[Graph, int], IncrementalSearch] = {}
+        self._turns_to_goal: dict[tuple[Graph, int], list[float]] = {}
+        self._cost_to_go: dict[tuple[Graph, int], list[float]] = {}
+
+    def cost_to_go(self, graph: Graph, end: int) -> list[float]:
         """
-        Calculates the Manhattan distance between two hubs for the A* algorithm
-        This heuristic estimates the cost from a node to the goal, guiding the
-        search toward the shortest path. Manhattan distance is the sum of the
-        absolute differences of the coordinates.
+        Returns, for every hub, the exact routing cost of the cheapest path
+        to `end` when no hub is occupied (infinite if there is none).
+        Computed once per (graph, end) with a reverse Dijkstra and cached.
+
+        Occupied hubs can only make a path longer, so the field is an
+        admissible and consistent A* heuristic for any occupancy set, and
+        with it A* only expands hubs that lie on a cheapest path.
 
         Args:
-            node: Hub object representing the current location.
-            end: Hub object representing the destination.
+            graph: Compiled hub graph.
+            end: Id of the destination hub.
 
         Returns:
-            The Manhattan distance between the two nodes as a float.
+            The cost-to-go of every hub id.
         """
-        (x1, y1) = node.coord
-        (x2, y2) = end.coord
-        return abs(x2 - x1) + abs(y2 - y1)
+        field = self._cost_to_go.get((graph, end))
+        if field is not None:
+            return field
+
+        offsets = graph.offsets
+        targets = graph.targets
+        zones = graph.zones
+        closed = graph.closed
+
+        field = [float('inf')] * len(graph)
+        field[end] = 0.0
+        queue: list[tuple[float, int]] = [(0.0, end)]
+        while queue:
+            cost, hub = heapq.heappop(queue)
+            # Every open edge into a hub costs the same, the zone of the hub
+            enter = ROUTING_COST[zones[hub]]
+            if cost > field[hub] or not enter:
+                continue
+            cost += enter
+            # Links are symmetric, so a hub's row lists the hubs that enter
+            # it, and a link is closed both ways
+            for pos in range(offsets[hub], offsets[hub + 1]):
+                if pos in closed:
+                    continue
+                neighbor = targets[pos]
+                if cost < field[neighbor]:
+                    field[neighbor] = cost
+                    heapq.heappush(queue, (cost, neighbor))
+        self._cost_to_go[(graph, end)] = field
+        return field
+
+    def forget(self, graph: Graph) -> None:
+        """Drops the search state cached for `graph`."""
+        for cache in (self._searches, self._turns_to_goal,
+                      self._cost_to_go):
+            for key in [key for key in cache if key[0] is graph]:
+                del cache[key]
+        self._hierarchies.pop(graph, None)
 
     def find_path(
         self,
-        hubs: dict[str, Hub],
-        adjacencies: dict[str, list[str]],
-        start: Hub,
-        end: Hub,
-        occupancy: set[str] | None = None
-    ) -> list[str]:
+        graph: Graph,
+        start: int,
+        end: int,
+        occupancy: set[int] | None = None
+    ) -> list[int]:
         """
         Finds the optimal path between two hubs using the A* algorithm.
         Considers zone types and movement costs, avoids blocked zones, and
@@ -44,73 +120,324 @@ class RoutingService:
         shortest valid route.
 
         Args:
-            hubs: Dictionary of hub names to their information.
-            adjacencies: Graph structure mapping each hub to its neighbors.
-            start: Name of the starting hub.
-            end: Name of the destination hub.
+            graph: Compiled hub graph.
+            start: Id of the starting hub.
+            end: Id of the destination hub.
+            occupancy: Ids of the hubs that cannot be entered.
 
         Returns:
-            List of hub *names* (strings) representing the optimal path from
-            start to end. Returns an empty list if no path exists.
+            List of hub ids representing the optimal path from start to end.
+            Returns an empty list if no path exists.
         """
+        if self.cluster_size:
+            search = self._find_path_hierarchical
+        elif self.incremental:
+            search = self._find_path_incremental
+        else:
+            search = self._find_path_astar
+        metrics = self.metrics
+        if metrics is None:
+            return search(graph, start, end, occupancy)
+
+        started = time.perf_counter()
+        expansions = self.expansions
+        path = search(graph, start, end, occupancy)
+        metrics.route_call(time.perf_counter() - started,
+                           self.expansions - expansions, bool(path))
+        return path
+
+    def _find_path_astar(
+        self,
+        graph: Graph,
+        start: int,
+        end: int,
+        occupancy: set[int] | None,
+    ) -> list[int]:
+        """A* search from start to end; see find_path."""
+        offsets = graph.offsets
+        targets = graph.targets
+        edge_cost = graph.edge_cost
+        h = self.cost_to_go(graph, end)
+        if h[start] == float('inf'):
+            return []
+
+        # Ties on f go to the hub closest to the goal, so with an exact
+        # heuristic the search walks straight down one cheapest path
         counter = itertools.count()
-        queue: list[tuple[float, int, Hub]] = [(0.0, next(counter), start)]
+        queue: list[tuple[float, float, int, int]] = [
+            (h[start], h[start], next(counter), start)
+        ]
 
-        came_from: dict[str, str] = {}
-        cost_score: dict[str, float] = {hub: float('inf')
-                                        for hub in adjacencies}
-        cost_score[start.name] = 0.0
+        # Only the hubs reached so far get an entry; any other hub has an
+        # infinite cost, so a call never pays for the size of the map
+        came_from: dict[int, int] = {}
+        cost_score: dict[int, float] = {start: 0.0}
 
         while queue:
 
             # heapq is a module for priority queues
             # Pop the hub with the lowest cost; in the
             # first iteration, it will pop start (predefined)
-            _, _, current_hub = heapq.heappop(queue)
+            estimated_cost, remaining, _, current = heapq.heappop(queue)
+            if estimated_cost - remaining > cost_score[current]:
+                # Stale entry, the hub was reached more cheaply since
+                continue
+            self.expansions += 1
 
             # If the current hub is the end, we have found
             # the shortest path
-            if current_hub == end:
-                path: list[str] = []
-                current_name = current_hub.name
-                while current_name in came_from:
-                    path.append(current_name)
-                    current_name = came_from[current_name]
-                # Finally, add start name
-                path.append(start.name)
+            if current == end:
+                path: list[int] = []
+                while current in came_from:
+                    path.append(current)
+                    current = came_from[current]
+                # Finally, add start
+                path.append(start)
                 return path[::-1]
 
-            # Adjacencies is the graph of hubs {hub: neighbors}
-            for neighbor in adjacencies.get(current_hub.name, []):
-                neighbor_hub = hubs[neighbor]
-                # If the zone is blocked, skip it
-                if neighbor_hub.zone == Zones.BLOCKED:
+            current_cost = cost_score[current]
+            for pos in range(offsets[current], offsets[current + 1]):
+                # Cost according to the zone of the neighbor; 0 if blocked
+                turn_cost = edge_cost[pos]
+                if not turn_cost:
                     continue
+                neighbor = targets[pos]
                 if occupancy and neighbor in occupancy:
                     continue
+                # Hubs that cannot reach the goal are never worth entering
+                remaining = h[neighbor]
+                if remaining == float('inf'):
+                    continue
 
-                # Calculate cost according to zone. Not turns, just cost
-                if neighbor_hub.zone == Zones.PRIORITY:
-                    turn_cost = 1
-                elif neighbor_hub.zone == Zones.RESTRICTED:
-                    turn_cost = 5
-                else:
-                    turn_cost = 2
-
-                # Calculate the cost for all
-                new_cost = cost_score[current_hub.name] + turn_cost
                 # Only enter those that are less than the previous
-                if new_cost < cost_score[neighbor]:
-                    came_from[neighbor] = current_hub.name
+                new_cost = current_cost + turn_cost
+                if new_cost < cost_score.get(neighbor, float('inf')):
+                    came_from[neighbor] = current
                     cost_score[neighbor] = new_cost
 
-                    # Estimate what the cost is
-                    estimated_cost = new_cost + self._heuristic(
-                        neighbor_hub, end
-                    )
-                    # Add the hub with the lowest cost to the queue
-                    heapq.heappush(
-                        queue, (estimated_cost, next(counter), neighbor_hub)
-                    )
+                    # Add the hub with the lowest estimated cost to the queue
+                    heapq.heappush(queue, (new_cost + remaining, remaining,
+                                           next(counter), neighbor))
 
         return []
+
+    def _find_path_incremental(
+        self,
+        graph: Graph,
+        start: int,
+        end: int,
+        occupancy: set[int] | None
+    ) -> list[int]:
+        """
+        Answers find_path from the cached search rooted at `end`, creating
+        it on first use.
+        """
+        search = self._searches.get((graph, end))
+        if search is None:
+            search = IncrementalSearch(graph, end)
+            self._searches[(graph, end)] = search
+
+        before = search.expansions
+        search.set_blocked(occupancy or frozenset())
+        path = search.find_path(start, self.cost_to_go(graph, end))
+        self.expansions += search.expansions - before
+        return path
+
+    def _find_path_hierarchical(
+        self,
+        graph: Graph,
+        start: int,
+        end: int,
+        occupancy: set[int] | None
+    ) -> list[int]:
+        """
+        Answers find_path from the cached hierarchy of `graph`, creating it
+        on first use. The exact cost-to-go of `end` guides the abstract
+        search when it is already cached, but it is never computed for it.
+        """
+        search = self._hierarchies.get(graph)
+        if search is None:
+            search = HierarchicalSearch(graph, self.cluster_size)
+            self._hierarchies[graph] = search
+
+        before = search.expansions
+        search.set_blocked(occupancy or frozenset())
+        path = search.find_path(start, end,
+                                self._cost_to_go.get((graph, end)))
+        self.expansions += search.expansions - before
+        return path
+
+    def turns_to_goal(self, graph: Graph, end: int) -> list[float]:
+        """
+        Returns, for every hub, the fewest turns needed to reach `end` when
+        nothing is in the way (restricted hubs take 2 turns to enter), or
+        infinity if no open link leads there. Computed once per (graph,
+        end) with a reverse Dijkstra and cached.
+        """
+        field = self._turns_to_goal.get((graph, end))
+        if field is not None:
+            return field
+
+        offsets = graph.offsets
+        targets = graph.targets
+        zones = graph.zones
+        edge_capacity = graph.edge_capacity
+        closed = graph.closed
+
+        field = [float('inf')] * len(graph)
+        field[end] = 0.0
+        queue: list[tuple[float, int]] = [(0.0, end)]
+        while queue:
+            turns, hub = heapq.heappop(queue)
+            if turns > field[hub] or zones[hub] == BLOCKED:
+                continue
+            # Links are symmetric: the edges out of hub are the reverses
+            # of the edges into it, with the same capacity, and closed
+            # both ways
+            duration = 2 if zones[hub] == RESTRICTED else 1
+            for pos in range(offsets[hub], offsets[hub + 1]):
+                if not edge_capacity[pos] or pos in closed:
+                    continue
+                neighbor = targets[pos]
+                if turns + duration < field[neighbor]:
+                    field[neighbor] = turns + duration
+                    heapq.heappush(queue, (turns + duration, neighbor))
+        self._turns_to_goal[(graph, end)] = field
+        return field
+
+    def plan_cooperative(
+        self,
+        graph: Graph,
+        start: int,
+        end: int,
+        table: ReservationTable,
+        start_turn: int = 0,
+    ) -> tuple[list[int], list[int]]:
+        """
+        Plans the earliest conflict-free arrival of one drone with A* over
+        (hub, turn) states and reserves it in the shared table.
+        Each turn a drone either waits in its hub, which must stay under
+        `max_drones` at the end of the turn, or flies one link, which must
+        stay under its capacity. Entering a restricted hub takes 2 turns,
+        during which both the link and the target hub are held.
+
+        Nothing is reserved after the table's horizon, and a lone drone
+        needs at most 2 turns per hub, so a drone that can land at all
+        lands within 2 turns per hub of it: the search stops there
+        instead of waiting forever for a link or hub that never frees.
+
+        Args:
+            graph: Compiled hub graph.
+            start: Id of the starting hub.
+            end: Id of the destination hub.
+            table: Reservations of the drones planned so far.
+            start_turn: Turn at which the drone is at `start`.
+
+        Returns:
+            The path (hub ids, without waits) and, for each of its hubs,
+            the turn at which the drone is in it. Both are empty if the
+            destination cannot be reached.
+        """
+        h = self.turns_to_goal(graph, end)
+        if h[start] == float('inf'):
+            return [], []
+
+        offsets = graph.offsets
+        targets = graph.targets
+        edge_cost = graph.edge_cost
+        zones = graph.zones
+        size = len(graph)
+        deadline = max(start_turn, table.horizon) + 2 * size
+
+        counter = itertools.count()
+        queue: list[tuple[float, int, int, int]] = [
+            (start_turn + h[start], start_turn, next(counter), start)
+        ]
+        came_from: dict[int, int] = {}
+        closed: set[int] = set()
+
+        while queue:
+            _, turn, _, hub = heapq.heappop(queue)
+            state = turn * size + hub
+            if state in closed:
+                continue
+            closed.add(state)
+            self.expansions += 1
+
+            if hub == end:
+                path, schedule = self._unwind(came_from, state, size)
+                self._reserve(graph, table, path, schedule)
+                return path, schedule
+
+            # Wait one turn where we are
+            if turn + h[hub] < deadline and table.hub_free(hub, turn + 1):
+                waited = (turn + 1) * size + hub
+                if waited not in closed:
+                    came_from.setdefault(waited, state)
+                    heapq.heappush(queue, (turn + 1 + h[hub], turn + 1,
+                                           next(counter), hub))
+
+            # Or fly to a neighbor, holding link and hub while in transit
+            for pos in range(offsets[hub], offsets[hub + 1]):
+                if not edge_cost[pos]:
+                    continue
+                neighbor = targets[pos]
+                duration = 2 if zones[neighbor] == RESTRICTED else 1
+                if turn + duration + h[neighbor] > deadline:
+                    # Also skips the hubs that cannot reach the end
+                    continue
+                if not all(table.link_free(pos, turn + k)
+                           and table.hub_free(neighbor, turn + k)
+                           for k in range(1, duration + 1)):
+                    continue
+                arrival = turn + duration
+                reached = arrival * size + neighbor
+                if reached in closed:
+                    continue
+                came_from.setdefault(reached, state)
+                heapq.heappush(queue, (arrival + h[neighbor], arrival,
+                                       next(counter), neighbor))
+
+        return [], []
+
+    @staticmethod
+    def _unwind(
+        came_from: dict[int, int],
+        state: int,
+        size: int,
+    ) -> tuple[list[int], list[int]]:
+        """Turns a chain of (hub, turn) states into a path and schedule."""
+        states = [state]
+        while states[-1] in came_from:
+            states.append(came_from[states[-1]])
+        states.reverse()
+
+        path: list[int] = []
+        schedule: list[int] = []
+        for state in states:
+            turn, hub = divmod(state, size)
+            if path and path[-1] == hub:
+                continue
+            path.append(hub)
+            schedule.append(turn)
+        return path, schedule
+
+    @staticmethod
+    def _reserve(
+        graph: Graph,
+        table: ReservationTable,
+        path: list[int],
+        schedule: list[int],
+    ) -> None:
+        """Books every hub and link a scheduled path holds."""
+        for i in range(1, len(path)):
+            hub, previous = path[i], path[i - 1]
+            edge = graph.edge(previous, hub)
+            duration = 2 if graph.zones[hub] == RESTRICTED else 1
+            departure = schedule[i] - duration + 1
+            # Waiting in the previous hub until departure
+            for turn in range(schedule[i - 1] + 1, departure):
+                table.reserve_hub(previous, turn)
+            for turn in range(departure, schedule[i] + 1):
+                table.reserve_link(edge, turn)
+                table.reserve_hub(hub, turn)
@@ -1,7 +1,17 @@
-from typing import Any
-from domain.entities import Zones, Drone, Hub
+import asyncio
+import heapq
+import itertools
+import time
+from typing import AsyncIterator, Callable, Iterable, Iterator, Sequence
+from domain.entities import (Drone, Fleet, Graph, MapChange,
+                             OccupancyLedger, ProgressMonitor,
+                             ReservationTable, RouteIndex, RunLimits,
+                             SimulationStalled, TurnEvent, TurnScheduler)
+from domain.entities.graph import RESTRICTED
+from domain.entities.progress_monitor import DEADLOCK
 from domain.services import RoutingService
-from utils import Color, COLOR_MAP
+from utils import (Checkpointer, ColorTerminalWriter, Metrics, TurnMetrics,
+                   TurnWriter)
 
 
 class SimulationService:
@@ -9,131 +19,586 @@ class SimulationService:
     Service class for simulating drone movements and turns.
 
     Manages occupancy, restricted zones, link capacities, and outputs
-    simulation steps in the required format with color feedback.
+    simulation steps in the required format through a turn writer
+    (colored terminal output by default). An OccupancyLedger follows the
+    drones in every hub across turns, so a drone that stays put counts
+    against `max_drones` until it leaves. A TurnScheduler keeps the
+    drones able to act, so a turn costs what happens in it rather than
+    the size of the fleet: drones in a restricted transit, queued behind
+    a full link or without any route sleep until something lets them act.
+
+    The turn loop runs on the struct-of-arrays columns of a Fleet, so a
+    large fleet costs a few bytes per drone: iter_turns packs Drone
+    objects into one and writes the state of the run back into them when
+    it ends.
+
+    Blocked drones are replanned through the routing service, which by
+    default keeps its search state between replans (incremental mode).
+    Alternatively, `simulate_cooperative` plans every drone up front
+    against a shared reservation table and only plays the schedules back.
+
+    When a Metrics collector is given, every turn of simulate_turns is
+    recorded and each wait is attributed to the hub or link that caused
+    it; without one the service keeps a few local counters per turn only.
+
+    When a Checkpointer is given, the service offers it the fleet state
+    between turns. A run resumes from a saved state by passing the saved
+    fleet and turn to simulate_fleet.
+
+    The map of a running simulation can change between turns through
+    apply_change(), right away or once a given turn is reached. Drones
+    whose remaining route goes through a hub that became blocked or a
+    link that was closed are found through a RouteIndex, built on the
+    first change, and replanned before they move; a drone with no route
+    left waits and retries once a hub frees a place. Other changes take
+    effect through the usual waits and replans.
+
+    A ProgressMonitor keeps the wait-for graph of the run and stops it
+    with a SimulationStalled error, naming the drones and hubs involved,
+    when it deadlocks, stops landing drones or exceeds its RunLimits.
     """
-    routing_service = RoutingService()
+
+    def __init__(self,
+                 routing_service: RoutingService | None = None,
+                 writer: TurnWriter | None = None,
+                 metrics: Metrics | None = None,
+                 checkpointer: Checkpointer | None = None,
+                 limits: RunLimits | None = None):
+        self.routing_service = routing_service or RoutingService(
+            incremental=True
+        )
+        self.writer = writer or ColorTerminalWriter()
+        self.metrics = metrics
+        self.checkpointer = checkpointer
+        self.limits = limits or RunLimits()
+        self._changes: list[MapChange] = []
+        # Changes waiting for their turn: (turn, order queued, change)
+        self._scheduled: list[tuple[int, int, MapChange]] = []
+        self._queued = itertools.count()
+
+    def apply_change(self, change: MapChange,
+                     after_turn: int | None = None) -> None:
+        """
+        Queues a map change for the running simulation; it applies before
+        the next turn is computed, or before the turn after `after_turn`.
+        A run does not count as deadlocked while a change is scheduled.
+
+        Args:
+            change: Zones, capacities or links to change.
+            after_turn: Turns simulated when the change applies, or None
+                for the next turn.
+        """
+        if after_turn is None:
+            self._changes.append(change)
+        else:
+            heapq.heappush(self._scheduled,
+                           (after_turn, next(self._queued), change))
+
+    def _pending_changes(self, turn: int) -> bool:
+        """
+        Releases the scheduled changes due after `turn` turns, and tells
+        whether any change is still to apply, now or later.
+        """
+        scheduled = self._scheduled
+        while scheduled and scheduled[0][0] <= turn:
+            self._changes.append(heapq.heappop(scheduled)[2])
+        return bool(self._changes or scheduled)
+
+    def _take_changes(self, graph: Graph) -> tuple[Graph, set[int], set[int]]:
+        """
+        Applies the queued map changes to `graph`.
+
+        Returns:
+            The changed graph, the hubs that became blocked and the edge
+            positions that were closed.
+        """
+        hubs: set[int] = set()
+        links: set[int] = set()
+        for change in self._changes:
+            closed_hubs, closed_links = change.closures(graph)
+            hubs |= closed_hubs
+            links |= closed_links
+            self.routing_service.forget(graph)
+            graph = change.apply(graph)
+        self._changes.clear()
+        return graph, hubs, links
+
+    @staticmethod
+    def _crosses(path: Sequence[int], links: Sequence[int], k: int,
+                 hubs: set[int], closed: set[int]) -> bool:
+        """
+        Whether the part of a route left after hub `k` enters one of
+        `hubs` or flies one of the `closed` edges.
+        """
+        return (any(path[j] in hubs for j in range(k + 1, len(path)))
+                or any(links[j] in closed for j in range(k, len(links))))
+
+    def simulate_fleet(self, fleet: Fleet, graph: Graph,
+                       start_turn: int = 0) -> None:
+        """
+        Simulates a packed fleet and writes every turn.
+
+        Args:
+            fleet: Fleet with its routes already assigned.
+            graph: Compiled hub graph.
+            start_turn: Turns already simulated, when resuming.
+
+        Returns:
+            None. Writes simulation output per turn.
+        """
+        self.write(self.iter_fleet(fleet, graph, start_turn), graph,
+                   start_turn,
+                   lambda: [fleet.current_hub(i) for i in range(len(fleet))])
 
     def simulate_turns(
         self,
         drones: list[Drone],
-        adjacencies: dict[str, list[str]],
-        hubs: dict[str, Hub],
-        link_capacity: dict[tuple[str, str], int],
+        graph: Graph,
     ) -> None:
         """
         Simulates drone movements turn by turn, applying all zone and link
-        restrictions. Manages occupancy, restricted zones, link capacities, and
-        displays each turn's movements in the required format
-        with color feedback.
+        restrictions, and writes each turn's movements in the required
+        format through the turn writer.
 
         Args:
             drones: List of drone objects.
-            adjacencies: Graph structure of hub connections.
-            hubs: Dictionary of hub properties.
-            link_capacity: Dictionary of connection capacities.
-            max_turns: Maximum number of simulation turns.
+            graph: Compiled hub graph; drone paths hold its hub ids.
 
         Returns:
-            None. Prints simulation output per turn.
-        """
-
-        goal_logs: dict[str, int] = {}
-        t = 0
-        while True:
-            occupancy: dict[str, int] = {}
-            movements: list[str] = []
-            logs: dict[str, dict[str, Any]] = {}
-            link_usage: dict[tuple[str, str], int] = {}
-
-            goal = [d for d in drones if d.path[d.path_idx] == d.end_hub]
-            for d in goal:
-                goal_logs[d.end_hub] = goal_logs.get(d.end_hub, 0) + 1
-
-            # In each turn, check the drones that have reached their goal.
-            # If they have reached their goal, we don't count them anymore.
-            drones = [d for d in drones if d.path[d.path_idx] != d.end_hub]
-
-            # If there are no drones, all have arrived
-            if not drones:
-                print(f"Turns: {t}")
-                break
-
-            # Movement loop
-            for d in drones:
-                actual_hub = d.current_hub
-                actual_hub_obj = hubs[actual_hub]
-                text_color_actual_hub: str = COLOR_MAP.get(str(
-                    actual_hub_obj.color), Color.RESET
-                )
+            None. Writes simulation output per turn.
+        """
+        self.write(self.iter_turns(drones, graph), graph,
+                   positions=lambda: [d.current_hub for d in drones])
 
-                # If I am stationary, print my position and skip
-                if d.restricted > 0:
-                    d.restricted -= 1
-                    continue
+    def write(self, events: Iterable[TurnEvent], graph: Graph,
+              start_turn: int = 0,
+              positions: Callable[[], Sequence[int]] | None = None) -> None:
+        """
+        Feeds turn events to the turn writer. The final turn count is the
+        number of the last turn, turns without moves included.
 
-                # Instantiate next_hub, its color, and current occupancy
-                next_hub = d.path[d.path_idx + 1]
-                next_hub_obj = hubs[next_hub]
-                text_color_next_hub = COLOR_MAP.get(str(
-                    next_hub_obj.color), Color.RESET
-                )
-                current_occupancy = occupancy.get(next_hub, 0)
-
-                # If the next hub is full, do not advance or replan
-                if current_occupancy >= hubs[next_hub].max_drones:
-                    occupied_hubs = {hub for hub, occ in occupancy.items()
-                                     if occ >= hubs[hub].max_drones}
-                    alt_path: list[str] = self.routing_service.find_path(
-                        hubs, adjacencies, hubs[d.current_hub],
-                        hubs[d.end_hub], occupied_hubs
-                    )
-                    if not alt_path:
+        Args:
+            events: Turn events of one simulation, in order.
+            graph: Compiled hub graph the events refer to.
+            start_turn: Turns already simulated, when resuming.
+            positions: Builds the hub of every drone before the first
+                event, for the writers that record positions.
+
+        Returns:
+            None. Writes simulation output per turn.
+
+        Raises:
+            SimulationStalled: If the run was stopped; the turns written
+                so far are flushed without a turn count.
+        """
+        writer = self.writer
+        writer.bind(graph)
+        if positions is not None:
+            writer.begin(positions, start_turn)
+        turns = start_turn
+        try:
+            for event in events:
+                for move in event.moves:
+                    writer.move(*move)
+                writer.end_turn()
+                turns = event.turn
+        except SimulationStalled:
+            # Keep the turns written so far, without a turn count
+            writer.abort()
+            raise
+        writer.finish(turns)
+
+    def iter_fleet(self, fleet: Fleet, graph: Graph,
+                   start_turn: int = 0) -> Iterator[TurnEvent]:
+        """
+        Simulates drone movements turn by turn on the fleet's columns,
+        which are updated in place, and yields one event per turn. A turn
+        is only computed when the caller asks for it, so closing the
+        iterator stops the simulation and nothing is kept from previous
+        turns.
+
+        Args:
+            fleet: Fleet with its routes already assigned.
+            graph: Compiled hub graph.
+            start_turn: Turns already simulated, when resuming.
+
+        Returns:
+            An iterator over the turn events, see _run_fleet.
+        """
+        return self._run_fleet(fleet, graph, start_turn,
+                               [fleet.label(i) for i in range(len(fleet))])
+
+    def iter_turns(
+        self,
+        drones: list[Drone],
+        graph: Graph,
+        start_turn: int = 0,
+    ) -> Iterator[TurnEvent]:
+        """
+        Packs the drones into a Fleet and simulates it like iter_fleet,
+        with the drones labelled by their ids. The drones get the position,
+        route and restricted countdown of the fleet back once the run ends,
+        is stopped or the iterator is closed.
+
+        Args:
+            drones: List of drone objects, moved in place.
+            graph: Compiled hub graph; drone paths hold its hub ids.
+            start_turn: Turns already simulated, when resuming.
+
+        Yields:
+            The event of each turn, see _run_fleet.
+        """
+        fleet = Fleet.from_drones(drones, graph)
+        planned = list(fleet.route)
+        try:
+            yield from self._run_fleet(fleet, graph, start_turn,
+                                       [d.id for d in drones])
+        finally:
+            # Drones on the same new route share one path list
+            paths: dict[int, list[int]] = {}
+            for i, d in enumerate(drones):
+                route = fleet.route[i]
+                if route != planned[i]:
+                    if route not in paths:
+                        paths[route] = list(fleet.routes.routes[route])
+                    d.path = paths[route]
+                d.path_idx = fleet.path_idx[i]
+                d.restricted = fleet.restricted[i]
+
+    def _run_fleet(
+        self,
+        fleet: Fleet,
+        graph: Graph,
+        start_turn: int,
+        labels: Sequence[str],
+    ) -> Iterator[TurnEvent]:
+        """
+        The turn loop of every simulation, on the columns of a fleet.
+
+        Routes live once in the fleet's interned route table together with
+        the link ids along each route, so no link is looked up per move.
+        Hub occupancy and link usage are kept by an OccupancyLedger, whose
+        arrays are read directly in the move loop. Moves are settled in
+        fleet order.
+
+        Args:
+            fleet: Fleet with its routes already assigned, moved in place.
+            graph: Compiled hub graph.
+            start_turn: Turns already simulated, when resuming.
+            labels: Output identifier of every drone.
+
+        Yields:
+            The event of each turn, until every drone has arrived.
+
+        Raises:
+            SimulationStalled: If the run deadlocks, stalls or exceeds the
+                limits of the service, before the turn that would follow.
+        """
+        table = fleet.routes
+        routes = table.routes
+        route_links = table.links
+        route = fleet.route
+        path_idx = fleet.path_idx
+        countdown = fleet.restricted
+        goal = fleet.end_hub
+
+        zones = graph.zones
+        edge_capacity = graph.edge_capacity
+        routing = self.routing_service
+        find_path = routing.find_path
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.bind(graph)
+        checkpointer = self.checkpointer
+        # Built on the first map change, see apply_change
+        index: RouteIndex | None = None
+        # Drones without a route: cut by a map change, or planned on a
+        # map where their end hub cannot be reached
+        stranded = {i for i in range(len(fleet)) if not routes[route[i]]}
+
+        ledger = OccupancyLedger.from_positions(
+            graph, (fleet.current_hub(i) for i in range(len(fleet))),
+            set(fleet.start_hub) | set(goal),
+        )
+        hub_free = ledger.hub_free
+        link_usage = ledger.link_usage
+        record_move = ledger.move
+
+        # Only the drones able to act are visited, see TurnScheduler
+        undelivered = [i for i in range(len(fleet))
+                       if fleet.current_hub(i) != goal[i]]
+        scheduler = TurnScheduler(i for i in undelivered if not countdown[i])
+        for i in undelivered:
+            if countdown[i]:
+                # Resumed in the middle of a restricted transit
+                scheduler.remaining += 1
+                scheduler.stall(i, start_turn)
+
+        monitor = ProgressMonitor(self.limits, graph, start_turn)
+        waits = monitor.waits
+
+        t = start_turn
+        while scheduler.remaining:
+            reason = monitor.check(t, self._pending_changes(t))
+            if reason is not None:
+                raise SimulationStalled(monitor.diagnose(
+                    reason, t, graph,
+                    {i: fleet.current_hub(i) for i in range(len(fleet))
+                     if fleet.current_hub(i) != goal[i]},
+                    labels,
+                ))
+            started = time.perf_counter() if metrics is not None else 0.0
+            expansions = routing.expansions
+            replans = failed = hub_waits = link_waits = 0
+            event = TurnEvent(t + 1)
+            moves = event.moves
+            remaining = scheduler.remaining
+            ledger.begin_turn(t)
+            stalled = scheduler.begin_turn(t, edge_capacity)
+            for i in stalled:
+                countdown[i] -= 1
+            stalls = len(stalled)
+
+            # Map changes: find the drones whose route went through them
+            changed = bool(self._changes)
+            if changed:
+                graph, hubs, links = self._take_changes(graph)
+                zones = graph.zones
+                edge_capacity = graph.edge_capacity
+                ledger.rebind(graph)
+                scheduler.wake_all()
+                if index is None:
+                    index = RouteIndex.build(fleet, [
+                        i for i in range(len(fleet))
+                        if fleet.current_hub(i) != goal[i]
+                    ])
+                for i in index.drones_through(hubs, links):
+                    if self._crosses(routes[route[i]],
+                                     route_links[route[i]], path_idx[i],
+                                     hubs, links):
+                        stranded.add(i)
+
+            # Movement loop, in fleet order
+            for i in scheduler:
+                # Route cut by a map change: repair it first
+                if stranded and i in stranded:
+                    replans += 1
+                    actual_hub = fleet.current_hub(i)
+                    repaired = find_path(graph, actual_hub, goal[i],
+                                         ledger.saturated)
+                    if not repaired:
+                        failed += 1
+                        event.waits.append(labels[i])
+                        waits.wait_route(i, actual_hub, goal[i])
+                        scheduler.wait_stuck(i)
                         continue
-                    d.path = alt_path
-                    next_hub = d.path[d.path_idx + 1]
+                    stranded.discard(i)
+                    old = route[i]
+                    route[i] = table.intern(repaired)
+                    path_idx[i] = 0
+                    if index is not None:
+                        index.assign(i, old, route[i])
+
+                path = routes[route[i]]
+                k = path_idx[i]
+                actual_hub = path[k]
+                next_hub = path[k + 1]
+
+                # Full hub: do not advance but replan around the full hubs
+                if not hub_free(next_hub):
+                    hub_waits += 1
+                    replans += 1
+                    event.waits.append(labels[i])
+                    if metrics is not None:
+                        metrics.hub_wait(next_hub)
+                    alt_path = find_path(graph, actual_hub, goal[i],
+                                         ledger.saturated)
+                    if alt_path:
+                        # The new path starts at the current hub
+                        old = route[i]
+                        route[i] = table.intern(alt_path)
+                        path_idx[i] = 0
+                        if index is not None:
+                            index.assign(i, old, route[i])
+                        waits.clear(i)
+                        scheduler.activate(i)
+                    else:
+                        failed += 1
+                        waits.wait_hub(i, actual_hub, next_hub)
+                        scheduler.wait_stuck(i)
                     continue
 
-                # What is the current link?
-                actual_link: tuple[str, str] = (actual_hub, next_hub)
-                # What is the current capacity of this link?
-                max_link = link_capacity.get(actual_link, float('inf'))
-                # Does the current usage of this link exceed the maximum?
-                if link_usage.get(actual_link, 0) >= max_link:
-                    # No? I wait
+                # Link already flown by as many drones as its capacity
+                link = route_links[route[i]][k]
+                if link_usage(link) >= edge_capacity[link]:
+                    link_waits += 1
+                    event.waits.append(labels[i])
+                    if metrics is not None:
+                        metrics.link_wait(link)
+                    waits.wait_link(i, actual_hub, next_hub, link)
+                    scheduler.wait_link(i, link, next_hub)
                     continue
 
-                # If I don't wait, increment link and node usage and advance
-                link_usage[actual_link] = link_usage.get(actual_link, 0) + 1
-                occupancy[next_hub] = current_occupancy + 1
-
-                # Check capacity via logs
-                logs.setdefault(next_hub, {
-                    'next_hub': next_hub,
-                    'next_hub_occ': 0,
-                    'next_hub_max_occ': hubs[next_hub].max_drones,
-                    'link_usage': 0,
-                    'max_link_capacity': max_link
-                })
-                # Update the occupancy for both hub and link
-                logs[next_hub]['next_hub_occ'] = occupancy[next_hub]
-                logs[next_hub]['link_usage'] = link_usage[actual_link]
-
-                d.path_idx += 1
-
-                # If the next zone is restricted, penalize and print
-                # log according to zone
-                if hubs[next_hub].zone == Zones.RESTRICTED:
-                    d.restricted = 1
-                    movements.append(
-                        f"{d.id}-{text_color_actual_hub}{actual_hub}-"
-                        f"{text_color_next_hub}{next_hub}{Color.RESET}"
-                    )
+                was_full = actual_hub in ledger.saturated
+                record_move(actual_hub, next_hub, link)
+                if was_full and actual_hub not in ledger.saturated:
+                    scheduler.hub_freed()
+                if next_hub in ledger.saturated:
+                    scheduler.hub_saturated(next_hub)
+                scheduler.moved(i)
+                waits.clear(i)
+                path_idx[i] = k + 1
+                moves.append((labels[i], actual_hub, next_hub))
+
+                # Entering a restricted zone costs one more turn
+                if zones[next_hub] == RESTRICTED:
+                    countdown[i] = 1
+                if next_hub == goal[i]:
+                    event.arrivals.append(labels[i])
+                    scheduler.deliver(i)
+                elif countdown[i]:
+                    scheduler.stall(i, t + 1)
                 else:
-                    movements.append(
-                        f"{d.id}-{text_color_next_hub}{next_hub}{Color.RESET}"
-                    )
+                    scheduler.activate(i)
 
+            if metrics is not None:
+                metrics.record_turn(TurnMetrics(
+                    t, remaining, len(moves), replans, failed, hub_waits,
+                    link_waits, stalls, routing.expansions - expansions,
+                    time.perf_counter() - started,
+                ))
             t += 1
-            # Print logs for this turn
-            if movements:
-                print(' '.join(movements))
+            monitor.end_turn(t, bool(moves or stalls or replans > failed
+                                     or changed), bool(event.arrivals))
+            yield event
+            if checkpointer is not None:
+                checkpointer.after_turn(t, lambda: fleet)
+
+    async def aiter_turns(
+        self,
+        drones: list[Drone],
+        graph: Graph,
+        start_turn: int = 0,
+    ) -> AsyncIterator[TurnEvent]:
+        """
+        Asynchronous variant of iter_turns. Each turn is computed when the
+        consumer asks for it, and control returns to the event loop after
+        every turn, so a slow consumer holds the simulation back instead
+        of letting turns pile up.
+        """
+        for event in self.iter_turns(drones, graph, start_turn):
+            yield event
+            await asyncio.sleep(0)
+
+    async def aiter_fleet(
+        self,
+        fleet: Fleet,
+        graph: Graph,
+        start_turn: int = 0,
+    ) -> AsyncIterator[TurnEvent]:
+        """Asynchronous variant of iter_fleet, see aiter_turns."""
+        for event in self.iter_fleet(fleet, graph, start_turn):
+            yield event
+            await asyncio.sleep(0)
+
+    def simulate_cooperative(
+        self,
+        drones: list[Drone],
+        graph: Graph,
+    ) -> None:
+        """
+        Plans every drone, in fleet order, through (hub, turn) states
+        against one shared reservation table, then plays the resulting
+        conflict-free schedules back. No pathfinding happens per turn.
+
+        Args:
+            drones: List of drone objects with their start and end hubs.
+            graph: Compiled hub graph.
+
+        Returns:
+            None. Writes simulation output per turn.
+        """
+        exempt = {d.start_hub for d in drones} | {d.end_hub for d in drones}
+        table = ReservationTable(graph, exempt)
+        for d in drones:
+            d.path, d.schedule = self.routing_service.plan_cooperative(
+                graph, d.start_hub, d.end_hub, table
+            )
+            d.path_idx = 0
+            d.restricted = 0
+        self.play_schedules(drones, graph)
+
+    def play_schedules(
+        self,
+        drones: list[Drone],
+        graph: Graph,
+    ) -> None:
+        """
+        Writes precomputed schedules turn by turn in the same format as
+        simulate_turns.
+
+        Args:
+            drones: Drones whose path and schedule are already planned.
+            graph: Compiled hub graph.
+
+        Returns:
+            None. Writes simulation output per turn.
+        """
+        self.write(self.iter_schedules(drones, graph), graph,
+                   positions=lambda: [d.current_hub for d in drones])
+
+    def iter_schedules(
+        self,
+        drones: list[Drone],
+        graph: Graph,
+    ) -> Iterator[TurnEvent]:
+        """
+        Yields the turn events of precomputed schedules. Moves are
+        bucketed by the turn they start in, so the cost is linear in the
+        total number of moves. Waits are part of the schedules, so no
+        drone is reported as waiting.
+
+        Args:
+            drones: Drones whose path and schedule are already planned.
+            graph: Compiled hub graph.
+
+        Yields:
+            The event of each turn up to the last arrival.
+
+        Raises:
+            SimulationStalled: After the last arrival, if some drone has
+                no schedule because its end hub cannot be reached.
+        """
+        zones = graph.zones
+        turns: dict[int, list[tuple[str, int, int]]] = {}
+        arrivals: dict[int, list[str]] = {}
+        last = 0
+        monitor = ProgressMonitor(self.limits, graph)
+        unplanned: dict[int, int] = {}
+        for i, d in enumerate(drones):
+            if not d.schedule:
+                if d.current_hub != d.end_hub:
+                    unplanned[i] = d.current_hub
+                    monitor.waits.wait_route(i, d.current_hub, d.end_hub)
+                continue
+            for k in range(1, len(d.path)):
+                hub = d.path[k]
+                # A restricted hub is entered one turn before arrival
+                departure = d.schedule[k]
+                if zones[hub] == RESTRICTED:
+                    departure -= 1
+                turns.setdefault(departure, []).append(
+                    (d.id, d.path[k - 1], hub)
+                )
+            if len(d.path) > 1:
+                arrivals.setdefault(departure, []).append(d.id)
+            d.path_idx = len(d.path) - 1
+            last = max(last, d.schedule[-1])
+
+        for t in range(1, last + 1):
+            yield TurnEvent(t, turns.pop(t, []), arrivals.pop(t, []))
+        if unplanned:
+            # Nothing the planned drones do can open a route for the others
+            raise SimulationStalled(monitor.diagnose(
+                DEADLOCK, last, graph, unplanned, [d.id for d in drones]
+            ))
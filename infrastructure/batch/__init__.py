@@ -0,0 +1,11 @@
+from .batch_runner import BatchResult, BatchRunner
+from .failure_models import FailureModel, HubOutages, LinkFailures
+from .monte_carlo import (MonteCarloReport, MonteCarloRunner, TrialResult,
+                          run_trial)
+from .sweep import (ParameterSweep, SweepResult, SweepVariant,
+                    load_variants)
+
+__all__ = ['BatchResult', 'BatchRunner', 'FailureModel', 'HubOutages',
+           'LinkFailures', 'MonteCarloReport', 'MonteCarloRunner',
+           'ParameterSweep', 'SweepResult', 'SweepVariant', 'TrialResult',
+           'load_variants', 'run_trial']
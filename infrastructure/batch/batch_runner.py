@@ -0,0 +1,157 @@
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from multiprocessing.connection import Connection, wait
+from multiprocessing.process import BaseProcess
+from typing import Any, Callable, Sequence
+from domain.services import RoutingService, SimulationService, DroneFactory
+from infrastructure.parsers import MapParser
+from utils import TurnCounter
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """
+    Outcome of simulating one map of a batch.
+
+    Attributes:
+        path: Map file, as given to the runner.
+        status: 'ok', 'error' or 'timeout'.
+        turns: Final turn count, or None if the run did not finish.
+        seconds: Wall time of the run (load, planning and simulation).
+        error: Failure reason, or None if the run finished.
+    """
+    path: str
+    status: str
+    turns: int | None
+    seconds: float
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _run_map(path: str, cooperative: bool,
+             connection: Connection) -> None:
+    """
+    Worker entry point: simulates one map with all output discarded and
+    sends its BatchResult back through `connection`.
+    """
+    sys.stdout = open(os.devnull, 'w')
+    started = time.perf_counter()
+    try:
+        counter = TurnCounter()
+        parser = MapParser(RoutingService(), SimulationService(writer=counter),
+                           DroneFactory(), cooperative=cooperative)
+        parser.simulate(parser.load(path))
+        result = BatchResult(path, 'ok', counter.turns,
+                             time.perf_counter() - started)
+    except Exception as e:
+        result = BatchResult(path, 'error', None,
+                             time.perf_counter() - started, str(e))
+    connection.send(result)
+    connection.close()
+
+
+class BatchRunner:
+    """
+    Simulates many maps in parallel worker processes.
+
+    Every map runs in its own process, at most `workers` at a time, with
+    the turn output discarded. A map that exceeds `timeout` seconds has
+    its process killed and is reported as timed out, so one map that
+    never converges cannot hold up the batch.
+
+    Attributes:
+        workers: Maximum number of maps simulated at once.
+        timeout: Seconds allowed per map, or None for no limit.
+        cooperative: Whether to plan with the reservation table.
+    """
+
+    def __init__(self,
+                 workers: int | None = None,
+                 timeout: float | None = None,
+                 cooperative: bool = False):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.timeout = timeout
+        self.cooperative = cooperative
+
+    def run(
+        self,
+        paths: Sequence[str],
+        on_result: Callable[[BatchResult], None] | None = None,
+    ) -> list[BatchResult]:
+        """
+        Simulates every map of `paths`.
+
+        Args:
+            paths: Map files, text or compiled.
+            on_result: Called with each result as soon as its map is done.
+
+        Returns:
+            One BatchResult per map, in the order of `paths`.
+        """
+        context = multiprocessing.get_context()
+        pending = deque(enumerate(paths))
+        running: dict[Connection, tuple[int, BaseProcess, float]] = {}
+        results: list[BatchResult | None] = [None] * len(paths)
+
+        def done(index: int, result: BatchResult) -> None:
+            results[index] = result
+            if on_result is not None:
+                on_result(result)
+
+        while pending or running:
+            while pending and len(running) < self.workers:
+                index, path = pending.popleft()
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=_run_map,
+                    args=(path, self.cooperative, sender),
+                    daemon=True,
+                )
+                process.start()
+                sender.close()
+                running[receiver] = (index, process, time.monotonic())
+
+            wait_for = None
+            if self.timeout is not None:
+                first = min(started for _, _, started in running.values())
+                wait_for = max(0.0, first + self.timeout - time.monotonic())
+
+            # wait() is typed for sockets too: walk our own connections
+            ready = wait(list(running), wait_for)
+            for receiver in [c for c in running if c in ready]:
+                index, worker, started = running.pop(receiver)
+                try:
+                    result: BatchResult = receiver.recv()
+                except EOFError:
+                    worker.join()
+                    result = BatchResult(
+                        paths[index], 'error', None,
+                        time.monotonic() - started,
+                        f"Worker exited with code {worker.exitcode}",
+                    )
+                receiver.close()
+                worker.join()
+                done(index, result)
+
+            if self.timeout is None:
+                continue
+            now = time.monotonic()
+            for late, (index, worker, started) in list(running.items()):
+                if now - started < self.timeout:
+                    continue
+                worker.kill()
+                worker.join()
+                late.close()
+                del running[late]
+                done(index, BatchResult(
+                    paths[index], 'timeout', None, now - started,
+                    f"Timed out after {self.timeout:g}s",
+                ))
+
+        return [result for result in results if result is not None]
@@ -0,0 +1,128 @@
+import math
+import random
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterator
+from domain.entities import Graph, MapChange
+from domain.entities.graph import BLOCKED
+
+
+# Changes to queue before a turn: (turns simulated when it applies, change)
+Schedule = list[tuple[int, MapChange]]
+
+
+def sample(rng: random.Random, count: int,
+           probability: float) -> Iterator[int]:
+    """
+    Yields, in order, the indices below `count` picked each with
+    `probability`. The gaps between picks are drawn from the geometric
+    distribution, so it costs the picks rather than `count` draws.
+    """
+    if probability <= 0.0:
+        return
+    if probability >= 1.0:
+        yield from range(count)
+        return
+    log_miss = math.log1p(-probability)
+    index = -1
+    while True:
+        index += 1 + int(math.log(1.0 - rng.random()) / log_miss)
+        if index >= count:
+            return
+        yield index
+
+
+class FailureModel(ABC):
+    """
+    Random disruption of a map during one Monte Carlo trial.
+
+    A model is a picklable description; trial() draws one realization of
+    it from the random generator of the trial.
+    """
+
+    @abstractmethod
+    def trial(self, graph: Graph, protected: frozenset[int],
+              rng: random.Random) -> Iterator[Schedule]:
+        """
+        Draws the failures of one trial.
+
+        Args:
+            graph: Compiled hub graph of the map, before any failure.
+            protected: Hubs that never fail: the start and end hubs of
+                the missions.
+            rng: Random generator of the trial.
+
+        Yields:
+            Before every turn, starting with the first, the map changes
+            to schedule.
+        """
+
+
+@dataclass(frozen=True)
+class LinkFailures(FailureModel):
+    """
+    Every link fails with `probability` and stays closed for the rest of
+    the trial.
+
+    Attributes:
+        probability: Chance of each link to fail during a trial.
+        within: Turns over which the failures are spread evenly; 0 fails
+            the links before the first turn. Drones plan on the intact
+            map either way, and replan when they find out.
+    """
+    probability: float
+    within: int = 0
+
+    def trial(self, graph: Graph, protected: frozenset[int],
+              rng: random.Random) -> Iterator[Schedule]:
+        links = [(u, graph.targets[pos])
+                 for u in range(len(graph))
+                 for pos in range(graph.offsets[u], graph.offsets[u + 1])
+                 if u < graph.targets[pos]]
+        closed: dict[int, set[tuple[int, int]]] = {}
+        for i in sample(rng, len(links), self.probability):
+            turn = rng.randint(0, self.within) if self.within else 0
+            closed.setdefault(turn, set()).add(links[i])
+        yield [(turn, MapChange(closed_links=frozenset(failed)))
+               for turn, failed in sorted(closed.items())]
+        while True:
+            yield []
+
+
+@dataclass(frozen=True)
+class HubOutages(FailureModel):
+    """
+    Hubs become blocked for a few turns, then recover their zone.
+
+    Attributes:
+        rate: Chance of each hub to start an outage in a given turn.
+        duration: Turns an outage lasts.
+    """
+    rate: float
+    duration: int = 5
+
+    def trial(self, graph: Graph, protected: frozenset[int],
+              rng: random.Random) -> Iterator[Schedule]:
+        zones = graph.zones
+        hubs = [hub for hub in range(len(graph))
+                if hub not in protected and zones[hub] != BLOCKED]
+        # Hubs out of service, by the turn they recover
+        down: set[int] = set()
+        recover: dict[int, list[int]] = {}
+        turn = 0
+        while True:
+            for hub in recover.pop(turn, ()):
+                down.discard(hub)
+            failed = [hubs[i] for i in sample(rng, len(hubs), self.rate)
+                      if hubs[i] not in down]
+            schedule: Schedule = []
+            if failed:
+                down.update(failed)
+                end = turn + self.duration
+                recover[end] = failed
+                schedule.append((turn, MapChange(
+                    zones={hub: BLOCKED for hub in failed})))
+                schedule.append((end, MapChange(
+                    zones={hub: zones[hub] for hub in failed})))
+            yield schedule
+            turn += 1
@@ -0,0 +1,324 @@
+import math
+import os
+import random
+import statistics
+import time
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                wait)
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Sequence
+from domain.entities import FlightMap, RunLimits, SimulationStalled
+from domain.services import (RoutingService, SimulationService, DroneFactory,
+                             FleetPlanner)
+from infrastructure.compiled import MapCompiler
+from utils import NullWriter
+from .failure_models import FailureModel
+
+
+# Two-sided 95% quantile of the normal distribution
+Z_95 = 1.959964
+PERCENTILES = (5, 50, 90, 95, 99)
+
+Candidates = dict[tuple[int, int], list[list[list[int]]]]
+
+
+@dataclass(frozen=True)
+class TrialResult:
+    """
+    Outcome of one Monte Carlo trial.
+
+    Attributes:
+        trial: Trial number, starting at 0.
+        status: 'ok' if every drone landed, 'stopped' if the run was
+            stopped (see reason) or 'error'.
+        turns: Turns simulated: the makespan of a trial that is 'ok'.
+        delivered: Drones that landed.
+        nb_drones: Drones of the fleet.
+        reason: Why the run was stopped, or the error, else None.
+    """
+    trial: int
+    status: str
+    turns: int
+    delivered: int
+    nb_drones: int
+    reason: str | None = None
+
+    @property
+    def delivery_rate(self) -> float:
+        return self.delivered / self.nb_drones if self.nb_drones else 1.0
+
+
+@dataclass(frozen=True)
+class MonteCarloReport:
+    """
+    Distribution of the outcomes of the trials of a Monte Carlo run.
+
+    Attributes:
+        trials: Trials counted, a prefix of the trial numbers.
+        seed: Seed of the run.
+        converged: Whether the run stopped early because both confidence
+            intervals were tight.
+        completed: Trials in which every drone landed.
+        errors: Trials that failed with an error.
+        makespan: Percentiles of the turns of the completed trials.
+        delivery: Percentiles of the delivery rate of all trials.
+        makespan_ci: Mean makespan and the half-width of its 95%
+            confidence interval, or None without two completed trials.
+        delivery_ci: Mean delivery rate and the half-width of its 95%
+            confidence interval.
+        stopped: Trials stopped before every drone landed, by reason.
+        seconds: Wall time of the run.
+    """
+    trials: int
+    seed: int
+    converged: bool
+    completed: int
+    errors: int
+    makespan: dict[int, float]
+    delivery: dict[int, float]
+    makespan_ci: tuple[float, float] | None
+    delivery_ci: tuple[float, float]
+    stopped: dict[str, int]
+    seconds: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def percentiles(values: Sequence[float]) -> dict[int, float]:
+    """The PERCENTILES of `values`, interpolated between ranks."""
+    if not values:
+        return {}
+    if len(values) == 1:
+        return {p: float(values[0]) for p in PERCENTILES}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {p: cuts[p - 1] for p in PERCENTILES}
+
+
+def interval(values: Sequence[float]) -> tuple[float, float] | None:
+    """Mean of `values` and the half-width of its 95% interval."""
+    if len(values) < 2:
+        return None
+    return (statistics.fmean(values),
+            Z_95 * statistics.stdev(values) / math.sqrt(len(values)))
+
+
+def run_trial(
+    flight_map: FlightMap,
+    candidates: Candidates,
+    trial: int,
+    seed: int,
+    models: Sequence[FailureModel],
+    limits: RunLimits | None = None,
+) -> TrialResult:
+    """
+    Plans the fleet of `flight_map` on the intact map and simulates it
+    under one draw of the failure models.
+
+    Args:
+        flight_map: Map of the run, not modified.
+        candidates: Candidate routes of the fleet planner, by mission.
+        trial: Trial number; with `seed`, it seeds the draw.
+        seed: Seed of the run.
+        models: Failures to draw.
+        limits: Budget of the simulation.
+    """
+    rng = random.Random(f"{seed}:{trial}")
+    graph = flight_map.graph
+    fleet = DroneFactory.generate_missions(graph, flight_map.missions)
+    nb_drones = len(fleet)
+    delivered = turns = 0
+    try:
+        FleetPlanner(RoutingService()).plan_fleet(graph, fleet,
+                                                  dict(candidates))
+        simulation = SimulationService(writer=NullWriter(), limits=limits)
+        protected = frozenset(hub for mission in flight_map.missions
+                              for hub in (mission.start, mission.end))
+        draws = [model.trial(graph, protected, rng) for model in models]
+
+        def schedule() -> None:
+            for draw in draws:
+                for after_turn, change in next(draw):
+                    simulation.apply_change(change, after_turn)
+
+        schedule()
+        for event in simulation.iter_fleet(fleet, graph):
+            delivered += len(event.arrivals)
+            turns = event.turn
+            schedule()
+    except SimulationStalled as e:
+        return TrialResult(trial, 'stopped', e.diagnosis.turn, delivered,
+                           nb_drones, e.diagnosis.reason)
+    except Exception as e:
+        return TrialResult(trial, 'error', turns, delivered, nb_drones,
+                           str(e))
+    return TrialResult(trial, 'ok', turns, delivered, nb_drones)
+
+
+# Map and candidate routes of the run, set once per worker process
+_base: FlightMap | None = None
+_candidates: Candidates = {}
+
+
+def _init_worker(source: FlightMap | str, candidates: Candidates) -> None:
+    global _base, _candidates
+    _base = MapCompiler.load(source) if isinstance(source, str) else source
+    _candidates = candidates
+
+
+def _run_trials(first: int, count: int, seed: int,
+                models: Sequence[FailureModel],
+                limits: RunLimits | None) -> list[TrialResult]:
+    """Worker entry point: runs trials first to first + count - 1."""
+    if _base is None:
+        raise RuntimeError("the worker was started without a map")
+    return [run_trial(_base, _candidates, trial, seed, models, limits)
+            for trial in range(first, first + count)]
+
+
+class MonteCarloRunner:
+    """
+    Simulates one map many times under random failures, in parallel.
+
+    Each trial plans the fleet on the intact map, as a real operator
+    would, then draws its failures from the models with a generator
+    seeded by the seed of the run and the trial number, so a trial gives
+    the same outcome whichever worker runs it. Failures apply to the
+    running simulation as map changes, and the drones replan around them.
+
+    The map is handed to every worker process once, when the worker
+    starts; a compiled map is given by path and memory-mapped by every
+    worker, so they all share its pages. The candidate routes of the
+    fleet planner are computed once, here. Trials are dealt to the
+    workers in chunks, and the results are counted in trial order: after
+    each chunk of that order, the run stops once the 95% confidence
+    intervals of the mean makespan (relative to the mean) and of the
+    mean delivery rate are both narrower than `tolerance`, so an early
+    stop does not depend on which worker finished first.
+
+    Attributes:
+        workers: Maximum number of chunks simulated at once.
+        limits: Budget of every trial.
+        chunk_size: Trials per task sent to a worker.
+    """
+
+    def __init__(self, workers: int | None = None,
+                 limits: RunLimits | None = None,
+                 chunk_size: int = 16) -> None:
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.limits = limits
+        self.chunk_size = max(1, chunk_size)
+
+    def run(
+        self,
+        source: FlightMap | str,
+        models: Sequence[FailureModel],
+        trials: int = 1000,
+        seed: int = 0,
+        min_trials: int = 100,
+        tolerance: float = 0.01,
+        on_progress: Callable[[int], None] | None = None,
+    ) -> MonteCarloReport:
+        """
+        Runs up to `trials` trials of the map.
+
+        Args:
+            source: The map, or the path of a compiled map.
+            models: Failures drawn in every trial.
+            trials: Maximum number of trials.
+            seed: Seed of the run.
+            min_trials: Trials counted before stopping early; 0 never
+                stops early.
+            tolerance: Width the confidence intervals must reach to
+                stop early.
+            on_progress: Called with the trials counted so far, after
+                each chunk.
+
+        Returns:
+            The distribution of the outcomes of the trials counted.
+        """
+        started = time.perf_counter()
+        flight_map = (MapCompiler.load(source) if isinstance(source, str)
+                      else source)
+        planner = FleetPlanner(RoutingService())
+        candidates = planner.candidate_table(
+            flight_map.graph,
+            [(m.start, m.end) for m in flight_map.missions],
+        )
+
+        chunks = [(first, min(self.chunk_size, trials - first))
+                  for first in range(0, trials, self.chunk_size)]
+        done: dict[int, list[TrialResult]] = {}
+        counted: list[TrialResult] = []
+        converged = False
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, max(len(chunks), 1)),
+            initializer=_init_worker,
+            initargs=(source, candidates),
+        ) as pool:
+            # Keep every worker busy, without queueing the whole run
+            pending: dict[Future[list[TrialResult]], int] = {}
+            submitted = 0
+            while submitted < len(chunks) or pending:
+                while (submitted < len(chunks)
+                       and len(pending) < 2 * self.workers):
+                    first, count = chunks[submitted]
+                    pending[pool.submit(
+                        _run_trials, first, count, seed, models,
+                        self.limits,
+                    )] = submitted
+                    submitted += 1
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done[pending.pop(future)] = future.result()
+                while len(counted) // self.chunk_size in done:
+                    counted += done.pop(len(counted) // self.chunk_size)
+                    if on_progress is not None:
+                        on_progress(len(counted))
+                    if (min_trials and len(counted) >= min_trials
+                            and self._tight(counted, tolerance)):
+                        converged = True
+                        break
+                if converged:
+                    for future in pending:
+                        future.cancel()
+                    break
+        return self._report(counted, seed, converged,
+                            time.perf_counter() - started)
+
+    @staticmethod
+    def _tight(results: list[TrialResult], tolerance: float) -> bool:
+        """Whether both confidence intervals are within `tolerance`."""
+        delivery = interval([r.delivery_rate for r in results])
+        if delivery is None or delivery[1] > tolerance:
+            return False
+        completed = [r.turns for r in results if r.status == 'ok']
+        if not completed:
+            return True
+        makespan = interval(completed)
+        return makespan is not None and \
+            makespan[1] <= tolerance * makespan[0]
+
+    @staticmethod
+    def _report(results: list[TrialResult], seed: int, converged: bool,
+                seconds: float) -> MonteCarloReport:
+        completed = sorted(r.turns for r in results if r.status == 'ok')
+        rates = sorted(r.delivery_rate for r in results)
+        stopped: dict[str, int] = {}
+        for result in results:
+            if result.status == 'stopped' and result.reason is not None:
+                stopped[result.reason] = stopped.get(result.reason, 0) + 1
+        return MonteCarloReport(
+            trials=len(results),
+            seed=seed,
+            converged=converged,
+            completed=len(completed),
+            errors=sum(r.status == 'error' for r in results),
+            makespan=percentiles(completed),
+            delivery=percentiles(rates),
+            makespan_ci=interval(completed),
+            delivery_ci=interval(rates) or (rates[0] if rates else 0.0,
+                                            0.0),
+            stopped=stopped,
+            seconds=seconds,
+        )
@@ -0,0 +1,251 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Callable
+from domain.entities import FlightMap, Graph, Zones
+from domain.entities.graph import ZONE_CODES
+from domain.services import (RoutingService, SimulationService, DroneFactory,
+                             FleetPlanner)
+from infrastructure.compiled import MapCompiler
+from utils import TurnCounter
+
+
+@dataclass(frozen=True)
+class SweepVariant:
+    """
+    One set of overrides applied to the base map of a sweep.
+
+    Attributes:
+        name: Label of the variant in the results.
+        nb_drones: Fleet size, or None to keep the map's.
+        max_drones: New `max_drones` of some hubs, by hub name.
+        link_capacity: New `max_link_capacity` of some links, by
+            "hub-hub" name.
+        zones: New zone of some hubs, by hub name ('normal', 'blocked',
+            'restricted' or 'priority').
+    """
+    name: str
+    nb_drones: int | None = None
+    max_drones: dict[str, int] = field(default_factory=dict)
+    link_capacity: dict[str, int] = field(default_factory=dict)
+    zones: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], default_name: str) \
+            -> 'SweepVariant':
+        """
+        Builds a variant from its JSON form, where the keys follow the map
+        format: `nb_drones`, `max_drones`, `max_link_capacity` and `zone`.
+
+        Raises:
+            ValueError: If an unknown key is present.
+        """
+        known = {'name', 'nb_drones', 'max_drones', 'max_link_capacity',
+                 'zone'}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown sweep keys: {', '.join(unknown)}")
+        return cls(
+            name=str(data.get('name', default_name)),
+            nb_drones=data.get('nb_drones'),
+            max_drones=dict(data.get('max_drones', {})),
+            link_capacity=dict(data.get('max_link_capacity', {})),
+            zones=dict(data.get('zone', {})),
+        )
+
+    def apply(self, flight_map: FlightMap) -> FlightMap:
+        """
+        Returns `flight_map` with the overrides applied.
+
+        Raises:
+            ValueError: If a hub, link or zone does not exist, or the
+                fleet size of a map with several missions is overridden.
+        """
+        graph = flight_map.graph
+        graph = graph.with_overrides(
+            max_drones={self._hub(graph, name): capacity
+                        for name, capacity in self.max_drones.items()},
+            link_capacity={self._link(graph, name): capacity
+                           for name, capacity in self.link_capacity.items()},
+            zones=self.zone_codes(graph),
+        )
+        if self.nb_drones is None:
+            return replace(flight_map, graph=graph)
+        if len(flight_map.missions) > 1:
+            raise ValueError("nb_drones cannot be overridden on a map with "
+                             "several missions")
+        return FlightMap(graph, self.nb_drones, flight_map.start,
+                         flight_map.end)
+
+    def zone_codes(self, graph: Graph) -> dict[int, int]:
+        """The zone overrides as zone codes by hub id."""
+        codes: dict[int, int] = {}
+        for name, zone in self.zones.items():
+            try:
+                codes[self._hub(graph, name)] = ZONE_CODES[Zones(zone)]
+            except ValueError:
+                raise ValueError(f"'{zone}' is an invalid zone") from None
+        return codes
+
+    @staticmethod
+    def _hub(graph: Graph, name: str) -> int:
+        if name not in graph.index:
+            raise ValueError(f"Unknown hub '{name}'")
+        return graph.index[name]
+
+    @classmethod
+    def _link(cls, graph: Graph, name: str) -> tuple[int, int]:
+        a, _, b = name.partition('-')
+        return cls._hub(graph, a), cls._hub(graph, b)
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    """
+    Outcome of one variant of a sweep.
+
+    Attributes:
+        variant: Name of the variant.
+        nb_drones: Fleet size of the variant.
+        status: 'ok' or 'error'.
+        turns: Final turn count, or None if the run failed.
+        seconds: Wall time of planning and simulation.
+        error: Failure reason, or None if the run finished.
+    """
+    variant: str
+    nb_drones: int
+    status: str
+    turns: int | None
+    seconds: float
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def load_variants(path: str) -> list[SweepVariant]:
+    """
+    Reads the variants of a sweep from a JSON file holding a list of
+    objects, for example:
+    `[{"nb_drones": 50, "max_link_capacity": {"a-b": 2}}]`.
+    """
+    with open(path) as file:
+        data = json.load(file)
+    if not isinstance(data, list):
+        raise ValueError("A sweep file holds a list of variants")
+    return [SweepVariant.from_dict(item, f"variant {i + 1}")
+            for i, item in enumerate(data)]
+
+
+# Base map of the sweep, set once per worker process
+_base: FlightMap | None = None
+
+
+def _init_worker(source: FlightMap | str) -> None:
+    global _base
+    _base = MapCompiler.load(source) if isinstance(source, str) else source
+
+
+def _run_variant(
+    variant: SweepVariant,
+    candidates: dict[tuple[int, int], list[list[list[int]]]],
+) -> SweepResult:
+    """
+    Worker entry point: plans and simulates one variant of the base map,
+    choosing among the precomputed candidate routes.
+    """
+    if _base is None:
+        raise RuntimeError("the worker was started without a map")
+    started = time.perf_counter()
+    nb_drones = _base.nb_drones if variant.nb_drones is None \
+        else variant.nb_drones
+    try:
+        flight_map = variant.apply(_base)
+        graph = flight_map.graph
+        counter = TurnCounter()
+        fleet = DroneFactory.generate_missions(graph, flight_map.missions)
+        FleetPlanner(RoutingService()).plan_fleet(graph, fleet,
+                                                  dict(candidates))
+        SimulationService(writer=counter).simulate_fleet(fleet, graph)
+        return SweepResult(variant.name, nb_drones, 'ok', counter.turns,
+                           time.perf_counter() - started)
+    except Exception as e:
+        return SweepResult(variant.name, nb_drones, 'error', None,
+                           time.perf_counter() - started, str(e))
+
+
+class ParameterSweep:
+    """
+    Simulates many variants of one loaded map in parallel.
+
+    The map is parsed once by the caller and handed to every worker
+    process once, when the worker starts; a compiled map is given by
+    path and memory-mapped by every worker, since its columns cannot be
+    pickled. The candidate routes of the fleet planner only depend on
+    the zones, so they are computed once per distinct set of zone
+    overrides, in this process, and shipped with each variant; variants
+    that only change drone counts or capacities skip the pathfinding and
+    the disjoint-route search entirely.
+
+    Attributes:
+        workers: Maximum number of variants simulated at once.
+    """
+
+    def __init__(self, workers: int | None = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+
+    def run(
+        self,
+        source: FlightMap | str,
+        variants: list[SweepVariant],
+        on_result: Callable[[SweepResult], None] | None = None,
+    ) -> list[SweepResult]:
+        """
+        Simulates every variant of a map.
+
+        Args:
+            source: Base map, loaded once, or the path of a compiled map.
+            variants: Overrides to simulate.
+            on_result: Called with each result as soon as it is done.
+
+        Returns:
+            One SweepResult per variant, in the order of `variants`.
+        """
+        flight_map = (MapCompiler.load(source) if isinstance(source, str)
+                      else source)
+        planner = FleetPlanner(RoutingService())
+        pairs = {(m.start, m.end) for m in flight_map.missions}
+        routes: dict[tuple[tuple[int, int], ...],
+                     dict[tuple[int, int], list[list[list[int]]]]] = {}
+        tasks: list[dict[tuple[int, int], list[list[list[int]]]]] = []
+        for variant in variants:
+            try:
+                zones = variant.zone_codes(flight_map.graph)
+            except ValueError:
+                # Reported by the worker when it applies the variant
+                tasks.append({})
+                continue
+            key = tuple(sorted(zones.items()))
+            if key not in routes:
+                graph = flight_map.graph.with_overrides(zones=zones)
+                routes[key] = planner.candidate_table(graph, pairs)
+            tasks.append(routes[key])
+
+        results: dict[int, SweepResult] = {}
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, max(len(variants), 1)),
+            initializer=_init_worker,
+            initargs=(source,),
+        ) as pool:
+            futures = {
+                pool.submit(_run_variant, variant, candidates): i
+                for i, (variant, candidates) in enumerate(zip(variants, tasks))
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                if on_result is not None:
+                    on_result(result)
+        return [results[i] for i in range(len(variants))]
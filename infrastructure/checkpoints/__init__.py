@@ -0,0 +1,3 @@
+from .checkpoint_file import CheckpointFile
+
+__all__ = ['CheckpointFile']
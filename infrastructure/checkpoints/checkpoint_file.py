@@ -0,0 +1,142 @@
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Literal, MutableSequence
+from domain.entities import Fleet, Graph, RouteTable
+
+
+class CheckpointFile:
+    """
+    Saves the state of a running simulation and loads it back.
+
+    The state between two turns is the turn counter and the fleet: the
+    position of every drone in its route, its restricted countdown, its
+    goal and the interned routes, which include every replanned route.
+    Occupancy and link usage are rebuilt at each turn, so they are not
+    saved.
+
+    Layout (all integers in the byte order recorded in the header):
+        header   magic, byte order, then the counts below and the
+                 fingerprint of the map
+        int32    start_hub, end_hub, route, path_idx  (nb_drones each)
+        int8     restricted                           (nb_drones)
+        int32    route offsets                        (nb_routes + 1)
+        int32    route hubs                           (nb_route_hubs)
+    Every column is padded to a multiple of 8 bytes.
+
+    The file is written next to its destination and renamed over it, so
+    a run killed while saving leaves the previous checkpoint intact.
+    """
+
+    MAGIC = b'FLYCKP01'
+    # magic, byte order, turn, nb_drones, nb_routes, nb_route_hubs,
+    # map fingerprint
+    HEADER = struct.Struct('<8s8sqqqqq')
+
+    @staticmethod
+    def fingerprint(graph: Graph) -> int:
+        """Checksum of the hub names and links a checkpoint refers to."""
+        crc = zlib.crc32('\n'.join(graph.names).encode())
+        return zlib.crc32(bytes(array('i', graph.targets)), crc)
+
+    @classmethod
+    def is_checkpoint(cls, path: str) -> bool:
+        """Whether `path` starts with the checkpoint magic."""
+        try:
+            with open(path, 'rb') as file:
+                return file.read(len(cls.MAGIC)) == cls.MAGIC
+        except OSError:
+            return False
+
+    @classmethod
+    def write(cls, path: str, turn: int, fleet: Fleet) -> None:
+        """
+        Saves the fleet as it is after `turn` turns.
+
+        Args:
+            path: Destination file, replaced if it exists.
+            turn: Number of turns simulated so far.
+            fleet: Fleet state to save.
+        """
+        routes = fleet.routes.routes
+        offsets = array('i', [0])
+        hubs = array('i')
+        for route in routes:
+            hubs.extend(route)
+            offsets.append(len(hubs))
+        header = cls.HEADER.pack(
+            cls.MAGIC, sys.byteorder.encode().ljust(8), turn, len(fleet),
+            len(routes), len(hubs), cls.fingerprint(fleet.routes.graph),
+        )
+
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as file:
+            file.write(header)
+            for column in (array('i', fleet.start_hub),
+                           array('i', fleet.end_hub),
+                           array('i', fleet.route),
+                           array('i', fleet.path_idx),
+                           array('b', fleet.restricted),
+                           offsets, hubs):
+                data = bytes(column)
+                file.write(data + bytes(-len(data) % 8))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str, graph: Graph) -> tuple[int, Fleet]:
+        """
+        Loads a checkpoint of a simulation of `graph`.
+
+        Args:
+            path: File written by write().
+            graph: Compiled hub graph of the checkpointed run.
+
+        Returns:
+            The number of turns already simulated and the fleet state.
+
+        Raises:
+            ValueError: If the file is not a checkpoint, or was saved from
+                another map.
+        """
+        with open(path, 'rb') as file:
+            data = file.read()
+        if len(data) < cls.HEADER.size:
+            raise ValueError(f"{path} is not a checkpoint")
+        (magic, byteorder, turn, nb_drones, nb_routes, nb_route_hubs,
+         fingerprint) = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError(f"{path} is not a checkpoint")
+        if fingerprint != cls.fingerprint(graph):
+            raise ValueError(f"{path} was saved from another map")
+        native = byteorder.rstrip() == sys.byteorder.encode()
+
+        cursor = cls.HEADER.size
+
+        def column(typecode: Literal['b', 'i'], count: int) \
+                -> MutableSequence[int]:
+            nonlocal cursor
+            values = array(typecode)
+            size = count * values.itemsize
+            values.frombytes(data[cursor:cursor + size])
+            cursor += size + (-size % 8)
+            if not native:
+                values.byteswap()
+            return values
+
+        start_hub = column('i', nb_drones)
+        end_hub = column('i', nb_drones)
+        route = column('i', nb_drones)
+        path_idx = column('i', nb_drones)
+        restricted = column('b', nb_drones)
+        offsets = column('i', nb_routes + 1)
+        hubs = column('i', nb_route_hubs)
+
+        # Interning in order gives every route back its saved id
+        table = RouteTable(graph)
+        for i in range(nb_routes):
+            table.intern(hubs[offsets[i]:offsets[i + 1]])
+        fleet = Fleet(table, start_hub, end_hub, route, path_idx,
+                      restricted)
+        return turn, fleet
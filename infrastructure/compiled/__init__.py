@@ -0,0 +1,3 @@
+from .map_compiler import MapCompiler
+
+__all__ = ['MapCompiler']
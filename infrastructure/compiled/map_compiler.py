@@ -0,0 +1,145 @@
+import mmap
+import struct
+import sys
+from array import array
+from typing import Literal, Sequence
+from domain.entities import FlightMap, Graph, Mission
+
+
+class MapCompiler:
+    """
+    Writes a FlightMap to a compact binary file and memory-maps it back.
+
+    Layout (all integers in the byte order recorded in the header):
+        header   magic, byte order, then the counts and offsets below
+        int32    coord_x, coord_y, max_drones        (nb_hubs each)
+        int32    offsets                             (nb_hubs + 1)
+        int32    targets, edge_cost, edge_capacity   (nb_edges each)
+        int8     zones                               (nb_hubs)
+        int32    start, end, nb_drones of every mission
+    Every column is padded to a multiple of 8 bytes.
+        utf-8    hub names, then colors, one per line ('' for no color)
+
+    Loading maps the file read-only and exposes the integer columns as
+    memoryviews over the mapping, so a large map loads without parsing a
+    single line, and processes loading the same file share its pages.
+    """
+
+    MAGIC = b'FLYMAP02'
+    # magic, byte order, nb_hubs, nb_edges, nb_drones, start, end,
+    # names size, colors size, nb_missions
+    HEADER = struct.Struct('<8s8sqqqqqqqq')
+
+    @classmethod
+    def is_compiled(cls, path: str) -> bool:
+        """Whether `path` starts with a compiled map magic."""
+        try:
+            with open(path, 'rb') as file:
+                return file.read(len(cls.MAGIC)) == cls.MAGIC
+        except OSError:
+            return False
+
+    @classmethod
+    def write(cls, flight_map: FlightMap, path: str) -> None:
+        """
+        Compiles `flight_map` into the binary file `path`.
+
+        Args:
+            flight_map: Map to compile.
+            path: Destination file, overwritten if it exists.
+        """
+        graph = flight_map.graph
+        names = '\n'.join(graph.names).encode()
+        colors = '\n'.join(c or '' for c in graph.colors).encode()
+        header = cls.HEADER.pack(
+            cls.MAGIC, sys.byteorder.encode().ljust(8),
+            len(graph), len(graph.targets), flight_map.nb_drones,
+            flight_map.start, flight_map.end, len(names), len(colors),
+            len(flight_map.missions),
+        )
+
+        missions = array('i', [value for mission in flight_map.missions
+                               for value in (mission.start, mission.end,
+                                             mission.nb_drones)])
+        zones = bytes(array('b', graph.zones))
+        with open(path, 'wb') as file:
+            file.write(header)
+            for column in (graph.coord_x, graph.coord_y, graph.max_drones,
+                           graph.offsets, graph.targets, graph.edge_cost,
+                           graph.edge_capacity):
+                data = bytes(array('i', column))
+                file.write(data + bytes(-len(data) % 8))
+            file.write(zones + bytes(-len(zones) % 8))
+            data = bytes(missions)
+            file.write(data + bytes(-len(data) % 8))
+            file.write(names)
+            file.write(colors)
+
+    @classmethod
+    def load(cls, path: str) -> FlightMap:
+        """
+        Memory-maps a compiled map.
+
+        Args:
+            path: File written by write().
+
+        Returns:
+            The map, whose graph columns point into the mapping.
+
+        Raises:
+            ValueError: If the file is not a compiled map.
+        """
+        with open(path, 'rb') as file:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+
+        if bytes(view[:len(cls.MAGIC)]) != cls.MAGIC:
+            raise ValueError(f"{path} is not a compiled map")
+        (_, byteorder, nb_hubs, nb_edges, nb_drones, start, end,
+         names_size, colors_size, nb_missions) = cls.HEADER.unpack_from(view)
+        cursor = cls.HEADER.size
+        native = byteorder.rstrip() == sys.byteorder.encode()
+
+        def column(typecode: Literal['b', 'i'], count: int) -> Sequence[int]:
+            nonlocal cursor
+            size = count * array(typecode).itemsize
+            chunk = view[cursor:cursor + size]
+            cursor += size + (-size % 8)
+            if native:
+                return chunk.cast(typecode)
+            # Foreign byte order: fall back to a swapped copy
+            values = array(typecode, bytes(chunk))
+            values.byteswap()
+            return values
+
+        coord_x = column('i', nb_hubs)
+        coord_y = column('i', nb_hubs)
+        max_drones = column('i', nb_hubs)
+        offsets = column('i', nb_hubs + 1)
+        targets = column('i', nb_edges)
+        edge_cost = column('i', nb_edges)
+        edge_capacity = column('i', nb_edges)
+        zones = column('b', nb_hubs)
+        missions = column('i', 3 * nb_missions)
+        names = bytes(view[cursor:cursor + names_size]).decode()
+        cursor += names_size
+        colors = bytes(view[cursor:cursor + colors_size]).decode()
+
+        graph = Graph(
+            names=tuple(names.split('\n')) if nb_hubs else (),
+            colors=tuple(c or None for c in colors.split('\n'))
+            if nb_hubs else (),
+            coord_x=coord_x,
+            coord_y=coord_y,
+            zones=zones,
+            max_drones=max_drones,
+            offsets=offsets,
+            targets=targets,
+            edge_cost=edge_cost,
+            edge_capacity=edge_capacity,
+        )
+        return FlightMap(
+            graph=graph, nb_drones=nb_drones, start=start, end=end,
+            missions=tuple(Mission(*missions[i:i + 3])
+                           for i in range(0, len(missions), 3)),
+        )
@@ -0,0 +1,3 @@
+from .map_generator import MapGenerator, MapSpec, TOPOLOGIES
+
+__all__ = ['MapGenerator', 'MapSpec', 'TOPOLOGIES']
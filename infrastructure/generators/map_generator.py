@@ -0,0 +1,262 @@
+import math
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterator
+from domain.entities import Zones
+
+
+TOPOLOGIES = ('grid', 'layered', 'geometric', 'bottleneck')
+
+
+@dataclass(frozen=True)
+class MapSpec:
+    """
+    Parameters of a synthetic map.
+
+    Attributes:
+        topology: One of 'grid', 'layered', 'geometric' or 'bottleneck'.
+        hubs: Approximate number of hubs (start and end included).
+        drones: Number of drones in the fleet.
+        restricted: Probability that a hub is a restricted zone.
+        priority: Probability that a hub is a priority zone.
+        blocked: Probability that a hub is a blocked zone.
+        max_drones: Inclusive range of hub capacities.
+        link_capacity: Inclusive range of link capacities.
+        seed: Random seed; the same spec always yields the same map.
+    """
+    topology: str = 'grid'
+    hubs: int = 100
+    drones: int = 10
+    restricted: float = 0.1
+    priority: float = 0.1
+    blocked: float = 0.05
+    max_drones: tuple[int, int] = (1, 3)
+    link_capacity: tuple[int, int] = (1, 2)
+    seed: int = 0
+
+
+class MapGenerator:
+    """
+    Seeded generator of maps in the text map format.
+
+    Builds the requested topology, draws zones and capacities, then makes
+    sure the end hub stays reachable from the start hub: components are
+    chained together and, if blocked hubs cut every route, the hubs of
+    one route are turned back to normal.
+    """
+
+    def generate(self, spec: MapSpec) -> Iterator[str]:
+        """
+        Yields the lines of the map described by `spec`.
+
+        Raises:
+            ValueError: If the topology is unknown or the map too small.
+        """
+        if spec.topology not in TOPOLOGIES:
+            raise ValueError(f"'{spec.topology}' is an invalid topology. "
+                             f"Use one of {', '.join(TOPOLOGIES)}")
+        if spec.hubs < 2:
+            raise ValueError("A map needs at least 2 hubs")
+
+        rnd = random.Random(spec.seed)
+        build = getattr(self, f"_{spec.topology}")
+        coords, links, start, end = build(spec, rnd)
+        self._connect(coords, links)
+
+        zones = [Zones.NORMAL] * len(coords)
+        for hub in range(len(coords)):
+            if hub not in (start, end):
+                zones[hub] = self._zone(spec, rnd)
+        self._unblock_route(links, zones, start, end)
+
+        yield f"# {spec.topology} map, seed {spec.seed}"
+        yield f"nb_drones: {spec.drones}"
+        for hub, (x, y) in enumerate(coords):
+            kind = ('start_hub' if hub == start
+                    else 'end_hub' if hub == end else 'hub')
+            capacity = (max(spec.drones, 1) if hub in (start, end)
+                        else rnd.randint(*spec.max_drones))
+            yield (f"{kind}: h{hub} {x} {y} "
+                   f"[zone={zones[hub].value} max_drones={capacity}]")
+        for a, b in links:
+            capacity = rnd.randint(*spec.link_capacity)
+            yield f"connection: h{a}-h{b} [max_link_capacity={capacity}]"
+
+    def write(self, spec: MapSpec, path: str) -> None:
+        """Writes the map described by `spec` to `path`."""
+        with open(path, 'w') as file:
+            for line in self.generate(spec):
+                file.write(line + '\n')
+
+    @staticmethod
+    def _zone(spec: MapSpec, rnd: random.Random) -> Zones:
+        draw = rnd.random()
+        for zone, probability in ((Zones.RESTRICTED, spec.restricted),
+                                  (Zones.PRIORITY, spec.priority),
+                                  (Zones.BLOCKED, spec.blocked)):
+            if draw < probability:
+                return zone
+            draw -= probability
+        return Zones.NORMAL
+
+    @staticmethod
+    def _grid_links(width: int, height: int,
+                    first: int = 0) -> list[tuple[int, int]]:
+        links: list[tuple[int, int]] = []
+        for y in range(height):
+            for x in range(width):
+                hub = first + y * width + x
+                if x + 1 < width:
+                    links.append((hub, hub + 1))
+                if y + 1 < height:
+                    links.append((hub, hub + width))
+        return links
+
+    def _grid(self, spec: MapSpec, rnd: random.Random) \
+            -> tuple[list[tuple[int, int]], list[tuple[int, int]], int, int]:
+        """A square grid from corner to corner."""
+        width = max(2, math.isqrt(spec.hubs))
+        height = max(1, spec.hubs // width)
+        coords = [(x, y) for y in range(height) for x in range(width)]
+        return coords, self._grid_links(width, height), 0, len(coords) - 1
+
+    def _layered(self, spec: MapSpec, rnd: random.Random) \
+            -> tuple[list[tuple[int, int]], list[tuple[int, int]], int, int]:
+        """
+        Parallel corridors: layers of hubs where each hub links to one to
+        three hubs of the next layer, between a start and an end hub.
+        """
+        width = max(1, math.isqrt(spec.hubs - 2) // 2)
+        depth = max(1, (spec.hubs - 2) // width)
+        coords = [(0, 0)]
+        layers: list[list[int]] = []
+        for layer in range(depth):
+            layers.append(list(range(len(coords), len(coords) + width)))
+            coords.extend((layer + 1, row) for row in range(width))
+        end = len(coords)
+        coords.append((depth + 1, 0))
+
+        links = [(0, hub) for hub in layers[0]]
+        for current, following in zip(layers, layers[1:]):
+            for row, hub in enumerate(current):
+                targets = {following[row]}
+                for _ in range(rnd.randint(0, 2)):
+                    targets.add(rnd.choice(following))
+                links.extend((hub, target) for target in sorted(targets))
+        links.extend((hub, end) for hub in layers[-1])
+        return coords, links, 0, end
+
+    def _geometric(self, spec: MapSpec, rnd: random.Random) \
+            -> tuple[list[tuple[int, int]], list[tuple[int, int]], int, int]:
+        """
+        Random geometric graph: hubs scattered in a square, linked when
+        closer than a radius giving about six neighbors per hub.
+        """
+        side = max(10, 10 * math.isqrt(spec.hubs))
+        radius = side * math.sqrt(6 / (math.pi * spec.hubs))
+        coords: list[tuple[int, int]] = []
+        seen: set[tuple[int, int]] = set()
+        while len(coords) < spec.hubs:
+            point = (rnd.randint(0, side), rnd.randint(0, side))
+            if point not in seen:
+                seen.add(point)
+                coords.append(point)
+
+        # Bucket hubs by cell so only nearby pairs are compared
+        cell = max(1, int(radius))
+        buckets: dict[tuple[int, int], list[int]] = {}
+        for hub, (x, y) in enumerate(coords):
+            buckets.setdefault((x // cell, y // cell), []).append(hub)
+        links: list[tuple[int, int]] = []
+        for hub, (x, y) in enumerate(coords):
+            cx, cy = x // cell, y // cell
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for other in buckets.get((cx + dx, cy + dy), ()):
+                        ox, oy = coords[other]
+                        if other > hub and math.dist((x, y), (ox, oy)) \
+                                <= radius:
+                            links.append((hub, other))
+
+        start = min(range(len(coords)), key=lambda h: sum(coords[h]))
+        end = max(range(len(coords)), key=lambda h: sum(coords[h]))
+        return coords, links, start, end
+
+    def _bottleneck(self, spec: MapSpec, rnd: random.Random) \
+            -> tuple[list[tuple[int, int]], list[tuple[int, int]], int, int]:
+        """
+        Two grids joined by a single narrow corridor, so the whole fleet
+        has to squeeze through a few hubs.
+        """
+        corridor = max(1, spec.hubs // 20)
+        side = max(2, math.isqrt(max(4, (spec.hubs - corridor) // 2)))
+        cluster = side * side
+
+        coords = [(x, y) for y in range(side) for x in range(side)]
+        coords.extend((side + i, side - 1) for i in range(corridor))
+        offset = side + corridor
+        coords.extend((offset + x, y) for y in range(side)
+                      for x in range(side))
+
+        links = self._grid_links(side, side)
+        links.extend(self._grid_links(side, side, cluster + corridor))
+        chain = ([cluster - 1]
+                 + list(range(cluster, cluster + corridor))
+                 + [cluster + corridor + (side - 1) * side])
+        links.extend(zip(chain, chain[1:]))
+        return coords, links, 0, len(coords) - 1
+
+    @staticmethod
+    def _connect(coords: list[tuple[int, int]],
+                 links: list[tuple[int, int]]) -> None:
+        """Links consecutive connected components so the map is whole."""
+        parent = list(range(len(coords)))
+
+        def find(hub: int) -> int:
+            while parent[hub] != hub:
+                parent[hub] = parent[parent[hub]]
+                hub = parent[hub]
+            return hub
+
+        for a, b in links:
+            parent[find(a)] = find(b)
+        roots = sorted({find(hub) for hub in range(len(coords))})
+        links.extend(zip(roots, roots[1:]))
+
+    @staticmethod
+    def _unblock_route(links: list[tuple[int, int]], zones: list[Zones],
+                       start: int, end: int) -> None:
+        """
+        Turns the blocked hubs of one start-end route back to normal when
+        blocked zones cut every route.
+        """
+        neighbors: list[list[int]] = [[] for _ in zones]
+        for a, b in links:
+            neighbors[a].append(b)
+            neighbors[b].append(a)
+
+        def bfs(avoid_blocked: bool) -> list[int]:
+            came_from = {start: start}
+            queue = deque([start])
+            while queue:
+                hub = queue.popleft()
+                if hub == end:
+                    path = [hub]
+                    while hub != start:
+                        hub = came_from[hub]
+                        path.append(hub)
+                    return path
+                for other in neighbors[hub]:
+                    if other in came_from:
+                        continue
+                    if avoid_blocked and zones[other] == Zones.BLOCKED:
+                        continue
+                    came_from[other] = hub
+                    queue.append(other)
+            return []
+
+        if not bfs(avoid_blocked=True):
+            for hub in bfs(avoid_blocked=False):
+                if zones[hub] == Zones.BLOCKED:
+                    zones[hub] = Zones.NORMAL
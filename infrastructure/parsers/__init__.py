@@ -1,3 +1,6 @@
 from .map_parser import MapParser
+from .map_tokenizer import (InvalidMapError, MapError, MapTokenizer,
+                            open_map)
 
-__all__ = ['MapParser']
+__all__ = ['MapParser', 'InvalidMapError', 'MapError', 'MapTokenizer',
+           'open_map']
@@ -1,6 +1,19 @@
-from typing import Sequence
-from domain.entities import Drone, Hub, Zones
-from domain.services import RoutingService, SimulationService, DroneFactory
+import time
+from contextlib import AbstractContextManager, nullcontext
+from domain.entities import FlightMap, Graph, Hub, Mission
+from domain.services import (RoutingService, SimulationService, DroneFactory,
+                             FleetPlanner)
+from infrastructure.compiled import MapCompiler
+from .map_tokenizer import (METADATA, InvalidMapError, MapTokenizer,
+                            open_map)
+
+
+def _integer(text: str, what: str) -> int:
+    """`text` as an integer, or a ValueError naming `what` it is."""
+    try:
+        return int(text)
+    except ValueError:
+        raise ValueError(f"'{text}' is not a valid {what}") from None
 
 
 class MapParser:
@@ -12,16 +25,29 @@ class MapParser:
     alternative implementations. instead, the dependencies are injected via
     the constructor; callers (for example :mod:`main`) can supply specific
     instances or let the parser create its own defaults.
+
+    Attributes:
+        max_errors: Errors of a broken map kept and reported in full.
+        lines: Lines read by the last load() call.
+        seconds: Wall time of the last load() call.
     """
 
     def __init__(self,
                  routing_service: RoutingService,
                  simulation_service: SimulationService,
-                 drone_factory: DroneFactory):
+                 drone_factory: DroneFactory,
+                 fleet_planner: FleetPlanner | None = None,
+                 cooperative: bool = False,
+                 max_errors: int = 100):
 
         self.routing = routing_service
         self.simulation = simulation_service
         self.drone_factory = drone_factory
+        self.planner = fleet_planner or FleetPlanner(routing_service)
+        self.cooperative = cooperative
+        self.max_errors = max_errors
+        self.lines = 0
+        self.seconds = 0.0
 
     def parse_metadata(self, metadata: str) -> dict[str, str]:
         """
@@ -35,151 +61,245 @@ class MapParser:
         Returns:
             Dictionary mapping metadata keys to their values.
         """
-        result: dict[str, str] = {}
-        for item in metadata.split():
-            if '=' in item:
-                key, value = item.split('=', 1)
-                result[key.strip()] = value.strip()
-        return result
+        return dict(METADATA.findall(metadata))
 
     def parse_map(self, map_path: str) -> None:
         """
         Parses the map file, builds hubs and connections, initializes drones,
-        and starts the simulation. Handles all parsing rules,
-        metadata extraction, and error handling for robust operation.
+        and starts the simulation.
 
         Args:
-            map_path: Path to the map file to parse.
+            map_path: Path to the map file to parse, see load().
 
         Returns:
             None. Initiates simulation after successful parsing.
+
+        Raises:
+            InvalidMapError: If the map breaks any of the format rules.
         """
+        print(f"Reading {map_path}")
+        with self.phase('load'):
+            flight_map = self.load(map_path)
+        self.simulate(flight_map)
+
+    def load(self, map_path: str) -> FlightMap:
+        """
+        Parses the map file into an immutable, reusable FlightMap, without
+        routing or simulating anything.
+
+        The file is streamed through a MapTokenizer in a single pass, so
+        only the hubs and connections are kept in memory. Every broken
+        rule is collected with its line number and all of them are
+        reported together. A compiled map is memory-mapped instead, and
+        counts no lines. `lines` and `seconds` hold the size and parse
+        time of the last map loaded.
 
+        Args:
+            map_path: Path to the map file to parse: plain text, a gzip or
+                xz archive, a compiled map, or '-' for stdin.
+
+        Returns:
+            The parsed map.
+
+        Raises:
+            InvalidMapError: If the map breaks any of the format rules.
+        """
+        started = time.perf_counter()
+        if MapCompiler.is_compiled(map_path):
+            flight_map = MapCompiler.load(map_path)
+            self.lines = 0
+            self.seconds = time.perf_counter() - started
+            return flight_map
+
+        tokenizer = MapTokenizer(self.max_errors)
+        report = tokenizer.report
         start_name: str = ""
         end_name: str = ""
         hubs: dict[str, Hub] = {}
-        drones: list[Drone] = []
-        adjacencies: dict[str, list[str]] = {}
         link_capacity: dict[tuple[str, str], int] = {}
+        missions: dict[tuple[str, str], int] = {}
         nb_drones: int = 0
-
-        try:
-            with open(map_path, 'r') as file:
-                print(f"Reading {map_path}")
-                # Leer linea por linea del doc.
-                for line in file:
-                    line = line.strip()
-
-                    # Ignorar lineas vacías y comentarios
-                    if not line or line.startswith('#'):
-                        continue
-
-                    # Identificar variable 'nb_drones'
-                    if line.startswith('nb_drones'):
-                        nb_drones = int(line.split(':')[1].strip())
-
-                        # Si es negativo: raise
-                        if nb_drones < 0:
+        nb_drones_line = 0
+        # 'start_hub' and 'end_hub' lines seen, even the rejected ones
+        declared: set[str] = set()
+        # Connections and missions naming a hub not declared yet, checked
+        # once every hub is known: (line, 'Connection' or 'Mission', a, b)
+        pending: list[tuple[int, str, str, str]] = []
+
+        with open_map(map_path) as file:
+            for line_no, key, fields, metadata in tokenizer.tokenize(file):
+                try:
+                    # Conexión entre dos hubs: 'connection: a-b [metadata]'
+                    if key == 'connection':
+                        nodes = fields[0].split('-') if fields else []
+                        if len(fields) != 1 or len(nodes) != 2 \
+                                or not all(nodes):
                             raise ValueError(
-                                "'nb_drones' must be a positive number"
+                                "A connection must be "
+                                "'connection: hub-hub [metadata]'"
+                            )
+                        a, b = nodes
+                        max_capacity = _integer(
+                            metadata.get('max_link_capacity', '1'),
+                            'max_link_capacity'
+                        )
+                        if max_capacity < 0:
+                            raise ValueError(
+                                "'max_capacity' must be a positive integer"
+                            )
+                        if (a, b) in link_capacity \
+                                or (b, a) in link_capacity:
+                            raise ValueError(
+                                "Connections can't be duplicated"
                             )
-                        for d in self.drone_factory.generate_drones(nb_drones):
-                            drones.append(d)
-
-                    # Identificar variable 'hub', 'start_hub, end_hub'
-                    elif line.startswith(('hub', 'start_hub', 'end_hub')):
-                        parts: Sequence[str] = line.split(':')
-                        x_hub: str = parts[0]
-                        data: Sequence[str] = parts[1].split()
-
-                        # Guardar path (hub_name) y coordenadas
-                        path: str = data[0]
-                        x: int = int(data[1])
-                        y: int = int(data[2])
-
-                        # Guardar el nombre del start/end hub
-                        if x_hub == 'start_hub':
-                            start_name = path
-                        elif x_hub == 'end_hub':
-                            end_name = path
-
-                        # Crear nuevo (@dataclass) Hub con info del nodo
+                        link_capacity[(a, b)] = max_capacity
+                        if a not in hubs or b not in hubs:
+                            pending.append((line_no, 'Connection', a, b))
+
+                    # 'hub', 'start_hub' o 'end_hub': 'hub: name x y [...]'
+                    elif key in ('hub', 'start_hub', 'end_hub'):
+                        declared.add(key)
+                        if len(fields) != 3:
+                            raise ValueError(
+                                f"A hub must be '{key}: name x y "
+                                "[metadata]'"
+                            )
+                        name = fields[0]
+                        if '-' in name:
+                            raise ValueError(
+                                f"{name} name don't support spaces and "
+                                "hyphen"
+                            )
+                        if name in hubs:
+                            raise ValueError("Zones can't be repeated")
                         hub = Hub(
-                            name=path,
-                            coord=(x, y),
-                            color=None,
-                            max_drones=1,
-                            zone=Zones.NORMAL
+                            name=name,
+                            coord=(_integer(fields[1], 'coordinate'),
+                                   _integer(fields[2], 'coordinate')),
                         )
-
-                        # Identificar metadatos y guardarlos en hub anterior
-                        if '[' in line:
-                            metadata = line.split('[')[1].split(']')[0]
-                            result = self.parse_metadata(metadata)
-                            # Añadir metadata con hub.set_metadata()
-                            hub.set_metadata(result)
-
-                        if path in hubs:
-                            raise Exception("Zones can't be repeated")
-                        elif '-' in path or ' ' in path:
+                        if 'max_drones' in metadata and _integer(
+                            metadata['max_drones'], 'max_drones'
+                        ) < 0:
                             raise ValueError(
-                                f"{path} name don't support spaces and hyphen"
+                                "'max_drones' must be a positive integer"
                             )
-                        hubs[path] = hub
-
-                    elif line.startswith('connection'):
-                        parts = line.split(':')
-                        data = parts[1].split()
-                        nodes: Sequence[str] = data[0].split('-')
-
-                        # hub_a - hub_b
-                        a: str = nodes[0].strip()
-                        b: str = nodes[1].strip()
-
-                        # Si max_capacity está en la metadata de connection
-                        max_capacity = 1
-                        if '[' in line:
-                            metadata = line.split('[')[1].split(']')[0].strip()
-                            result = self.parse_metadata(metadata)
-                            if 'max_link_capacity' in result:
-                                max_capacity = int(result['max_link_capacity'])
-
-                        # Si es negativo: raise
-                        if max_capacity < 0:
+                        if metadata:
+                            hub.set_metadata(metadata)
+                        hubs[name] = hub
+                        if key == 'start_hub':
+                            start_name = name
+                        elif key == 'end_hub':
+                            end_name = name
+
+                    # Grupo de drones entre dos hubs: 'mission: a-b 30'
+                    elif key == 'mission':
+                        nodes = fields[0].split('-') if fields else []
+                        if len(fields) != 2 or len(nodes) != 2 \
+                                or not all(nodes):
                             raise ValueError(
-                                "'max_capacity' must be a positive integer"
+                                "A mission must be 'mission: start-end "
+                                "count'"
+                            )
+                        count = _integer(fields[1], 'number of drones')
+                        if count <= 0:
+                            raise ValueError(
+                                "A mission needs a positive number of drones"
                             )
+                        a, b = nodes
+                        if (a, b) in missions:
+                            raise ValueError("Missions can't be duplicated")
+                        missions[(a, b)] = count
+                        if a not in hubs or b not in hubs:
+                            pending.append((line_no, 'Mission', a, b))
+
+                    # Variable 'nb_drones'
+                    else:
+                        if len(fields) != 1:
+                            raise ValueError(
+                                "'nb_drones' must be 'nb_drones: count'"
+                            )
+                        nb_drones = _integer(fields[0], 'number of drones')
+                        nb_drones_line = line_no
+                        if nb_drones < 0:
+                            raise ValueError(
+                                "'nb_drones' must be a positive number"
+                            )
+                except ValueError as e:
+                    report(line_no, str(e))
+
+        for line_no, kind, a, b in pending:
+            for name in (a, b):
+                if name not in hubs:
+                    report(line_no,
+                           f"{kind} {a}-{b} references unknown hub '{name}'")
+        if not missions and not {'start_hub', 'end_hub'} <= declared:
+            report(0, "Map needs both a 'start_hub' and an 'end_hub'")
+        total = sum(missions.values())
+        if missions and nb_drones and nb_drones != total:
+            report(nb_drones_line,
+                   f"'nb_drones' is {nb_drones} but the missions have "
+                   f"{total} drones")
+        self.lines = tokenizer.lines
+        self.seconds = time.perf_counter() - started
+        if tokenizer.error_count:
+            raise InvalidMapError(
+                map_path,
+                sorted(tokenizer.errors, key=lambda error: error.line),
+                tokenizer.error_count,
+            )
 
-                        # Para comprobar link_capacity es necesario guardar las
-                        # conexiones en un dict. Luego se comparan
-                        link_key: tuple[str, str] = (a, b)
-                        if link_key in link_capacity \
-                                or link_key[::-1] in link_capacity:
-                            raise ValueError("Connections can't be duplicated")
-                        link_capacity[link_key] = max_capacity
-
-                        # Adjacencies guardan los caminos desde cada nodo
-                        adjacencies.setdefault(a, []).append(b)
-                        adjacencies.setdefault(b, []).append(a)
-
-            if not start_name or not end_name:
-                return
-
-            path_solved: list[str] = self.routing.find_path(hubs,
-                                                            adjacencies,
-                                                            hubs[start_name],
-                                                            hubs[end_name])
-
-            for d in drones:
-                d.start_hub = start_name
-                d.end_hub = end_name
-                d.path_idx = 0
-                d.path = path_solved
-                d.restricted = 0
-
-            self.simulation.simulate_turns(
-                drones, adjacencies, hubs, link_capacity
+        # Compilar hubs y conexiones en el grafo de ids enteros
+        graph = Graph.build(hubs, link_capacity)
+        self.seconds = time.perf_counter() - started
+        if not missions:
+            return FlightMap(
+                graph=graph,
+                nb_drones=nb_drones,
+                start=graph.index[start_name],
+                end=graph.index[end_name],
             )
 
-        except Exception as e:
-            print(f"Error: {e}")
+        # Las misiones sustituyen al par start_hub/end_hub
+        resolved = [Mission(graph.index[a], graph.index[b], count)
+                    for (a, b), count in missions.items()]
+        return FlightMap(
+            graph=graph,
+            nb_drones=total,
+            start=resolved[0].start,
+            end=resolved[0].end,
+            missions=tuple(resolved),
+        )
+
+    def simulate(self, flight_map: FlightMap) -> None:
+        """
+        Builds the fleet of a loaded map, routes it and runs the simulation.
+        The map is not modified, so it can be simulated any number of times.
+
+        Args:
+            flight_map: Map returned by load() or by a compiled map loader.
+
+        Returns:
+            None. Prints the simulation output.
+        """
+        graph = flight_map.graph
+        fleet = self.drone_factory.generate_missions(graph,
+                                                     flight_map.missions)
+
+        # Repartir la flota entre rutas disjuntas
+        with self.phase('plan'):
+            self.planner.plan_fleet(graph, fleet)
+
+        with self.phase('simulate'):
+            if self.cooperative:
+                self.simulation.simulate_cooperative(fleet.to_drones(),
+                                                     graph)
+            else:
+                self.simulation.simulate_fleet(fleet, graph)
+
+    def phase(self, name: str) -> AbstractContextManager[None]:
+        """
+        Times the enclosed block as phase `name` in the simulation
+        service's metrics, if it collects any.
+        """
+        metrics = self.simulation.metrics
+        return metrics.phase(name) if metrics is not None else nullcontext()
@@ -0,0 +1,171 @@
+import difflib
+import gzip
+import io
+import lzma
+import re
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import IO, Iterable, Iterator
+
+
+# Keys of the map format
+KEYS = ('nb_drones', 'start_hub', 'end_hub', 'hub', 'connection', 'mission')
+
+# `key: fields [metadata]`, with an optional trailing comment
+LINE = re.compile(r'(\w+)\s*:([^\[\]#]*)(?:\[([^\]]*)\])?\s*(?:#.*)?$')
+# `key=value` pairs of the metadata
+METADATA = re.compile(r'([^\s=]+)=(\S*)')
+
+GZIP_MAGIC = b'\x1f\x8b'
+XZ_MAGIC = b'\xfd7zXZ\x00'
+
+# One line of a map: (line number, key, fields, metadata)
+Token = tuple[int, str, list[str], dict[str, str]]
+
+
+@dataclass(frozen=True)
+class MapError:
+    """
+    One broken rule of a map file.
+
+    Attributes:
+        line: Line of the map where it was found, starting at 1, or 0 for
+            rules about the whole map.
+        message: What went wrong.
+    """
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        if not self.line:
+            return self.message
+        return f"line {self.line}: {self.message}"
+
+
+class InvalidMapError(ValueError):
+    """
+    Raised when a map breaks format rules; holds every error found.
+
+    Attributes:
+        errors: The errors, in line order, at most the tokenizer's
+            `max_errors` of them.
+        total: Number of errors found, including those not kept.
+    """
+
+    def __init__(self, path: str, errors: list[MapError], total: int):
+        self.errors = errors
+        self.total = total
+        lines = [f"{total} error{'s' if total > 1 else ''} in {path}"]
+        lines.extend(str(error) for error in errors)
+        if total > len(errors):
+            lines.append(f"... and {total - len(errors)} more")
+        super().__init__('\n'.join(lines))
+
+
+@contextmanager
+def open_map(path: str) -> Iterator[IO[str]]:
+    """
+    Opens a text map for streaming: a plain file, a gzip or xz archive
+    (recognized by their magic bytes, whatever the file name) or stdin
+    for '-'.
+    """
+    if path == '-':
+        raw = sys.stdin.buffer
+        head = raw.peek(len(XZ_MAGIC)) if isinstance(
+            raw, io.BufferedReader) else b''
+        if head.startswith((GZIP_MAGIC, XZ_MAGIC)):
+            with _decompress(raw, head) as text:
+                yield text
+        else:
+            yield sys.stdin
+        return
+
+    with open(path, 'rb') as file:
+        head = file.read(len(XZ_MAGIC))
+        file.seek(0)
+        if head.startswith((GZIP_MAGIC, XZ_MAGIC)):
+            with _decompress(file, head) as text:
+                yield text
+            return
+    with open(path, 'r') as text_file:
+        yield text_file
+
+
+def _decompress(raw: IO[bytes], head: bytes) -> IO[str]:
+    """Text stream over the gzip or xz archive `raw`."""
+    if head.startswith(GZIP_MAGIC):
+        return io.TextIOWrapper(gzip.GzipFile(fileobj=raw))
+    return io.TextIOWrapper(lzma.LZMAFile(raw))
+
+
+class MapTokenizer:
+    """
+    Single-pass tokenizer of the text map format.
+
+    Every line goes through one precompiled pattern that splits it into
+    its key, its whitespace-separated fields and its `[key=value ...]`
+    metadata. Lines are read one at a time, so the tokenizer holds a
+    single line whatever the size of the map. A line that does not
+    match, or has an unknown key, is recorded in `errors` (with a
+    suggestion for a misspelled key) and skipped, so the whole map is
+    checked in one pass. Past `max_errors`, errors are only counted, so
+    a badly broken file does not fill the memory either.
+
+    Attributes:
+        max_errors: Errors kept in `errors`.
+        errors: First errors found in the lines tokenized so far.
+        error_count: Errors found so far, including those not kept.
+        lines: Lines read so far.
+    """
+
+    def __init__(self, max_errors: int = 100) -> None:
+        self.max_errors = max_errors
+        self.errors: list[MapError] = []
+        self.error_count = 0
+        self.lines = 0
+
+    def report(self, line: int, message: str) -> None:
+        """Records an error found at `line` (0 for the whole map)."""
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(MapError(line, message))
+
+    def tokenize(self, lines: Iterable[str]) -> Iterator[Token]:
+        """
+        Yields the tokens of `lines`, skipping blank lines and comments.
+
+        Args:
+            lines: Lines of a map, with or without their line breaks.
+
+        Yields:
+            (line number, key, fields, metadata) of every map line.
+        """
+        match = LINE.match
+        find_metadata = METADATA.findall
+        keys = frozenset(KEYS)
+        line_no = self.lines
+        for line_no, line in enumerate(lines, line_no + 1):
+            line = line.strip()
+            if not line or line[0] == '#':
+                continue
+            found = match(line)
+            if found is None:
+                self.report(line_no,
+                            f"'{line}' must be 'key: value [metadata]'")
+                continue
+            key, fields, metadata = found.groups()
+            if key not in keys:
+                self.report(line_no, self._unknown(key))
+                continue
+            yield (line_no, key, fields.split(),
+                   dict(find_metadata(metadata)) if metadata else {})
+        self.lines = line_no
+
+    @staticmethod
+    def _unknown(key: str) -> str:
+        suggestion = difflib.get_close_matches(key, KEYS, n=1)
+        if suggestion:
+            return f"'{key}' is an unknown key. Did you mean " \
+                   f"'{suggestion[0]}'?"
+        return f"'{key}' is an unknown key"
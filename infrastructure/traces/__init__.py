@@ -0,0 +1,3 @@
+from .trace_file import TraceFile, TraceFileWriter
+
+__all__ = ['TraceFile', 'TraceFileWriter']
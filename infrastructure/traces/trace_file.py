@@ -0,0 +1,343 @@
+import mmap
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Callable, Literal, MutableSequence, Sequence
+from domain.entities import Graph
+from infrastructure.checkpoints import CheckpointFile
+from utils import TurnWriter
+
+
+MAGIC = b'FLYTRC01'
+# magic, byte order, nb_drones, nb_hubs, start turn, snapshot interval,
+# map fingerprint
+HEADER = struct.Struct('<8s8sqqqqq')
+# nb_turns, nb_snapshots, index offset, complete, magic
+TRAILER = struct.Struct('<qqqq8s')
+
+
+class TraceFileWriter(TurnWriter):
+    """
+    Records the moves of a simulation in a columnar binary trace.
+
+    Layout (all integers in the byte order recorded in the header):
+        header    magic, byte order, nb_drones, nb_hubs, the turn the run
+                  started after, the snapshot interval and the
+                  fingerprint of the map
+        per turn  int32 drones, sources, targets  (one per move)
+        snapshot  int32 hub of every drone        (nb_drones), before
+                  the first turn and then every `snapshot_every` turns
+        index     int64 offset of every turn, int32 moves of every turn,
+                  int64 offset of every snapshot
+        trailer   nb_turns, nb_snapshots, index offset, whether the run
+                  finished, and the magic again
+    Every block is padded to a multiple of 8 bytes. Drones are numbered
+    by fleet index, so `D<n>` is drone n - 1.
+
+    The index is written when the run finishes or is stopped; a trace
+    cut short by a crash has no trailer and does not load.
+
+    Attributes:
+        path: Destination file, replaced if it exists.
+        snapshot_every: Turns between two snapshots. A lookup replays at
+            most that many turns on top of a snapshot.
+    """
+
+    def __init__(self, path: str, snapshot_every: int = 100) -> None:
+        if snapshot_every < 1:
+            raise ValueError("snapshot_every must be positive")
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self._graph: Graph | None = None
+        self._file: BinaryIO | None = None
+        self._offset = 0
+        self._positions = array('i')
+        self._drones = array('i')
+        self._sources = array('i')
+        self._targets = array('i')
+        self._turn_offsets = array('q')
+        self._move_counts = array('i')
+        self._snapshot_offsets = array('q')
+
+    def bind(self, graph: Graph) -> None:
+        self._graph = graph
+
+    def begin(self, positions: Callable[[], Sequence[int]],
+              turn: int) -> None:
+        if self._graph is None:
+            raise RuntimeError("bind() must be called before begin()")
+        self._close(False)
+        self._positions = array('i', positions())
+        for column in (self._drones, self._sources, self._targets,
+                       self._turn_offsets, self._move_counts,
+                       self._snapshot_offsets):
+            del column[:]
+        self._file = open(self.path, 'wb', buffering=1 << 20)
+        self._offset = 0
+        self._write(HEADER.pack(
+            MAGIC, sys.byteorder.encode().ljust(8), len(self._positions),
+            len(self._graph), turn, self.snapshot_every,
+            CheckpointFile.fingerprint(self._graph),
+        ))
+        self._snapshot()
+
+    def move(self, drone: str, actual: int, nxt: int) -> None:
+        index = int(drone[1:]) - 1
+        self._drones.append(index)
+        self._sources.append(actual)
+        self._targets.append(nxt)
+        # A drone flying into a restricted hub counts as there already
+        self._positions[index] = nxt
+
+    def end_turn(self) -> None:
+        if self._file is None:
+            raise RuntimeError("begin() must be called before the first "
+                               "turn")
+        self._turn_offsets.append(self._offset)
+        self._move_counts.append(len(self._drones))
+        self._write(bytes(self._drones) + bytes(self._sources)
+                    + bytes(self._targets))
+        del self._drones[:]
+        del self._sources[:]
+        del self._targets[:]
+        if len(self._turn_offsets) % self.snapshot_every == 0:
+            self._snapshot()
+
+    def finish(self, turns: int) -> None:
+        self._close(True)
+
+    def abort(self) -> None:
+        self._close(False)
+
+    def _snapshot(self) -> None:
+        self._snapshot_offsets.append(self._offset)
+        self._write(bytes(self._positions))
+
+    def _write(self, data: bytes) -> None:
+        if self._file is None:
+            raise RuntimeError("trace is not open")
+        self._file.write(data + bytes(-len(data) % 8))
+        self._offset += len(data) + (-len(data) % 8)
+
+    def _close(self, complete: bool) -> None:
+        """Writes the index and trailer, if a trace is open."""
+        if self._file is None:
+            return
+        index = self._offset
+        for column in (self._turn_offsets, self._move_counts,
+                       self._snapshot_offsets):
+            self._write(bytes(column))
+        self._write(TRAILER.pack(len(self._turn_offsets),
+                                 len(self._snapshot_offsets), index,
+                                 int(complete), MAGIC))
+        self._file.close()
+        self._file = None
+
+
+class TraceFile:
+    """
+    Memory-mapped reader of a trace written by TraceFileWriter.
+
+    The index gives the offset of any turn in O(1), so the moves of a
+    turn are read without touching the turns before it. The fleet at a
+    turn is rebuilt from the last snapshot before it plus at most
+    `snapshot_every` turns of moves. Turns are numbered as in the run:
+    moves() takes a turn after `start_turn`, and positions() the number
+    of turns simulated, from `start_turn` to `turns`.
+
+    Attributes:
+        path: The trace file.
+        nb_drones: Drones of the recorded fleet.
+        nb_hubs: Hubs of the map of the run.
+        start_turn: Turns simulated before the trace began, when the run
+            was resumed from a checkpoint.
+        turns: Turns simulated when the trace ended.
+        snapshot_every: Turns between two snapshots.
+        complete: Whether the run finished, rather than being stopped.
+    """
+
+    def __init__(self, path: str, graph: Graph | None = None) -> None:
+        """
+        Memory-maps a trace.
+
+        Args:
+            path: File written by TraceFileWriter.
+            graph: Compiled hub graph of the run, checked against the
+                fingerprint of the trace if given.
+
+        Raises:
+            ValueError: If the file is not a complete trace, or was
+                recorded on another map.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            size = file.seek(0, 2)
+            if size < HEADER.size + TRAILER.size:
+                raise ValueError(f"{path} is not a trace")
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+
+        (magic, byteorder, nb_drones, nb_hubs, start_turn, snapshot_every,
+         fingerprint) = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a trace")
+        (nb_turns, nb_snapshots, index, complete,
+         end) = TRAILER.unpack_from(view, size - TRAILER.size)
+        if end != MAGIC:
+            raise ValueError(f"{path} is an incomplete trace")
+        if graph is not None and \
+                fingerprint != CheckpointFile.fingerprint(graph):
+            raise ValueError(f"{path} was recorded on another map")
+        self.nb_drones: int = nb_drones
+        self.nb_hubs: int = nb_hubs
+        self.start_turn: int = start_turn
+        self.turns: int = start_turn + nb_turns
+        self.snapshot_every: int = snapshot_every
+        self.complete = bool(complete)
+        self._native = byteorder.rstrip() == sys.byteorder.encode()
+
+        cursor = index
+
+        def column(typecode: Literal['i', 'q'], count: int) -> Sequence[int]:
+            nonlocal cursor
+            size = count * array(typecode).itemsize
+            chunk = view[cursor:cursor + size]
+            cursor += size + (-size % 8)
+            if self._native:
+                return chunk.cast(typecode)
+            # Foreign byte order: fall back to a swapped copy
+            values = array(typecode, bytes(chunk))
+            values.byteswap()
+            return values
+
+        self._turn_offsets = column('q', nb_turns)
+        self._move_counts = column('i', nb_turns)
+        self._snapshot_offsets = column('q', nb_snapshots)
+
+    @staticmethod
+    def is_trace(path: str) -> bool:
+        """Whether `path` starts with the trace magic."""
+        try:
+            with open(path, 'rb') as file:
+                return file.read(len(MAGIC)) == MAGIC
+        except OSError:
+            return False
+
+    def moves(self, turn: int) -> list[tuple[int, int, int]]:
+        """
+        Returns the moves of one turn.
+
+        Args:
+            turn: Turn number, after `start_turn` and at most `turns`.
+
+        Returns:
+            (drone index, source hub id, target hub id) of every move, in
+            the order the simulation settled them.
+
+        Raises:
+            IndexError: If the trace has no such turn.
+        """
+        return list(zip(*self._columns(turn)))
+
+    def positions(self, turn: int) -> MutableSequence[int]:
+        """
+        Rebuilds the fleet after `turn` turns.
+
+        Args:
+            turn: Turns simulated, from `start_turn` to `turns`.
+
+        Returns:
+            The hub of every drone, by drone index: the hub it is in, its
+            end hub once landed, or the restricted hub it is flying to.
+
+        Raises:
+            IndexError: If the trace does not cover that turn.
+        """
+        snapshot = self._snapshot(turn)
+        positions = self._read(
+            'i', self._snapshot_offsets[snapshot], self.nb_drones
+        )
+        for t in range(self._snapshot_turn(snapshot) + 1, turn + 1):
+            drones, _, targets = self._columns(t)
+            for drone, target in zip(drones, targets):
+                positions[drone] = target
+        return positions
+
+    def position(self, drone: int, turn: int) -> int:
+        """
+        Hub of one drone after `turn` turns, as positions() gives it,
+        without rebuilding the rest of the fleet.
+
+        Raises:
+            IndexError: If the trace has no such drone or turn.
+        """
+        if not 0 <= drone < self.nb_drones:
+            raise IndexError(f"drone {drone} is not in the trace")
+        snapshot = self._snapshot(turn)
+        hub = self._read('i', self._snapshot_offsets[snapshot]
+                         + 4 * drone, 1)[0]
+        for t in range(self._snapshot_turn(snapshot) + 1, turn + 1):
+            drones, _, targets = self._columns(t)
+            # A drone moves at most once per turn
+            if drone in drones:
+                hub = targets[drones.index(drone)]
+        return hub
+
+    def saturated_links(self, graph: Graph, first: int,
+                        last: int) -> list[tuple[int, int, int]]:
+        """
+        Finds the links flown by as many drones as their capacity.
+
+        Args:
+            graph: Compiled hub graph of the run, for the capacities.
+            first: First turn to search, clamped to the trace.
+            last: Last turn to search, clamped to the trace.
+
+        Returns:
+            (turn, source hub id, target hub id) of every saturated link,
+            by turn, then in the order its last drone flew it.
+        """
+        capacity = graph.edge_capacity
+        saturated: list[tuple[int, int, int]] = []
+        for t in range(max(first, self.start_turn + 1),
+                       min(last, self.turns) + 1):
+            usage: dict[tuple[int, int], int] = {}
+            _, sources, targets = self._columns(t)
+            for link in zip(sources, targets):
+                usage[link] = flown = usage.get(link, 0) + 1
+                if flown == capacity[graph.edge(*link)]:
+                    saturated.append((t, *link))
+        return saturated
+
+    def _snapshot(self, turn: int) -> int:
+        """Last snapshot at or before `turn`."""
+        if not self.start_turn <= turn <= self.turns:
+            raise IndexError(f"turn {turn} is not in the trace "
+                             f"({self.start_turn} to {self.turns})")
+        return min((turn - self.start_turn) // self.snapshot_every,
+                   len(self._snapshot_offsets) - 1)
+
+    def _snapshot_turn(self, snapshot: int) -> int:
+        return self.start_turn + snapshot * self.snapshot_every
+
+    def _columns(self, turn: int) \
+            -> tuple[MutableSequence[int], MutableSequence[int],
+                     MutableSequence[int]]:
+        """Drones, sources and targets of the moves of `turn`."""
+        if not self.start_turn < turn <= self.turns:
+            raise IndexError(f"turn {turn} is not in the trace "
+                             f"({self.start_turn + 1} to {self.turns})")
+        k = turn - self.start_turn - 1
+        offset = self._turn_offsets[k]
+        count = self._move_counts[k]
+        return (self._read('i', offset, count),
+                self._read('i', offset + 4 * count, count),
+                self._read('i', offset + 8 * count, count))
+
+    def _read(self, typecode: Literal['i'], offset: int,
+              count: int) -> MutableSequence[int]:
+        values = array(typecode)
+        values.frombytes(self._map[offset:offset + count * values.itemsize])
+        if not self._native:
+            values.byteswap()
+        return values
@@ -0,0 +1,3 @@
+from .trace_validator import TraceValidator, Violation
+
+__all__ = ['TraceValidator', 'Violation']
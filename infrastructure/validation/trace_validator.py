@@ -0,0 +1,262 @@
+import re
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import Iterable
+from domain.entities import FlightMap
+from domain.entities.graph import RESTRICTED
+
+
+# Zone colors of the terminal output, stripped before parsing
+ANSI_CODE = re.compile(r'\x1b\[[0-9;]*m')
+
+
+@dataclass(frozen=True)
+class Violation:
+    """
+    First rule broken by a trace.
+
+    Attributes:
+        turn: Turn of the offending move, starting at 1.
+        line: Line of the trace where it was found, starting at 1.
+        message: What went wrong.
+    """
+    turn: int
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"Turn {self.turn} (line {self.line}): {self.message}"
+
+
+class TraceValidator:
+    """
+    Replays a text trace against a map and checks the rules applied by
+    SimulationService.simulate_turns:
+
+    - every move follows a link from the drone's current hub, and no
+      drone moves twice in a turn;
+    - no drone enters a blocked hub;
+    - no hub holds more drones than its `max_drones` at the end of a
+      turn, counting the drones that stayed put (start and end hubs
+      have no limit), and no more drones than its capacity fly a link
+      in one direction in one turn;
+    - a drone entering a restricted hub is written `D<n>-<from>-<to>`
+      and stays put the next turn (every other move is `D<n>-<to>`);
+    - every drone is at the end hub of its mission when the trace
+      reports its turns.
+
+    The trace is read line by line and the per-turn counters are arrays
+    stamped with the turn that last wrote them, so the replay costs
+    O(moves) time and its memory only depends on the map and the fleet
+    size. The writers skip turns in which nothing moved; such a turn is
+    inferred when a drone leaves a restricted hub one line after entering
+    it, and the inferred turns are checked against the final turn count.
+
+    Attributes:
+        flight_map: Map the trace was produced from.
+        turns: Turns replayed by the last validate() call.
+        moves: Moves replayed by the last validate() call.
+    """
+
+    def __init__(self, flight_map: FlightMap):
+        self.flight_map = flight_map
+        self.turns = 0
+        self.moves = 0
+
+    def validate_file(self, path: str) -> Violation | None:
+        """Validates the trace in `path` ('-' for stdin)."""
+        if path == '-':
+            return self.validate(sys.stdin)
+        with open(path) as file:
+            return self.validate(file)
+
+    def validate(self, lines: Iterable[str]) -> Violation | None:
+        """
+        Replays the trace, stopping at the first broken rule.
+
+        Args:
+            lines: Trace lines, optionally preceded by the header lines of
+                the terminal output; zone colors are ignored.
+
+        Returns:
+            The first violation, or None if the trace is valid.
+        """
+        flight_map = self.flight_map
+        graph = flight_map.graph
+        names = graph.names
+        index = graph.index
+        zones = graph.zones
+        max_drones = graph.max_drones
+        edge_cost = graph.edge_cost
+        edge_capacity = graph.edge_capacity
+        nb_drones = flight_map.nb_drones
+
+        drone_hubs = flight_map.drone_hubs()
+        position = array('q', [start for start, _ in drone_hubs])
+        goal = array('q', [end for _, end in drone_hubs])
+        moved = array('q', [-1]) * nb_drones
+        transit = array('q', [-2]) * nb_drones
+        # Drones in every hub
+        present = array('q', [0]) * len(graph)
+        for hub in position:
+            present[hub] += 1
+        exempt = set(position) | set(goal)
+        usage = array('q', [0]) * len(graph.targets)
+        usage_turn = array('q', [-1]) * len(graph.targets)
+
+        # Turns that only exist because a drone left a restricted hub
+        # right after the line where it entered it
+        inferred: list[tuple[int, int]] = []
+        self.turns = self.moves = 0
+        turn = written = line_no = 0
+        total: int | None = None
+
+        for line_no, line in enumerate(lines, 1):
+            if '\x1b' in line:
+                line = ANSI_CODE.sub('', line)
+            tokens = line.split()
+
+            if total is not None:
+                if tokens:
+                    return Violation(turn, line_no,
+                                     "Moves after the turn count")
+                continue
+            if not tokens:
+                # An explicit empty turn
+                turn += 1
+                written += 1
+                continue
+            if tokens[0] == 'Turns:':
+                if len(tokens) != 2 or not tokens[1].isdigit():
+                    return Violation(turn, line_no, "Malformed turn count")
+                total = int(tokens[1])
+                continue
+            if not tokens[0].startswith('D') or '-' not in tokens[0]:
+                if not written:
+                    # Header lines of the terminal output
+                    continue
+                return Violation(turn + 1, line_no,
+                                 f"Malformed line '{line.strip()}'")
+
+            moves: list[tuple[int, str, int, int]] = []
+            for token in tokens:
+                parts = token.split('-')
+                label = parts[0]
+                if (len(parts) not in (2, 3) or label[:1] != 'D'
+                        or not label[1:].isdigit()):
+                    return Violation(turn + 1, line_no,
+                                     f"Malformed move '{token}'")
+                drone = int(label[1:]) - 1
+                if not 0 <= drone < nb_drones:
+                    return Violation(turn + 1, line_no,
+                                     f"Unknown drone {label}")
+                source = -1
+                if len(parts) == 3:
+                    source = index.get(parts[1], -2)
+                hub = index.get(parts[-1], -2)
+                if hub == -2 or source == -2:
+                    return Violation(turn + 1, line_no,
+                                     f"Unknown hub in '{token}'")
+                moves.append((drone, label, source, hub))
+
+            turn += 1
+            written += 1
+            for drone, _, _, _ in moves:
+                if transit[drone] == turn - 1:
+                    inferred.append((turn + 1, line_no))
+                    turn += 1
+                    break
+
+            for drone, label, source, hub in moves:
+                actual = position[drone]
+                if moved[drone] == turn:
+                    return Violation(turn, line_no,
+                                     f"{label} moves twice in one turn")
+                if source >= 0 and source != actual:
+                    return Violation(
+                        turn, line_no,
+                        f"{label} is at {names[actual]}, "
+                        f"not at {names[source]}"
+                    )
+                pos = graph.edge(actual, hub)
+                if pos < 0:
+                    return Violation(
+                        turn, line_no,
+                        f"{label} flies {names[actual]}-{names[hub]}, "
+                        "which is not a connection"
+                    )
+                if pos in graph.closed:
+                    return Violation(
+                        turn, line_no,
+                        f"{label} flies closed link "
+                        f"{names[actual]}-{names[hub]}"
+                    )
+                if not edge_cost[pos]:
+                    return Violation(
+                        turn, line_no,
+                        f"{label} enters blocked hub {names[hub]}"
+                    )
+                restricted = zones[hub] == RESTRICTED
+                if restricted != (source >= 0):
+                    return Violation(
+                        turn, line_no,
+                        f"{label} must be written "
+                        + (f"{label}-{names[actual]}-{names[hub]}"
+                           if restricted else f"{label}-{names[hub]}")
+                    )
+
+                present[actual] -= 1
+                present[hub] += 1
+
+                used = usage[pos] + 1 if usage_turn[pos] == turn else 1
+                if used > edge_capacity[pos]:
+                    return Violation(
+                        turn, line_no,
+                        f"{used} drones fly {names[actual]}-{names[hub]} "
+                        f"(max_link_capacity={edge_capacity[pos]})"
+                    )
+                usage[pos] = used
+                usage_turn[pos] = turn
+
+                position[drone] = hub
+                moved[drone] = turn
+                if restricted:
+                    transit[drone] = turn
+                self.moves += 1
+
+            # Drones may leave and enter a hub in the same turn, so the
+            # hubs are checked once every move of the turn is applied
+            for _, _, _, hub in moves:
+                if present[hub] > max_drones[hub] and hub not in exempt:
+                    return Violation(
+                        turn, line_no,
+                        f"{present[hub]} drones in {names[hub]} "
+                        f"(max_drones={max_drones[hub]})"
+                    )
+
+        self.turns = turn
+        if total is None:
+            return Violation(turn, line_no, "Missing turn count")
+
+        if total < written:
+            return Violation(turn, line_no,
+                             f"Turns: {total}, but {written} turns are "
+                             "written")
+        # The writers skip empty turns: there must be enough of them for
+        # every inferred one
+        skipped = total - written
+        if len(inferred) > skipped:
+            gap_turn, gap_line = inferred[skipped]
+            return Violation(gap_turn, gap_line,
+                             "A drone leaves a restricted hub without "
+                             "waiting a turn")
+        self.turns = total
+        for drone in range(nb_drones):
+            if position[drone] != goal[drone]:
+                return Violation(
+                    total, line_no,
+                    f"D{drone + 1} ends at {names[position[drone]]}, "
+                    f"not at {names[goal[drone]]}"
+                )
+        return None
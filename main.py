@@ -5,10 +5,250 @@ Route simulator for drones in a network of hubs and connections.
 Optimizes movements and visualizes turns with restrictions and capacities.
 """
 
+import argparse
+import json
 import sys
+import time
+from infrastructure.checkpoints import CheckpointFile
+from infrastructure.batch import (BatchResult, BatchRunner, FailureModel,
+                                  HubOutages, LinkFailures, MonteCarloRunner,
+                                  ParameterSweep, SweepResult, SweepVariant,
+                                  load_variants)
+from infrastructure.compiled import MapCompiler
 from infrastructure.parsers import MapParser
+from infrastructure.traces import TraceFile, TraceFileWriter
+from infrastructure.validation import TraceValidator
+from domain.entities import FlightMap, RunLimits, SimulationStalled
 from domain.services import RoutingService, SimulationService, DroneFactory
-from utils import Color
+from utils import (Checkpointer, Color, Metrics, TurnWriter,
+                   ColorTerminalWriter, PlainTerminalWriter,
+                   BufferedFileWriter, NullWriter, TeeWriter)
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    """
+    Simulates every map of the command line in worker processes, prints
+    one line per map as it completes and optionally writes a JSON report.
+
+    Args:
+        args: Parsed command-line arguments.
+
+    Returns:
+        None. Exits with status 1 if any map failed or timed out.
+    """
+    runner = BatchRunner(workers=args.workers, timeout=args.timeout,
+                         cooperative=args.cooperative)
+
+    def show(result: BatchResult) -> None:
+        turns = '-' if result.turns is None else str(result.turns)
+        reason = f"  {result.error}" if result.error else ''
+        print(f"{result.status:<8}{turns:>7}{result.seconds:>10.3f}s  "
+              f"{result.path}{reason}", flush=True)
+
+    workers = min(runner.workers, len(args.map_path))
+    print(f"Simulating {len(args.map_path)} maps with {workers} workers")
+    results = runner.run(args.map_path, on_result=show)
+    summary = {status: sum(r.status == status for r in results)
+               for status in ('ok', 'error', 'timeout')}
+    print(', '.join(f"{count} {status}"
+                    for status, count in summary.items()))
+
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump({
+                'workers': runner.workers,
+                'timeout': runner.timeout,
+                'summary': summary,
+                'results': [result.to_dict() for result in results],
+            }, file, indent=2)
+        print(f"Report written to {args.report}")
+    if summary['ok'] != len(results):
+        sys.exit(1)
+
+
+def worker_source(parser: MapParser, map_path: str) -> FlightMap | str:
+    """
+    The map handed to the workers of a sweep or Monte Carlo run: the path
+    of a compiled map, which every worker memory-maps, else the parsed
+    map.
+    """
+    if MapCompiler.is_compiled(map_path):
+        return map_path
+    return parser.load(map_path)
+
+
+def run_sweep(args: argparse.Namespace, parser: MapParser) -> None:
+    """
+    Loads one map, simulates every variant of the sweep in worker
+    processes and prints a table of turn counts.
+
+    Args:
+        args: Parsed command-line arguments.
+        parser: Parser used to load a text map.
+
+    Returns:
+        None. Exits with status 1 if any variant failed.
+    """
+    map_path = args.map_path[0]
+    variants = load_variants(args.sweep) if args.sweep else []
+    variants += [SweepVariant(f"{nb} drones", nb_drones=nb)
+                 for nb in args.sweep_drones or ()]
+    source = worker_source(parser, map_path)
+    sweep = ParameterSweep(workers=args.workers)
+
+    def show(result: SweepResult) -> None:
+        turns = '-' if result.turns is None else str(result.turns)
+        reason = f"  {result.error}" if result.error else ''
+        print(f"{result.variant:<24}{result.nb_drones:>8}{turns:>7}"
+              f"{result.seconds:>10.3f}s{reason}", flush=True)
+
+    print(f"Sweeping {len(variants)} variants of {map_path}")
+    print(f"{'variant':<24}{'drones':>8}{'turns':>7}{'time':>11}")
+    results = sweep.run(source, variants, on_result=show)
+
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump({
+                'map': map_path,
+                'results': [result.to_dict() for result in results],
+            }, file, indent=2)
+        print(f"Report written to {args.report}")
+    if any(result.status != 'ok' for result in results):
+        sys.exit(1)
+
+
+def run_monte_carlo(args: argparse.Namespace, parser: MapParser,
+                    limits: RunLimits) -> None:
+    """
+    Simulates one map many times under random link and hub failures and
+    prints the percentiles of the makespan and of the delivery rate.
+
+    Args:
+        args: Parsed command-line arguments.
+        parser: Parser used to load a text map.
+        limits: Budget of every trial.
+
+    Returns:
+        None. Exits with status 1 if any trial failed with an error.
+    """
+    map_path = args.map_path[0]
+    models: list[FailureModel] = []
+    if args.link_failure:
+        models.append(LinkFailures(args.link_failure, args.failure_within))
+    if args.hub_outage:
+        models.append(HubOutages(args.hub_outage, args.outage_turns))
+    runner = MonteCarloRunner(workers=args.workers, limits=limits)
+    source = worker_source(parser, map_path)
+
+    print(f"Running up to {args.monte_carlo} trials of {map_path} "
+          f"with seed {args.seed}")
+    report = runner.run(source, models, trials=args.monte_carlo,
+                        seed=args.seed, min_trials=args.min_trials,
+                        tolerance=args.tolerance)
+    if report.converged:
+        print(f"Stopped after {report.trials} trials: 95% intervals "
+              f"within {args.tolerance:.1%}")
+    print(f"{'':<10}" + ''.join(f"{f'p{p}':>9}" for p in report.delivery))
+    if report.makespan:
+        print(f"{'makespan':<10}" + ''.join(
+            f"{value:>9.1f}" for value in report.makespan.values()))
+    print(f"{'delivery':<10}" + ''.join(
+        f"{value:>9.1%}" for value in report.delivery.values()))
+    if report.makespan_ci is not None:
+        mean, half = report.makespan_ci
+        print(f"Mean makespan {mean:.1f} +/- {half:.1f} turns")
+    mean, half = report.delivery_ci
+    print(f"Mean delivery rate {mean:.2%} +/- {half:.2%}")
+    stopped = ''.join(f", {count} {reason}"
+                      for reason, count in sorted(report.stopped.items()))
+    print(f"{report.completed}/{report.trials} trials delivered every "
+          f"drone{stopped}, {report.errors} errors, "
+          f"{report.seconds:.1f}s")
+
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump({
+                'map': map_path,
+                'models': [{'model': type(model).__name__, **vars(model)}
+                           for model in models],
+                **report.to_dict(),
+            }, file, indent=2)
+        print(f"Report written to {args.report}")
+    if report.errors:
+        sys.exit(1)
+
+
+def run_validation(args: argparse.Namespace, parser: MapParser) -> None:
+    """
+    Replays a trace against the map and reports the first broken rule.
+
+    Args:
+        args: Parsed command-line arguments.
+        parser: Parser used to load a text map.
+
+    Returns:
+        None. Exits with status 1 if the trace is invalid.
+    """
+    map_path = args.map_path[0]
+    flight_map = parser.load(map_path)
+    validator = TraceValidator(flight_map)
+    started = time.perf_counter()
+    violation = validator.validate_file(args.validate)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    if violation is not None:
+        print(f"{Color.ERROR}Invalid trace{Color.RESET}: {violation}")
+        sys.exit(1)
+    print(f"Valid trace: {validator.turns} turns, {validator.moves} moves "
+          f"({validator.moves / elapsed:,.0f} moves/s)")
+
+
+def run_replay(args: argparse.Namespace, parser: MapParser) -> None:
+    """
+    Answers questions about a binary trace of the map without simulating:
+    where the drones were after a turn, and which links were saturated
+    in a range of turns.
+
+    Args:
+        args: Parsed command-line arguments.
+        parser: Parser used to load a text map.
+
+    Returns:
+        None.
+
+    Raises:
+        ValueError: If the trace was recorded on another map, or does not
+            cover the turns asked for.
+    """
+    map_path = args.map_path[0]
+    flight_map = parser.load(map_path)
+    graph = flight_map.graph
+    names = graph.names
+    trace = TraceFile(args.replay, graph)
+    print(f"Trace of {trace.nb_drones} drones, turns {trace.start_turn + 1} "
+          f"to {trace.turns}{'' if trace.complete else ' (stopped)'}")
+
+    try:
+        if args.at is not None and args.drone:
+            drone = int(args.drone.lstrip('D')) - 1
+            hub = trace.position(drone, args.at)
+            print(f"D{drone + 1} after turn {args.at}: {names[hub]}")
+        elif args.at is not None:
+            occupancy: dict[int, int] = {}
+            for hub in trace.positions(args.at):
+                occupancy[hub] = occupancy.get(hub, 0) + 1
+            print(f"Drones per hub after turn {args.at}:")
+            for hub in sorted(occupancy):
+                print(f"  {names[hub]}: {occupancy[hub]}")
+        if args.saturated:
+            first, last = args.saturated
+            links = trace.saturated_links(graph, first, last)
+            print(f"{len(links)} saturated links in turns {first} to {last}")
+            for turn, source, target in links:
+                capacity = graph.edge_capacity[graph.edge(source, target)]
+                print(f"  turn {turn}: {names[source]}-{names[target]} "
+                      f"(max_link_capacity={capacity})")
+    except IndexError as e:
+        raise ValueError(e) from e
 
 
 def main() -> None:
@@ -28,15 +268,256 @@ def main() -> None:
         print("Execute: make run <maps/map.txt>")
         sys.exit(1)
 
-    map_path = sys.argv[1]
+    arg_parser = argparse.ArgumentParser(description="Fly-in simulator")
+    arg_parser.add_argument(
+        "map_path", nargs="+",
+        help="map file to simulate; several files run as a batch"
+    )
+    arg_parser.add_argument(
+        "--cooperative", action="store_true",
+        help="plan all drones up front against a reservation table"
+    )
+    arg_parser.add_argument(
+        "--cluster-size", type=int, default=0, metavar="N",
+        help="replan with hierarchical pathfinding over N x N clusters"
+    )
+    arg_parser.add_argument(
+        "--output", choices=("color", "plain", "null"), default="color",
+        help="terminal output mode (null discards the moves)"
+    )
+    arg_parser.add_argument(
+        "--output-file", metavar="PATH",
+        help="write the plain trace to PATH with buffered bulk writes"
+    )
+    arg_parser.add_argument(
+        "--compile", metavar="OUTPUT",
+        help="compile the map into a binary file instead of simulating"
+    )
+    arg_parser.add_argument(
+        "--metrics-json", metavar="PATH",
+        help="write per-turn counters and bottlenecks to PATH as JSON"
+    )
+    arg_parser.add_argument(
+        "--metrics-prom", metavar="PATH",
+        help="write the run totals to PATH as a Prometheus textfile"
+    )
+    arg_parser.add_argument(
+        "--batch", action="store_true",
+        help="simulate the maps in parallel worker processes, without output"
+    )
+    arg_parser.add_argument(
+        "--sweep", metavar="PATH",
+        help="simulate the variants of a JSON sweep file on the map"
+    )
+    arg_parser.add_argument(
+        "--sweep-drones", type=int, nargs="+", metavar="N",
+        help="simulate the map with each of these fleet sizes"
+    )
+    arg_parser.add_argument(
+        "--monte-carlo", type=int, metavar="TRIALS",
+        help="simulate the map up to TRIALS times under random failures"
+    )
+    arg_parser.add_argument(
+        "--link-failure", type=float, default=0.0, metavar="P",
+        help="with --monte-carlo, close each link with probability P"
+    )
+    arg_parser.add_argument(
+        "--failure-within", type=int, default=0, metavar="TURNS",
+        help="spread the link failures over the first TURNS turns "
+             "(default: all before the first turn)"
+    )
+    arg_parser.add_argument(
+        "--hub-outage", type=float, default=0.0, metavar="RATE",
+        help="with --monte-carlo, block each hub with probability RATE "
+             "per turn"
+    )
+    arg_parser.add_argument(
+        "--outage-turns", type=int, default=5, metavar="N",
+        help="turns a hub outage lasts"
+    )
+    arg_parser.add_argument(
+        "--seed", type=int, default=0,
+        help="seed of the Monte Carlo trials"
+    )
+    arg_parser.add_argument(
+        "--min-trials", type=int, default=100, metavar="N",
+        help="trials to run before stopping early (0 never stops early)"
+    )
+    arg_parser.add_argument(
+        "--tolerance", type=float, default=0.01,
+        help="stop once the 95%% intervals of the mean makespan (relative) "
+             "and delivery rate are this narrow"
+    )
+    arg_parser.add_argument(
+        "--validate", metavar="TRACE",
+        help="check a trace of the map ('-' for stdin) instead of "
+             "simulating"
+    )
+    arg_parser.add_argument(
+        "--checkpoint", metavar="PATH",
+        help="save the simulation state to PATH on SIGUSR1, or on SIGTERM "
+             "before stopping"
+    )
+    arg_parser.add_argument(
+        "--checkpoint-every", type=int, default=0, metavar="N",
+        help="also save the simulation state every N turns"
+    )
+    arg_parser.add_argument(
+        "--resume", metavar="PATH",
+        help="continue the simulation saved in the checkpoint PATH"
+    )
+    arg_parser.add_argument(
+        "--trace", metavar="PATH",
+        help="also record the moves in a binary trace at PATH"
+    )
+    arg_parser.add_argument(
+        "--trace-every", type=int, default=100, metavar="N",
+        help="snapshot every drone position in the trace every N turns"
+    )
+    arg_parser.add_argument(
+        "--replay", metavar="TRACE",
+        help="query a binary trace of the map instead of simulating"
+    )
+    arg_parser.add_argument(
+        "--at", type=int, metavar="TURN",
+        help="with --replay, show the drones per hub after TURN turns"
+    )
+    arg_parser.add_argument(
+        "--drone", metavar="LABEL",
+        help="with --replay and --at, show only this drone (e.g. D12)"
+    )
+    arg_parser.add_argument(
+        "--saturated", type=int, nargs=2, metavar=("FIRST", "LAST"),
+        help="with --replay, list the links at capacity in these turns"
+    )
+    arg_parser.add_argument(
+        "--max-turns", type=int, default=0, metavar="N",
+        help="stop the simulation after N turns"
+    )
+    arg_parser.add_argument(
+        "--time-limit", type=float, default=0.0, metavar="SECONDS",
+        help="stop the simulation after SECONDS of wall-clock time"
+    )
+    arg_parser.add_argument(
+        "--stall-turns", type=int, metavar="N",
+        help="stop the simulation after N turns without a landing "
+             "(default: 4 per hub, 0 to disable)"
+    )
+    arg_parser.add_argument(
+        "--diagnosis-json", metavar="PATH",
+        help="write the diagnosis of a stopped simulation to PATH as JSON"
+    )
+    arg_parser.add_argument(
+        "--workers", type=int,
+        help="batch, sweep or Monte Carlo worker processes (default: one "
+             "per CPU)"
+    )
+    arg_parser.add_argument(
+        "--timeout", type=float, metavar="SECONDS",
+        help="batch time limit per map"
+    )
+    arg_parser.add_argument(
+        "--report", metavar="PATH",
+        help="write the batch, sweep or Monte Carlo results to PATH as JSON"
+    )
+    args = arg_parser.parse_args()
+    if args.checkpoint_every and not args.checkpoint:
+        arg_parser.error("--checkpoint-every requires --checkpoint")
+    if args.cluster_size < 0:
+        arg_parser.error("--cluster-size must be positive")
+    if (args.max_turns < 0 or args.time_limit < 0
+            or (args.stall_turns or 0) < 0):
+        arg_parser.error("--max-turns, --time-limit and --stall-turns "
+                         "must be positive")
+    if args.monte_carlo is not None and args.monte_carlo < 1:
+        arg_parser.error("--monte-carlo must be positive")
+    if not (0 <= args.link_failure <= 1 and 0 <= args.hub_outage <= 1):
+        arg_parser.error("--link-failure and --hub-outage must be "
+                         "probabilities")
+    if (args.outage_turns < 1 or args.failure_within < 0
+            or args.min_trials < 0 or args.tolerance <= 0):
+        arg_parser.error("--outage-turns, --failure-within, --min-trials "
+                         "and --tolerance must be positive")
+    if args.trace_every < 1:
+        arg_parser.error("--trace-every must be positive")
+    if args.replay and args.at is None and not args.saturated:
+        arg_parser.error("--replay requires --at or --saturated")
+    if args.drone and args.at is None:
+        arg_parser.error("--drone requires --at")
+    if args.cooperative and (args.checkpoint or args.resume):
+        arg_parser.error("checkpoints are not supported with --cooperative")
+
+    if args.batch or len(args.map_path) > 1:
+        run_batch(args)
+        return
+
+    map_path = args.map_path[0]
     print(f"Loading map: {map_path}")
 
+    writer: TurnWriter
+    if args.output_file:
+        writer = BufferedFileWriter(args.output_file)
+    elif args.output == "plain":
+        writer = PlainTerminalWriter()
+    elif args.output == "null":
+        writer = NullWriter()
+    else:
+        writer = ColorTerminalWriter()
+    if args.trace:
+        writer = TeeWriter(writer, TraceFileWriter(args.trace,
+                                                   args.trace_every))
+
+    metrics = (Metrics() if args.metrics_json or args.metrics_prom
+               else None)
+    checkpointer = None
+    if args.checkpoint:
+        checkpointer = Checkpointer(args.checkpoint, CheckpointFile.write,
+                                    args.checkpoint_every)
+        checkpointer.install_signal_handlers()
+    limits = RunLimits(args.max_turns, args.time_limit, args.stall_turns)
+    simulation = SimulationService(
+        RoutingService(incremental=True, metrics=metrics,
+                       cluster_size=args.cluster_size),
+        writer, metrics, checkpointer, limits,
+    )
     routing = RoutingService()
-    simulation = SimulationService()
     factory = DroneFactory()
-    parser = MapParser(routing, simulation, factory)
+    parser = MapParser(routing, simulation, factory,
+                       cooperative=args.cooperative)
     try:
-        parser.parse_map(map_path)
+        if args.validate:
+            run_validation(args, parser)
+        elif args.replay:
+            run_replay(args, parser)
+        elif args.monte_carlo:
+            run_monte_carlo(args, parser, limits)
+        elif args.sweep or args.sweep_drones:
+            run_sweep(args, parser)
+        elif args.compile:
+            MapCompiler.write(parser.load(map_path), args.compile)
+            print(f"Compiled map: {args.compile}")
+        elif args.resume:
+            with parser.phase('load'):
+                flight_map = parser.load(map_path)
+                turn, fleet = CheckpointFile.load(args.resume,
+                                                  flight_map.graph)
+            print(f"Resuming after turn {turn}")
+            with parser.phase('simulate'):
+                simulation.simulate_fleet(fleet, flight_map.graph, turn)
+        else:
+            parser.parse_map(map_path)
+        if metrics is not None and args.metrics_json:
+            metrics.write_json(args.metrics_json)
+        if metrics is not None and args.metrics_prom:
+            metrics.write_prometheus(args.metrics_prom)
+    except SimulationStalled as e:
+        print(f"{Color.ERROR}Simulation stopped{Color.RESET}: "
+              f"{e.diagnosis}")
+        if args.diagnosis_json:
+            with open(args.diagnosis_json, 'w') as file:
+                json.dump(e.diagnosis.to_dict(), file, indent=2)
+            print(f"Diagnosis written to {args.diagnosis_json}")
+        sys.exit(1)
     except Exception as e:
         print(f"Error during map parsing: {e}")
         sys.exit(1)
@@ -1,3 +1,11 @@
 from .colors import Color, Palette, COLOR_MAP
+from .turn_writers import (TurnWriter, TextTurnWriter, ColorTerminalWriter,
+                           PlainTerminalWriter, BufferedFileWriter,
+                           NullWriter, TeeWriter, TurnCounter)
+from .metrics import Metrics, TurnMetrics
+from .checkpoints import Checkpointer
 
-__all__ = ['Color', 'Palette', 'COLOR_MAP']
+__all__ = ['Color', 'Palette', 'COLOR_MAP', 'TurnWriter', 'TextTurnWriter',
+           'ColorTerminalWriter', 'PlainTerminalWriter', 'BufferedFileWriter',
+           'NullWriter', 'TeeWriter', 'TurnCounter', 'Metrics', 'TurnMetrics',
+           'Checkpointer']
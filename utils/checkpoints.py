@@ -0,0 +1,66 @@
+import signal
+from types import FrameType
+from typing import Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from domain.entities import Fleet
+
+
+class Checkpointer:
+    """
+    Decides when a running simulation saves its state, and saves it.
+
+    The simulation service calls after_turn() between two turns, once the
+    previous turn has been written out. The state is saved every `every`
+    turns, and also at the next turn boundary after SIGUSR1 (then the
+    run goes on) or SIGTERM (then the run stops with exit status
+    128 + SIGTERM). The state is only built when it is saved, so a turn
+    without a checkpoint costs a counter check.
+
+    Attributes:
+        path: File the checkpoints are written to, replaced every time.
+        save: Writes (path, turn, fleet) to disk.
+        every: Turns between periodic checkpoints, 0 for none.
+        saved_turn: Turn of the last checkpoint written, or None.
+    """
+
+    def __init__(self,
+                 path: str,
+                 save: Callable[[str, int, 'Fleet'], None],
+                 every: int = 0):
+        self.path = path
+        self.save = save
+        self.every = every
+        self.saved_turn: int | None = None
+        self._requested = False
+        self._stop_signal: int | None = None
+
+    def install_signal_handlers(self) -> None:
+        """Saves on SIGUSR1, and saves then stops on SIGTERM."""
+        signal.signal(signal.SIGUSR1, self._on_signal)
+        signal.signal(signal.SIGTERM, self._on_signal)
+
+    def _on_signal(self, signum: int, frame: FrameType | None) -> None:
+        # Only flag it: the state is consistent between turns alone
+        self._requested = True
+        if signum == signal.SIGTERM:
+            self._stop_signal = signum
+
+    def after_turn(self, turn: int, snapshot: Callable[[], 'Fleet']) -> None:
+        """
+        Saves the state reached after `turn` if a checkpoint is due.
+
+        Args:
+            turn: Number of turns simulated so far.
+            snapshot: Builds the fleet state to save.
+
+        Raises:
+            SystemExit: After saving, if SIGTERM was received.
+        """
+        if not (self._requested or (self.every and turn % self.every == 0)):
+            return
+        self.save(self.path, turn, snapshot())
+        self.saved_turn = turn
+        self._requested = False
+        if self._stop_signal is not None:
+            raise SystemExit(128 + self._stop_signal)
@@ -0,0 +1,212 @@
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from domain.entities import Graph
+
+
+@dataclass(slots=True)
+class TurnMetrics:
+    """
+    Counters of one simulation turn.
+
+    Attributes:
+        turn: Turn number, starting at 0.
+        active: Drones still flying at the start of the turn.
+        moves: Drones that moved.
+        replans: Replans triggered by a full next hub.
+        failed_replans: Replans that found no alternative path.
+        hub_waits: Drones that waited because the next hub was full.
+        link_waits: Drones that waited because the link was full.
+        restricted_stalls: Drones held by a restricted zone countdown.
+        expansions: Hubs expanded by the routing service.
+        seconds: Wall time of the turn.
+    """
+    turn: int
+    active: int
+    moves: int
+    replans: int
+    failed_replans: int
+    hub_waits: int
+    link_waits: int
+    restricted_stalls: int
+    expansions: int
+    seconds: float
+
+
+class Metrics:
+    """
+    Collects counters and timings of a run and exports them.
+
+    The simulation and routing services take an optional Metrics; when
+    none is given they only pay for a few local integer increments per
+    turn. With one, every turn is recorded, each wait is attributed to
+    the hub or link that caused it, and every routing call is timed, so
+    the bottlenecks of a map can be read from the summary (JSON) or
+    scraped from a Prometheus textfile.
+    """
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+        self.turns: list[TurnMetrics] = []
+        self.hub_waits: dict[int, int] = {}
+        self.link_waits: dict[int, int] = {}
+        self.route_calls = 0
+        self.route_failures = 0
+        self.route_expansions = 0
+        self.route_seconds = 0.0
+        self._names: tuple[str, ...] = ()
+        self._link_names: list[tuple[str, str]] = []
+
+    def bind(self, graph: 'Graph') -> None:
+        """Remembers hub and link names for the export."""
+        self._names = graph.names
+        self._link_names = [
+            (graph.names[hub], graph.names[graph.targets[pos]])
+            for hub in range(len(graph))
+            for pos in range(graph.offsets[hub], graph.offsets[hub + 1])
+        ]
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times the enclosed block as phase `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (self.phases.get(name, 0.0)
+                                 + time.perf_counter() - start)
+
+    def record_turn(self, turn: TurnMetrics) -> None:
+        self.turns.append(turn)
+
+    def hub_wait(self, hub: int) -> None:
+        self.hub_waits[hub] = self.hub_waits.get(hub, 0) + 1
+
+    def link_wait(self, link: int) -> None:
+        self.link_waits[link] = self.link_waits.get(link, 0) + 1
+
+    def route_call(self, seconds: float, expansions: int,
+                   found: bool) -> None:
+        self.route_calls += 1
+        self.route_expansions += expansions
+        self.route_seconds += seconds
+        if not found:
+            self.route_failures += 1
+
+    def totals(self) -> dict[str, int | float]:
+        """Sums of the per-turn counters."""
+        fields = ('moves', 'replans', 'failed_replans', 'hub_waits',
+                  'link_waits', 'restricted_stalls', 'expansions',
+                  'seconds')
+        totals: dict[str, int | float] = {
+            name: sum(getattr(t, name) for t in self.turns)
+            for name in fields
+        }
+        totals['turns'] = len(self.turns)
+        return totals
+
+    def bottlenecks(self, top: int = 10) -> dict[str, list[dict[str, Any]]]:
+        """The hubs and links that caused the most waits."""
+        hubs = sorted(self.hub_waits.items(), key=lambda i: -i[1])[:top]
+        links = sorted(self.link_waits.items(), key=lambda i: -i[1])[:top]
+        return {
+            'hubs': [{'hub': self._hub_name(hub), 'waits': waits}
+                     for hub, waits in hubs],
+            'links': [{'link': '-'.join(self._link_name(link)),
+                       'waits': waits} for link, waits in links],
+        }
+
+    def summary(self, top: int = 10) -> dict[str, Any]:
+        """JSON-ready summary of the run."""
+        return {
+            'phases': {name: round(s, 6) for name, s in self.phases.items()},
+            'totals': self.totals(),
+            'routing': {
+                'calls': self.route_calls,
+                'failures': self.route_failures,
+                'expansions': self.route_expansions,
+                'seconds': round(self.route_seconds, 6),
+            },
+            'bottlenecks': self.bottlenecks(top),
+            'turns': [
+                {name: getattr(t, name) for name in TurnMetrics.__slots__}
+                for t in self.turns
+            ],
+        }
+
+    def write_json(self, path: str, top: int = 10) -> None:
+        with open(path, 'w') as file:
+            json.dump(self.summary(top), file, indent=2)
+
+    def write_prometheus(self, path: str, top: int = 10) -> None:
+        """
+        Writes the run in the Prometheus text exposition format, for the
+        node exporter textfile collector.
+        """
+        totals = self.totals()
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, help_text: str,
+                   samples: list[tuple[str, float]]) -> None:
+            lines.append(f"# HELP flyin_{name} {help_text}")
+            lines.append(f"# TYPE flyin_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"flyin_{name}{labels} {value}")
+
+        metric('turns', 'gauge', 'Turns needed to deliver the fleet.',
+               [('', totals['turns'])])
+        metric('moves_total', 'counter', 'Drone moves.',
+               [('', totals['moves'])])
+        metric('waits_total', 'counter', 'Drones that could not move.', [
+            ('{reason="hub"}', totals['hub_waits']),
+            ('{reason="link"}', totals['link_waits']),
+            ('{reason="restricted"}', totals['restricted_stalls']),
+        ])
+        metric('replans_total', 'counter', 'Replans of blocked drones.', [
+            ('{result="found"}',
+             totals['replans'] - totals['failed_replans']),
+            ('{result="failed"}', totals['failed_replans']),
+        ])
+        metric('routing_calls_total', 'counter', 'Routing calls.',
+               [('', self.route_calls)])
+        metric('routing_expansions_total', 'counter',
+               'Hubs expanded by the routing searches.',
+               [('', self.route_expansions)])
+        metric('routing_seconds_total', 'counter', 'Time spent routing.',
+               [('', round(self.route_seconds, 6))])
+        metric('phase_seconds', 'gauge', 'Wall time of each phase.', [
+            (f'{{phase="{self._escape(name)}"}}', round(seconds, 6))
+            for name, seconds in self.phases.items()
+        ])
+        bottlenecks = self.bottlenecks(top)
+        metric('hub_waits_total', 'counter',
+               'Waits caused by a full hub, for the busiest hubs.', [
+                   (f'{{hub="{self._escape(item["hub"])}"}}', item['waits'])
+                   for item in bottlenecks['hubs']
+               ])
+        metric('link_waits_total', 'counter',
+               'Waits caused by a full link, for the busiest links.', [
+                   (f'{{link="{self._escape(item["link"])}"}}',
+                    item['waits'])
+                   for item in bottlenecks['links']
+               ])
+
+        with open(path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+
+    def _hub_name(self, hub: int) -> str:
+        return self._names[hub] if hub < len(self._names) else str(hub)
+
+    def _link_name(self, link: int) -> tuple[str, str]:
+        if link < len(self._link_names):
+            return self._link_names[link]
+        return str(link), '?'
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        return (value.replace('\\', '\\\\').replace('"', '\\"')
+                .replace('\n', '\\n'))
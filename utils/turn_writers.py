@@ -0,0 +1,225 @@
+import sys
+from abc import ABC, abstractmethod
+from typing import IO, TYPE_CHECKING, Callable, Sequence
+from .colors import Color, COLOR_MAP
+
+if TYPE_CHECKING:
+    from domain.entities import Graph
+
+
+class TurnWriter(ABC):
+    """
+    Output sink for the moves of a simulation.
+
+    The simulation calls bind() once with the graph, move() for every
+    move of a turn, end_turn() after each turn and finish() with the
+    final turn count, or abort() if the run is stopped. Writers that
+    record positions also get begin() before the first turn. Writers resolve
+    everything that depends only on a hub (name, color, separators) in
+    bind(), so a move costs a single string concatenation at most.
+    """
+
+    @abstractmethod
+    def bind(self, graph: 'Graph') -> None:
+        """Prepares the writer for a simulation on `graph`."""
+
+    @abstractmethod
+    def move(self, drone: str, actual: int, nxt: int) -> None:
+        """Records that `drone` flies from hub `actual` to hub `nxt`."""
+
+    @abstractmethod
+    def end_turn(self) -> None:
+        """Closes the current turn."""
+
+    @abstractmethod
+    def finish(self, turns: int) -> None:
+        """Reports the final turn count and flushes pending output."""
+
+    def abort(self) -> None:
+        """Flushes pending output of a run stopped before it finished."""
+
+    def begin(self, positions: Callable[[], Sequence[int]],
+              turn: int) -> None:
+        """
+        Offers the hub of every drone, by drone index, before the first
+        turn is written; `positions` only builds them when called.
+        `turn` is the number of turns already simulated.
+        """
+
+
+class TextTurnWriter(TurnWriter):
+    """
+    Base class of the writers that produce the text trace: one line per
+    turn with the moves separated by spaces, `D<n>-<hub>` for a normal
+    move and `D<n>-<from>-<to>` for a flight into a restricted hub,
+    followed by `Turns: <n>`.
+    """
+
+    colored = False
+
+    def __init__(self) -> None:
+        self._arrive: list[str] = []
+        self._depart: list[str] = []
+        self._restricted: list[bool] = []
+        self._moves: list[str] = []
+
+    def bind(self, graph: 'Graph') -> None:
+        # Deferred import: domain.entities depends on this package
+        from domain.entities.graph import RESTRICTED
+
+        reset = Color.RESET if self.colored else ''
+        arrive: list[str] = []
+        depart: list[str] = []
+        for name, color in zip(graph.names, graph.colors):
+            code = (COLOR_MAP.get(str(color), Color.RESET)
+                    if self.colored else '')
+            arrive.append(f"{code}{name}{reset}")
+            depart.append(f"{code}{name}-")
+        self._arrive = arrive
+        self._depart = depart
+        self._restricted = [zone == RESTRICTED for zone in graph.zones]
+        self._moves = []
+
+    def move(self, drone: str, actual: int, nxt: int) -> None:
+        if self._restricted[nxt]:
+            self._moves.append(
+                f"{drone}-{self._depart[actual]}{self._arrive[nxt]}"
+            )
+        else:
+            self._moves.append(f"{drone}-{self._arrive[nxt]}")
+
+    def end_turn(self) -> None:
+        if self._moves:
+            self.write_line(' '.join(self._moves))
+            self._moves = []
+
+    def finish(self, turns: int) -> None:
+        self.write_line(f"Turns: {turns}")
+
+    @abstractmethod
+    def write_line(self, line: str) -> None:
+        """Outputs one line of the trace."""
+
+
+class ColorTerminalWriter(TextTurnWriter):
+    """Prints each turn to the terminal with zone colors (the default)."""
+
+    colored = True
+
+    def write_line(self, line: str) -> None:
+        print(line)
+
+
+class PlainTerminalWriter(TextTurnWriter):
+    """Prints each turn to the terminal without ANSI color codes."""
+
+    def write_line(self, line: str) -> None:
+        print(line)
+
+
+class BufferedFileWriter(TextTurnWriter):
+    """
+    Writes the plain trace to a file, collecting lines in memory and
+    writing them in bulk once `buffer_size` characters are pending.
+
+    Attributes:
+        path: Destination file, truncated on bind(); '-' for stdout.
+        buffer_size: Pending characters that trigger a write.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 20) -> None:
+        super().__init__()
+        self.path = path
+        self.buffer_size = buffer_size
+        self._file: IO[str] | None = None
+        self._pending: list[str] = []
+        self._pending_size = 0
+
+    def bind(self, graph: 'Graph') -> None:
+        super().bind(graph)
+        self._close()
+        self._file = (sys.stdout if self.path == '-'
+                      else open(self.path, 'w'))
+
+    def write_line(self, line: str) -> None:
+        self._pending.append(line)
+        self._pending.append('\n')
+        self._pending_size += len(line) + 1
+        if self._pending_size >= self.buffer_size:
+            self._flush()
+
+    def finish(self, turns: int) -> None:
+        super().finish(turns)
+        self._close()
+
+    def abort(self) -> None:
+        self._close()
+
+    def _flush(self) -> None:
+        if self._file is not None and self._pending:
+            self._file.write(''.join(self._pending))
+        self._pending = []
+        self._pending_size = 0
+
+    def _close(self) -> None:
+        self._flush()
+        if self._file is not None and self._file is not sys.stdout:
+            self._file.close()
+        self._file = None
+
+
+class NullWriter(TurnWriter):
+    """Discards all output, for benchmarking the simulation alone."""
+
+    def bind(self, graph: 'Graph') -> None:
+        pass
+
+    def move(self, drone: str, actual: int, nxt: int) -> None:
+        pass
+
+    def end_turn(self) -> None:
+        pass
+
+    def finish(self, turns: int) -> None:
+        pass
+
+
+class TeeWriter(TurnWriter):
+    """Forwards everything to several writers, in order."""
+
+    def __init__(self, *writers: TurnWriter) -> None:
+        self.writers = writers
+
+    def bind(self, graph: 'Graph') -> None:
+        for writer in self.writers:
+            writer.bind(graph)
+
+    def begin(self, positions: Callable[[], Sequence[int]],
+              turn: int) -> None:
+        for writer in self.writers:
+            writer.begin(positions, turn)
+
+    def move(self, drone: str, actual: int, nxt: int) -> None:
+        for writer in self.writers:
+            writer.move(drone, actual, nxt)
+
+    def end_turn(self) -> None:
+        for writer in self.writers:
+            writer.end_turn()
+
+    def finish(self, turns: int) -> None:
+        for writer in self.writers:
+            writer.finish(turns)
+
+    def abort(self) -> None:
+        for writer in self.writers:
+            writer.abort()
+
+
+class TurnCounter(NullWriter):
+    """Discards the moves but keeps the final turn count."""
+
+    turns = 0
+
+    def finish(self, turns: int) -> None:
+        self.turns = turns